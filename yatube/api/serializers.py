@@ -0,0 +1,62 @@
+"""Представление моделей в виде словарей для JSON-ответов API."""
+from django.urls import reverse
+
+POST_FIELDS = (
+    'id', 'text', 'pub_date', 'author', 'group', 'image', 'url',
+    'comments_count', 'comments', 'comments_next',
+)
+
+
+class FieldsError(ValueError):
+    pass
+
+
+def parse_fields(request, allowed):
+    """Набор полей из ?fields=a,b или None, если нужны все поля."""
+    value = request.GET.get('fields')
+    if not value:
+        return None
+    fields = [field.strip() for field in value.split(',') if field.strip()]
+    unknown = sorted(set(fields) - set(allowed))
+    if unknown:
+        raise FieldsError(unknown)
+    return fields
+
+
+def _pick(data, fields):
+    if fields is None:
+        return data
+    return {field: data[field] for field in fields if field in data}
+
+
+def serialize_comment(comment, fields=None):
+    return _pick({
+        'id': comment.pk,
+        'post': comment.post_id,
+        'parent': comment.parent_id,
+        'depth': comment.depth,
+        'author': comment.author.username,
+        'text': comment.text,
+        'created': comment.created,
+    }, fields)
+
+
+def serialize_post(post, fields=None, comments=None):
+    data = {
+        'id': post.pk,
+        'text': post.text,
+        'pub_date': post.pub_date,
+        'author': post.author.username,
+        'group': post.group.slug if post.group_id else None,
+        'image': post.image.url if post.image else None,
+        'url': reverse('api:post_detail', args=[post.pk]),
+    }
+    if hasattr(post, 'comments_count'):
+        data['comments_count'] = post.comments_count
+    if comments is not None:
+        # comments — страница comments.threads(): корни с ответами.
+        data['comments'] = [
+            serialize_comment(comment) for comment in comments
+        ]
+        data['comments_next'] = comments.next_cursor
+    return _pick(data, fields)
@@ -0,0 +1,184 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author, group=cls.group, text=f'Пост {number}'
+            )
+            for number in range(12)
+        ]
+        cls.post = cls.posts[-1]
+        Comment.objects.create(
+            post=cls.post, author=cls.reader, text='Комментарий'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_feeds_are_paginated_by_cursor(self):
+        """Ленты отдают страницу и курсор следующей страницы."""
+        urls = (
+            reverse('api:posts'),
+            reverse('api:group_posts', args=[self.group.slug]),
+            reverse('api:profile_posts', args=[self.author.username]),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                data = self.client.get(url).json()
+                self.assertEqual(len(data['results']), 10)
+                self.assertEqual(data['results'][0]['id'], self.post.pk)
+                self.assertEqual(data['results'][0]['comments_count'], 1)
+                rest = self.client.get(url, {'cursor': data['next']}).json()
+                self.assertEqual(len(rest['results']), 2)
+                self.assertIsNone(rest['next'])
+
+    def test_follow_feed(self):
+        """Лента подписок требует входа и показывает посты авторов."""
+        url = reverse('api:follow_feed')
+        self.assertEqual(self.client.get(url).status_code, 401)
+        self.assertEqual(self.reader_client.get(url).json()['results'], [])
+        response = self.reader_client.post(
+            reverse('api:follow', args=[self.author.username])
+        )
+        self.assertEqual(response.status_code, 201)
+        data = self.reader_client.get(url).json()
+        self.assertEqual(data['results'][0]['id'], self.post.pk)
+
+    def test_unfollow(self):
+        """DELETE снимает подписку."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        response = self.reader_client.delete(
+            reverse('api:follow', args=[self.author.username])
+        )
+        self.assertFalse(response.json()['following'])
+        self.assertFalse(Follow.objects.filter(user=self.reader).exists())
+
+    def test_sparse_fieldsets(self):
+        """?fields= оставляет только запрошенные поля."""
+        url = reverse('api:posts')
+        data = self.client.get(url, {'fields': 'id,text'}).json()
+        self.assertEqual(set(data['results'][0]), {'id', 'text'})
+        response = self.client.get(url, {'fields': 'id,password'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['errors']['fields'], ['password'])
+
+    def test_post_detail_with_comments(self):
+        """Пост отдаётся вместе с комментариями."""
+        data = self.client.get(
+            reverse('api:post_detail', args=[self.post.pk])
+        ).json()
+        self.assertEqual(data['author'], self.author.username)
+        self.assertEqual(data['group'], self.group.slug)
+        self.assertEqual(
+            [comment['text'] for comment in data['comments']],
+            ['Комментарий'],
+        )
+
+    def test_post_detail_comments_are_paginated(self):
+        """Комментарии поста отдаются страницами веток с курсором."""
+        url = reverse('api:post_detail', args=[self.post.pk])
+        root = Comment.objects.get(post=self.post)
+        Comment.objects.create(
+            post=self.post, author=self.author, text='Ответ', parent=root
+        )
+        Comment.objects.create(
+            post=self.post, author=self.author, text='Второй'
+        )
+        with self.settings(COMMENTS_PER_PAGE=1):
+            data = self.client.get(url).json()
+            self.assertEqual(
+                [(item['text'], item['depth']) for item in data['comments']],
+                [('Комментарий', 0), ('Ответ', 1)],
+            )
+            self.assertEqual(data['comments_count'], 3)
+            data = self.client.get(
+                url, {'cursor': data['comments_next']}
+            ).json()
+        self.assertEqual(
+            [item['text'] for item in data['comments']], ['Второй']
+        )
+        self.assertIsNone(data['comments_next'])
+
+    def test_reply_to_comment_of_other_post_is_rejected(self):
+        other = Comment.objects.create(
+            post=self.posts[0], author=self.author, text='Чужой'
+        )
+        url = reverse('api:add_comment', args=[self.post.pk])
+        response = self.reader_client.post(
+            url, {'text': 'Ответ', 'parent': other.pk}
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('parent', response.json()['errors'])
+        self.assertFalse(Comment.objects.filter(text='Ответ').exists())
+        root = Comment.objects.get(post=self.post)
+        response = self.reader_client.post(
+            url, {'text': 'Ответ', 'parent': root.pk}
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['parent'], root.pk)
+
+    def test_etag_not_modified(self):
+        """Совпавший If-None-Match даёт 304, изменение данных — новый ETag."""
+        url = reverse('api:post_detail', args=[self.post.pk])
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        self.reader_client.post(
+            reverse('api:add_comment', args=[self.post.pk]),
+            {'text': 'Ещё один'},
+        )
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_create_comment(self):
+        """Комментарий создаётся через CommentForm, ошибки формы — 400."""
+        url = reverse('api:add_comment', args=[self.post.pk])
+        self.assertEqual(
+            self.client.post(url, {'text': 'Аноним'}).status_code, 401
+        )
+        self.assertEqual(
+            self.reader_client.post(url, {'text': ''}).status_code, 400
+        )
+        response = self.reader_client.post(url, {'text': 'Новый'})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['author'], self.reader.username)
+        self.assertTrue(
+            Comment.objects.filter(post=self.post, text='Новый').exists()
+        )
+
+    def test_create_post(self):
+        """Пост создаётся через PostForm и появляется в ленте."""
+        response = self.reader_client.post(
+            reverse('api:posts'), {'text': 'Из API', 'group': self.group.pk}
+        )
+        self.assertEqual(response.status_code, 201)
+        post = Post.objects.get(text='Из API')
+        self.assertEqual(post.author, self.reader)
+        self.assertTrue(response['Location'].endswith(
+            reverse('api:post_detail', args=[post.pk])
+        ))
+        data = self.client.get(reverse('api:posts')).json()
+        self.assertEqual(data['results'][0]['id'], post.pk)
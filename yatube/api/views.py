@@ -0,0 +1,173 @@
+"""JSON API поверх моделей и форм приложения posts.
+
+Ленты отдаются курсорными страницами, ?fields= оставляет в объектах
+только нужные поля, а каждый GET-ответ несёт сильный ETag от тела,
+так что клиент с If-None-Match получает пустой 304.
+"""
+import hashlib
+import json
+from functools import wraps
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+from django.views.decorators.http import require_http_methods
+
+from posts import caching, comments, thumbnails
+from posts.forms import CommentForm, PostForm
+from posts.models import Follow, Group, Post, User
+from posts.timeline import get_feed
+
+from .serializers import (POST_FIELDS, FieldsError, parse_fields,
+                          serialize_comment, serialize_post)
+
+
+def json_response(request, data, status=200):
+    body = json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False)
+    response = HttpResponse(
+        body.encode(), status=status,
+        content_type='application/json; charset=utf-8',
+    )
+    if request.method in ('GET', 'HEAD') and status == 200:
+        etag = quote_etag(hashlib.sha1(response.content).hexdigest())
+        response['ETag'] = etag
+        return get_conditional_response(
+            request, etag=etag, response=response
+        )
+    return response
+
+
+def error_response(request, errors, status=400):
+    return json_response(request, {'errors': errors}, status=status)
+
+
+def api_login_required(view):
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return error_response(
+                request, {'detail': 'Требуется авторизация'}, status=401
+            )
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+def feed_response(request, page_obj):
+    try:
+        fields = parse_fields(request, POST_FIELDS)
+    except FieldsError as error:
+        return error_response(request, {'fields': error.args[0]})
+    return json_response(request, {
+        'results': [serialize_post(post, fields) for post in page_obj],
+        'next': page_obj.next_cursor,
+        'previous': page_obj.previous_cursor,
+    })
+
+
+def _post_list(posts):
+    return posts.select_related('group', 'author').with_comment_stats()
+
+
+@require_http_methods(['GET', 'HEAD', 'POST'])
+def posts(request):
+    if request.method == 'POST':
+        return create_post(request)
+    page_obj = caching.cached_page(
+        request, _post_list(Post.objects.all()), ('posts',)
+    )
+    return feed_response(request, page_obj)
+
+
+@api_login_required
+def create_post(request):
+    form = PostForm(request.POST, request.FILES or None)
+    if not form.is_valid():
+        return error_response(request, form.errors.get_json_data())
+    post = form.save(commit=False)
+    post.author = request.user
+    post.save()
+    thumbnails.schedule(post.image, 'post', [('post', post.pk)])
+    data = serialize_post(post)
+    response = json_response(request, data, status=201)
+    response['Location'] = request.build_absolute_uri(data['url'])
+    return response
+
+
+@require_http_methods(['GET', 'HEAD'])
+def group_posts(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    page_obj = caching.cached_page(
+        request, _post_list(group.posts.all()), ('group', group.pk)
+    )
+    return feed_response(request, page_obj)
+
+
+@require_http_methods(['GET', 'HEAD'])
+def profile_posts(request, username):
+    author = get_object_or_404(User, username=username)
+    page_obj = caching.cached_page(
+        request, _post_list(author.posts.all()), ('author', author.pk)
+    )
+    return feed_response(request, page_obj)
+
+
+@require_http_methods(['GET', 'HEAD'])
+@api_login_required
+def follow_feed(request):
+    return feed_response(
+        request, get_feed(request.user, request.GET.get('cursor'))
+    )
+
+
+@require_http_methods(['GET', 'HEAD'])
+def post_detail(request, post_id):
+    post = get_object_or_404(_post_list(Post.objects.all()), pk=post_id)
+    try:
+        fields = parse_fields(request, POST_FIELDS)
+    except FieldsError as error:
+        return error_response(request, {'fields': error.args[0]})
+    page = None
+    if fields is None or {'comments', 'comments_next'} & set(fields):
+        # Как на странице поста: ветки страницами по ?order= и ?cursor=.
+        page = comments.threads(
+            post, comments.get_order(request), request.GET.get('cursor')
+        )
+    return json_response(request, serialize_post(post, fields, page))
+
+
+@require_http_methods(['POST'])
+@api_login_required
+def add_comment(request, post_id):
+    post = get_object_or_404(Post, pk=post_id)
+    form = CommentForm(request.POST, post=post)
+    if not form.is_valid():
+        return error_response(request, form.errors.get_json_data())
+    comment = form.save(commit=False)
+    comment.author = request.user
+    comment.post = post
+    comment.save()
+    return json_response(request, serialize_comment(comment), status=201)
+
+
+@require_http_methods(['POST', 'DELETE'])
+@api_login_required
+def follow(request, username):
+    author = get_object_or_404(User, username=username)
+    if request.method == 'DELETE':
+        Follow.objects.filter(user=request.user, author=author).delete()
+        return json_response(
+            request, {'author': author.username, 'following': False}
+        )
+    if author == request.user:
+        return error_response(
+            request, {'author': 'Нельзя подписаться на самого себя'}
+        )
+    _, created = Follow.objects.get_or_create(
+        user=request.user, author=author
+    )
+    return json_response(
+        request, {'author': author.username, 'following': True},
+        status=201 if created else 200,
+    )
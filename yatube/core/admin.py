@@ -0,0 +1,10 @@
+from django.contrib import admin
+
+from .models import Task
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'name', 'status', 'attempts', 'run_at',)
+    list_filter = ('status', 'name',)
+    search_fields = ('last_error',)
@@ -0,0 +1,144 @@
+"""ASGI-обработчик для Django 2.2, в котором своего ещё нет.
+
+Цикл событий принимает тело запроса и отдаёт ответ клиенту, а сам
+запрос (middleware, представление, итерация и закрытие ответа)
+выполняется целиком в одном потоке пула из ASGI_THREADS: соединения
+с базой привязаны к потоку и закрываются там же, где открылись.
+Медленные клиенты при этом ждут в цикле событий, а не занимают поток.
+После перехода на Django 3.0+ get_asgi_application() отдаёт родной
+обработчик Django, и эта обёртка больше не используется.
+"""
+import asyncio
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.wsgi import get_wsgi_application
+
+_executor = None
+
+
+def executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.ASGI_THREADS, thread_name_prefix='asgi',
+        )
+    return _executor
+
+
+def build_environ(scope, body):
+    """WSGI-окружение для HTTP-соединения ASGI."""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', ''),
+        # WSGI передаёт байты пути строкой в latin-1.
+        'PATH_INFO': scope['path'].encode().decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f'HTTP/{scope.get("http_version", "1.1")}',
+        'REMOTE_ADDR': client[0],
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            name = f'HTTP_{name}'
+        value = value.decode('latin-1')
+        if name in environ:
+            value = f'{environ[name]},{value}'
+        environ[name] = value
+    return environ
+
+
+class ASGIHandler:
+    def __init__(self, wsgi_application):
+        self.wsgi_application = wsgi_application
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            raise ValueError(f'Неподдерживаемое соединение {scope["type"]}')
+        body = await self.read_body(receive)
+        if body is None:
+            return
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(
+            executor(), self.run, build_environ(scope, body), send, loop,
+        )
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def read_body(self, receive):
+        """Тело запроса или None, если клиент отключился раньше."""
+        chunks = []
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return None
+            chunks.append(message.get('body', b''))
+            if not message.get('more_body'):
+                return b''.join(chunks)
+
+    def run(self, environ, send, loop):
+        """Выполняет WSGI-приложение в потоке пула и отправляет ответ."""
+        def push(message):
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        start = {}
+
+        def start_response(status, headers, exc_info=None):
+            start['message'] = {
+                'type': 'http.response.start',
+                'status': int(status.split(' ', 1)[0]),
+                'headers': [
+                    (name.lower().encode('latin-1'), value.encode('latin-1'))
+                    for name, value in headers
+                ],
+            }
+
+        result = self.wsgi_application(environ, start_response)
+        try:
+            for chunk in result:
+                if not chunk:
+                    continue
+                if start:
+                    push(start.pop('message'))
+                push({
+                    'type': 'http.response.body', 'body': chunk,
+                    'more_body': True,
+                })
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+        if start:
+            push(start.pop('message'))
+        push({'type': 'http.response.body', 'body': b''})
+
+
+def get_asgi_application():
+    """Родной обработчик Django 3.0+ или обёртка над WSGI для 2.2."""
+    try:
+        from django.core.asgi import get_asgi_application as native
+    except ImportError:
+        return ASGIHandler(get_wsgi_application())
+    return native()
@@ -0,0 +1,103 @@
+"""Общие помощники для команд-бенчмарков."""
+import math
+
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from posts import syndication
+from posts import urls as posts_urls
+from posts.models import Group, Post
+from users import urls as users_urls
+
+User = get_user_model()
+
+# Эти адреса меняют данные или сессию, их гоняют только по явному флагу.
+UNSAFE = {'posts:profile_follow', 'posts:profile_unfollow', 'users:logout'}
+
+
+def percentile(values, percent):
+    """Перцентиль методом ближайшего ранга, values уже отсортированы."""
+    if not values:
+        return 0.0
+    rank = math.ceil(percent / 100 * len(values))
+    return values[max(rank, 1) - 1]
+
+
+def summarize(timings):
+    """p50/p95/p99 и среднее для списка длительностей в секундах (в мс)."""
+    values = sorted(timings)
+    return {
+        'count': len(values),
+        'mean_ms': sum(values) / len(values) * 1000 if values else 0.0,
+        'p50_ms': percentile(values, 50) * 1000,
+        'p95_ms': percentile(values, 95) * 1000,
+        'p99_ms': percentile(values, 99) * 1000,
+    }
+
+
+def format_summary(name, summary):
+    return (
+        f'{name:<24} n={summary["count"]:<6} '
+        f'mean={summary["mean_ms"]:.3f}ms '
+        f'p50={summary["p50_ms"]:.3f}ms '
+        f'p95={summary["p95_ms"]:.3f}ms '
+        f'p99={summary["p99_ms"]:.3f}ms'
+    )
+
+
+def _change(old, new):
+    if not old:
+        return 'н/д'
+    return f'{(new - old) / old * 100:+.1f}%'
+
+
+def compare(previous, current):
+    """Строки сравнения двух прогонов по p50/p95/p99 и SQL-запросам."""
+    for name in sorted(set(previous) & set(current)):
+        old, new = previous[name], current[name]
+        changes = ' '.join(
+            f'{key[:-3]}={_change(old[key], new[key])}'
+            for key in ('p50_ms', 'p95_ms', 'p99_ms')
+        )
+        yield (
+            f'{name:<24} {changes} '
+            f'sql={old["queries_mean"]:.1f}->{new["queries_mean"]:.1f}'
+        )
+
+
+def route_samples():
+    """Значения параметров адресов, для которых есть данные."""
+    return {
+        'slug': list(Group.objects.filter(
+            posts_count__gt=0
+        ).values_list('slug', flat=True)[:200]),
+        'username': list(User.objects.filter(
+            profile__posts_count__gt=0
+        ).order_by('-profile__posts_count').values_list(
+            'username', flat=True
+        )[:200]),
+        'post_id': list(Post.objects.order_by('-pub_date').values_list(
+            'pk', flat=True
+        )[:1000]),
+        'fmt': list(syndication.FORMATS),
+    }
+
+
+def routes(unsafe=False):
+    """Имена адресов posts.urls и users.urls с именами их параметров."""
+    for module in (posts_urls, users_urls):
+        for pattern in module.urlpatterns:
+            name = f'{module.app_name}:{pattern.name}'
+            if name in UNSAFE and not unsafe:
+                continue
+            yield name, list(pattern.pattern.converters)
+
+
+def sample_url(rng, name, params, samples):
+    """Адрес со случайными параметрами или None, если их нет в данных."""
+    kwargs = {}
+    for param in params:
+        if not samples.get(param):
+            return None
+        kwargs[param] = rng.choice(samples[param])
+    return reverse(name, kwargs=kwargs)
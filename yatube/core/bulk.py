@@ -0,0 +1,32 @@
+"""Помощники для массовой загрузки данных через bulk_create."""
+from contextlib import contextmanager
+from itertools import islice
+
+
+def batched(iterable, size):
+    """Разбивает поток объектов на списки не длиннее size."""
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+@contextmanager
+def explicit_dates(*fields):
+    """Отключает auto_now/auto_now_add, чтобы сохранить свои даты.
+
+    Поля передаются как (Model, 'name').
+    """
+    saved = []
+    for model, name in fields:
+        field = model._meta.get_field(name)
+        saved.append((field, field.auto_now, field.auto_now_add))
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now = auto_now
+            field.auto_now_add = auto_now_add
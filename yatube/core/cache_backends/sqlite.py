@@ -0,0 +1,244 @@
+"""Кэш в файле SQLite в режиме WAL с ограниченным размером и LRU.
+
+В отличие от FileBasedCache чтение — это один SELECT по первичному ключу,
+а не открытие файла, и вытеснение не обходит весь каталог: самые старые
+по времени обращения записи удаляются по индексу. Счётчик записей
+поддерживается триггерами, поэтому проверка размера тоже не сканирует
+таблицу. Файл можно разделять между процессами-воркерами.
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS cache ('
+    ' key TEXT PRIMARY KEY,'
+    ' value BLOB NOT NULL,'
+    ' expires REAL,'
+    ' accessed REAL NOT NULL'
+    ') WITHOUT ROWID',
+    'CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)',
+    'CREATE TABLE IF NOT EXISTS cache_size (n INTEGER NOT NULL)',
+    'INSERT INTO cache_size (n) SELECT 0'
+    ' WHERE NOT EXISTS (SELECT 1 FROM cache_size)',
+    'CREATE TRIGGER IF NOT EXISTS cache_inserted AFTER INSERT ON cache'
+    ' BEGIN UPDATE cache_size SET n = n + 1; END',
+    'CREATE TRIGGER IF NOT EXISTS cache_deleted AFTER DELETE ON cache'
+    ' BEGIN UPDATE cache_size SET n = n - 1; END',
+)
+
+UPSERT = (
+    'INSERT INTO cache (key, value, expires, accessed) VALUES (?, ?, ?, ?)'
+    ' ON CONFLICT (key) DO UPDATE SET value = excluded.value,'
+    ' expires = excluded.expires, accessed = excluded.accessed'
+)
+
+
+class SQLiteCache(BaseCache):
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._path = os.path.abspath(location)
+        # Время обращения обновляется не чаще раза в эту величину секунд,
+        # чтобы чтение почти никогда не превращалось в запись.
+        self._access_resolution = float(
+            options.get('ACCESS_RESOLUTION', 1.0)
+        )
+        self._busy_timeout = float(options.get('BUSY_TIMEOUT', 5.0))
+        self._local = threading.local()
+
+    def _connection(self):
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            directory = os.path.dirname(self._path)
+            os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(
+                self._path,
+                timeout=self._busy_timeout,
+                isolation_level=None,
+                check_same_thread=False,
+            )
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute('BEGIN IMMEDIATE')
+            for statement in SCHEMA:
+                connection.execute(statement)
+            connection.execute('COMMIT')
+            local.connection = connection
+            local.pid = os.getpid()
+        return local.connection
+
+    @contextmanager
+    def _transaction(self):
+        # BEGIN IMMEDIATE сразу берёт блокировку на запись, поэтому чтение
+        # и запись внутри транзакции атомарны для всех процессов.
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            yield connection
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+
+    def _dumps(self, value):
+        return pickle.dumps(value, self.pickle_protocol)
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _fetch(self, keys):
+        """Живые значения по ключам с ленивым обновлением LRU."""
+        connection = self._connection()
+        now = time.time()
+        found = {}
+        stale = []
+        expired = []
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            rows = connection.execute(
+                'SELECT key, value, expires, accessed FROM cache'
+                ' WHERE key IN ({})'.format(','.join('?' * len(chunk))),
+                chunk,
+            )
+            for key, value, expires, accessed in rows:
+                if expires is not None and expires <= now:
+                    expired.append((key,))
+                    continue
+                found[key] = pickle.loads(value)
+                if now - accessed >= self._access_resolution:
+                    stale.append((now, key))
+        if stale or expired:
+            with self._transaction() as connection:
+                connection.executemany(
+                    'UPDATE cache SET accessed = ? WHERE key = ?', stale
+                )
+                connection.executemany(
+                    'DELETE FROM cache WHERE key = ?', expired
+                )
+        return found
+
+    def _store(self, items, timeout):
+        expires = self.get_backend_timeout(timeout)
+        now = time.time()
+        with self._transaction() as connection:
+            connection.executemany(
+                UPSERT,
+                [(key, self._dumps(value), expires, now)
+                 for key, value in items],
+            )
+            self._cull(connection)
+
+    def _cull(self, connection):
+        size, = connection.execute('SELECT n FROM cache_size').fetchone()
+        if size <= self._max_entries:
+            return
+        if self._cull_frequency == 0:
+            connection.execute('DELETE FROM cache')
+            return
+        excess = size - self._max_entries
+        victims = max(excess, size // self._cull_frequency)
+        connection.execute(
+            'DELETE FROM cache WHERE key IN'
+            ' (SELECT key FROM cache ORDER BY accessed LIMIT ?)',
+            (victims,),
+        )
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        with self._transaction() as connection:
+            connection.execute(
+                'DELETE FROM cache WHERE key = ? AND expires <= ?',
+                (key, now),
+            )
+            cursor = connection.execute(
+                'INSERT OR IGNORE INTO cache (key, value, expires, accessed)'
+                ' VALUES (?, ?, ?, ?)',
+                (key, self._dumps(value),
+                 self.get_backend_timeout(timeout), now),
+            )
+            if cursor.rowcount:
+                self._cull(connection)
+        return bool(cursor.rowcount)
+
+    def get(self, key, default=None, version=None):
+        key = self._key(key, version)
+        return self._fetch([key]).get(key, default)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self._store([(self._key(key, version), value)], timeout)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        with self._transaction() as connection:
+            cursor = connection.execute(
+                'UPDATE cache SET expires = ?, accessed = ?'
+                ' WHERE key = ? AND (expires IS NULL OR expires > ?)',
+                (self.get_backend_timeout(timeout), now, key, now),
+            )
+        return bool(cursor.rowcount)
+
+    def delete(self, key, version=None):
+        key = self._key(key, version)
+        with self._transaction() as connection:
+            connection.execute('DELETE FROM cache WHERE key = ?', (key,))
+
+    def has_key(self, key, version=None):
+        key = self._key(key, version)
+        row = self._connection().execute(
+            'SELECT 1 FROM cache WHERE key = ?'
+            ' AND (expires IS NULL OR expires > ?)',
+            (key, time.time()),
+        ).fetchone()
+        return row is not None
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        with self._transaction() as connection:
+            row = connection.execute(
+                'SELECT value FROM cache WHERE key = ?'
+                ' AND (expires IS NULL OR expires > ?)',
+                (key, time.time()),
+            ).fetchone()
+            if row is None:
+                raise ValueError("Key '%s' not found" % key)
+            new_value = pickle.loads(row[0]) + delta
+            connection.execute(
+                'UPDATE cache SET value = ?, accessed = ? WHERE key = ?',
+                (self._dumps(new_value), time.time(), key),
+            )
+        return new_value
+
+    def get_many(self, keys, version=None):
+        keys_map = {self._key(key, version): key for key in keys}
+        found = self._fetch(list(keys_map))
+        return {keys_map[key]: value for key, value in found.items()}
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        self._store(
+            [(self._key(key, version), value) for key, value in data.items()],
+            timeout,
+        )
+        return []
+
+    def delete_many(self, keys, version=None):
+        with self._transaction() as connection:
+            connection.executemany(
+                'DELETE FROM cache WHERE key = ?',
+                [(self._key(key, version),) for key in keys],
+            )
+
+    def clear(self):
+        with self._transaction() as connection:
+            connection.execute('DELETE FROM cache')
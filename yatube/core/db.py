@@ -0,0 +1,108 @@
+"""Чтение с реплик и постоянные соединения с проверкой живости.
+
+ReplicaRouter отправляет чтение на реплики только внутри представлений
+из REPLICA_VIEWS (их отмечает ReplicaMiddleware), всё остальное — на
+основную базу. Если запрос что-то записал, пользователь получает куку
+REPLICA_STICKY_COOKIE и следующие REPLICA_STICKY_SECONDS секунд читает
+с основной базы, то есть видит свои изменения, даже пока реплики
+догоняют. Недоступная реплика исключается до следующей проверки.
+"""
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+_state = threading.local()
+_health = {}
+
+
+def replica_is_healthy(alias):
+    """Результат проверки реплики, не чаще раза в REPLICA_HEALTH_INTERVAL."""
+    healthy, checked = _health.get(alias, (True, 0.0))
+    now = time.monotonic()
+    if now - checked < settings.REPLICA_HEALTH_INTERVAL:
+        return healthy
+    try:
+        with connections[alias].cursor() as cursor:
+            cursor.execute('SELECT 1')
+        healthy = True
+    except Exception:
+        healthy = False
+    _health[alias] = (healthy, now)
+    return healthy
+
+
+def close_unusable_connections(**kwargs):
+    """Закрывает постоянные соединения, которые перестали отвечать."""
+    for connection in connections.all():
+        if connection.connection is not None and not connection.is_usable():
+            connection.close()
+
+
+def reset():
+    _state.replicas = False
+    _state.wrote = False
+
+
+def wrote():
+    return getattr(_state, 'wrote', False)
+
+
+def snapshot():
+    """Состояние маршрутизации текущего потока, чтобы передать его другому."""
+    return getattr(_state, 'replicas', False), wrote()
+
+
+def restore(state):
+    _state.replicas, _state.wrote = state
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if not getattr(_state, 'replicas', False) or wrote():
+            return DEFAULT_DB_ALIAS
+        replicas = [
+            alias for alias in settings.DATABASE_REPLICAS
+            if replica_is_healthy(alias)
+        ]
+        if not replicas:
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        _state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики содержат те же данные, что и основная база.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicaMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        reset()
+        try:
+            response = self.get_response(request)
+            if wrote():
+                response.set_cookie(
+                    settings.REPLICA_STICKY_COOKIE, '1',
+                    max_age=settings.REPLICA_STICKY_SECONDS, httponly=True,
+                )
+        finally:
+            reset()
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        _state.replicas = (
+            request.method in ('GET', 'HEAD')
+            and request.resolver_match.view_name in settings.REPLICA_VIEWS
+            and settings.REPLICA_STICKY_COOKIE not in request.COOKIES
+        )
@@ -0,0 +1,87 @@
+"""Почта через очередь задач.
+
+QueuedEmailBackend только сохраняет письма задачами, а отправляет их
+воркер run_tasks через настоящий бэкенд TASK_EMAIL_BACKEND, так что
+запрос не ждёт почтовый сервер и письмо переживает его сбой.
+"""
+import base64
+from email import message_from_bytes
+from email.mime.base import MIMEBase
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+
+from .tasks import task
+
+
+def serialize(message):
+    data = {
+        'subject': message.subject,
+        'body': message.body,
+        'from_email': message.from_email,
+        'to': message.to,
+        'cc': message.cc,
+        'bcc': message.bcc,
+        'reply_to': message.reply_to,
+        'headers': message.extra_headers,
+        'attachments': [],
+        'alternatives': getattr(message, 'alternatives', []),
+    }
+    for attachment in message.attachments:
+        if isinstance(attachment, MIMEBase):
+            # attach(MIMEBase(...)) хранит готовую часть письма целиком.
+            data['attachments'].append({
+                'mime': base64.b64encode(attachment.as_bytes()).decode(),
+            })
+            continue
+        filename, content, mimetype = attachment
+        if isinstance(content, str):
+            content = content.encode()
+        data['attachments'].append(
+            [filename, base64.b64encode(content).decode(), mimetype]
+        )
+    return data
+
+
+def _mime_part(raw):
+    """MIMEBase из байтов части: attach() принимает только MIMEBase."""
+    parsed = message_from_bytes(raw)
+    part = MIMEBase(*parsed.get_content_type().split('/'))
+    del part['Content-Type']
+    del part['MIME-Version']
+    for name, value in parsed.items():
+        part[name] = value
+    part.set_payload(parsed.get_payload())
+    return part
+
+
+def deserialize(data):
+    message = EmailMultiAlternatives(
+        subject=data['subject'], body=data['body'],
+        from_email=data['from_email'], to=data['to'], cc=data['cc'],
+        bcc=data['bcc'], reply_to=data['reply_to'],
+        headers=data['headers'],
+        alternatives=[tuple(item) for item in data['alternatives']],
+    )
+    for attachment in data['attachments']:
+        if isinstance(attachment, dict):
+            message.attach(_mime_part(base64.b64decode(attachment['mime'])))
+            continue
+        filename, content, mimetype = attachment
+        message.attach(filename, base64.b64decode(content), mimetype)
+    return message
+
+
+@task
+def deliver(data):
+    get_connection(settings.TASK_EMAIL_BACKEND).send_messages(
+        [deserialize(data)]
+    )
+
+
+class QueuedEmailBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        for message in email_messages:
+            deliver.delay(serialize(message))
+        return len(email_messages)
@@ -0,0 +1,115 @@
+import random
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from core.benchmark import route_samples, routes, sample_url
+
+User = get_user_model()
+
+FULL_SCAN = 'SCAN'
+TEMP_SORT = 'USE TEMP B-TREE'
+# Аудит меряет запросы с пустым кэшем. Свой locmem-кэш не даёт ему
+# стереть общий кэш страниц и фрагментов на работающем сервере.
+AUDIT_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'audit_indexes',
+    },
+}
+
+
+def problems(plan):
+    """Строки плана с полным сканированием таблицы или сортировкой."""
+    for row in plan:
+        detail = row[-1]
+        if detail.startswith(TEMP_SORT):
+            yield detail
+        elif (detail.startswith(FULL_SCAN) and ' USING ' not in detail
+              and 'VIRTUAL TABLE' not in detail):
+            yield detail
+
+
+class Command(BaseCommand):
+    help = (
+        'Выполняет EXPLAIN QUERY PLAN для SQL-запросов каждого представления '
+        'и отмечает полные сканирования и сортировки во временном B-дереве'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', help='Пользователь, от имени которого идут запросы',
+        )
+        parser.add_argument(
+            '--ignore', nargs='*', default=['django_session', 'posts_group'],
+            help='Таблицы, сканирование которых допустимо (маленькие)',
+        )
+        parser.add_argument(
+            '--fail', action='store_true',
+            help='Завершиться ошибкой, если найдены проблемы',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+
+    def client(self, username):
+        client = Client()
+        if username:
+            user = User.objects.filter(username=username).first()
+        else:
+            user = User.objects.order_by('-profile__following_count').first()
+        if user is not None:
+            client.force_login(user)
+        return client
+
+    def audit(self, client, path, ignore):
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            client.get(path)
+        seen = set()
+        for query in context.captured_queries:
+            sql = query['sql']
+            if not sql.startswith('SELECT') or sql in seen:
+                continue
+            seen.add(sql)
+            with connection.cursor() as cursor:
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+                plan = cursor.fetchall()
+            found = [
+                detail for detail in problems(plan)
+                if not any(table in detail.split() for table in ignore)
+            ]
+            if found:
+                yield sql, found
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('EXPLAIN QUERY PLAN есть только у SQLite')
+        with override_settings(CACHES=AUDIT_CACHES):
+            self.run(options)
+
+    def run(self, options):
+        rng = random.Random(options['seed'])
+        samples = route_samples()
+        client = self.client(options['user'])
+        total = 0
+        for name, params in routes():
+            path = sample_url(rng, name, params, samples)
+            if path is None:
+                self.stdout.write(f'{name}: нет данных для параметров')
+                continue
+            issues = list(self.audit(client, path, options['ignore']))
+            if not issues:
+                self.stdout.write(self.style.SUCCESS(f'{name}: ok'))
+                continue
+            total += len(issues)
+            self.stdout.write(self.style.WARNING(f'{name} ({path}):'))
+            for sql, found in issues:
+                self.stdout.write(f'  {sql[:200]}')
+                for detail in found:
+                    self.stdout.write(f'    -> {detail}')
+        if total and options['fail']:
+            raise CommandError(f'Проблемных запросов: {total}')
+        self.stdout.write(f'Проблемных запросов: {total}')
@@ -0,0 +1,238 @@
+import asyncio
+import json
+import os
+import random
+import time
+from contextlib import ExitStack
+from io import BytesIO
+from wsgiref.util import setup_testing_defaults
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client
+from django.utils import timezone
+
+from core import metrics
+from core.benchmark import (compare, format_summary, route_samples, routes,
+                            sample_url, summarize)
+from core.metrics import RequestStats
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Гоняет все адреса posts.urls и users.urls через WSGI- или '
+        'ASGI-приложение и сохраняет p50/p95/p99 и число SQL-запросов '
+        'на ответ'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests', type=int, default=50,
+            help='Запросов на каждый адрес',
+        )
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument(
+            '--user', help='Пользователь, от имени которого идут запросы',
+        )
+        parser.add_argument(
+            '--anonymous', action='store_true',
+            help='Запросы без входа в систему',
+        )
+        parser.add_argument('--unsafe', action='store_true')
+        parser.add_argument(
+            '--asgi', action='store_true',
+            help='Запросы через yatube.asgi вместо yatube.wsgi',
+        )
+        parser.add_argument(
+            '--concurrency', type=int, default=1,
+            help='Одновременных запросов в режиме --asgi',
+        )
+        parser.add_argument('--label', default='')
+        parser.add_argument(
+            '--output', default=os.path.join(settings.BASE_DIR, 'benchmarks'),
+            help='Каталог для JSON с результатами',
+        )
+        parser.add_argument(
+            '--compare', help='JSON прошлого прогона для сравнения',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+
+    def session_cookie(self, options):
+        if options['anonymous']:
+            return ''
+        if options['user']:
+            user = User.objects.filter(username=options['user']).first()
+            if user is None:
+                raise CommandError(f'Нет пользователя {options["user"]}')
+        else:
+            user = User.objects.order_by('-profile__following_count').first()
+        if user is None:
+            return ''
+        client = Client()
+        client.force_login(user)
+        self.stdout.write(f'Запросы от имени {user.username}')
+        return (
+            f'{settings.SESSION_COOKIE_NAME}='
+            f'{client.cookies[settings.SESSION_COOKIE_NAME].value}'
+        )
+
+    def request(self, path, cookie):
+        """Один GET через yatube.wsgi: (статус, секунды, SQL-запросы)."""
+        from yatube.wsgi import application
+
+        environ = {
+            'REQUEST_METHOD': 'GET',
+            'PATH_INFO': path,
+            'QUERY_STRING': '',
+            'wsgi.input': BytesIO(),
+        }
+        setup_testing_defaults(environ)
+        if cookie:
+            environ['HTTP_COOKIE'] = cookie
+        statuses = []
+        stats = RequestStats()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(stats))
+            result = application(
+                environ, lambda status, headers, *args: statuses.append(status)
+            )
+            try:
+                for _ in result:
+                    pass
+            finally:
+                if hasattr(result, 'close'):
+                    result.close()
+        duration = time.perf_counter() - started
+        return int(statuses[0].split()[0]), duration, stats.queries
+
+    async def request_asgi(self, path, cookie):
+        """Один GET через yatube.asgi: (статус, секунды)."""
+        from yatube.asgi import application
+
+        headers = [(b'host', b'testserver')]
+        if cookie:
+            headers.append((b'cookie', cookie.encode('latin-1')))
+        scope = {
+            'type': 'http', 'method': 'GET', 'path': path,
+            'query_string': b'', 'headers': headers,
+            'server': ('testserver', 80), 'client': ('127.0.0.1', 0),
+        }
+        statuses = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': b''}
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                statuses.append(message['status'])
+
+        started = time.perf_counter()
+        await application(scope, receive, send)
+        return statuses[0], time.perf_counter() - started
+
+    async def batch_asgi(self, paths, cookie):
+        return await asyncio.gather(
+            *(self.request_asgi(path, cookie) for path in paths)
+        )
+
+    def measure(self, name, params, samples, cookie, count, options):
+        """count ответов: [(статус, секунды, SQL-запросы или None)].
+
+        В режиме ASGI запросы выполняются в чужих потоках, поэтому число
+        SQL-запросов считает MetricsMiddleware, а не обёртка здесь.
+        """
+        measured = []
+        while len(measured) < count:
+            size = options['concurrency'] if options['asgi'] else 1
+            paths = [
+                sample_url(self.rng, name, params, samples)
+                for _ in range(min(size, count - len(measured)))
+            ]
+            if None in paths:
+                return None
+            if options['asgi']:
+                measured += [
+                    (status, duration, None) for status, duration in
+                    asyncio.run(self.batch_asgi(paths, cookie))
+                ]
+            else:
+                measured.append(self.request(paths[0], cookie))
+        return measured
+
+    def run(self, name, params, samples, cookie, options):
+        if self.measure(
+            name, params, samples, cookie, options['warmup'], options
+        ) is None:
+            return None
+        before = metrics.DB_QUERIES.totals(name)
+        measured = self.measure(
+            name, params, samples, cookie, options['requests'], options
+        )
+        if measured is None:
+            return None
+        statuses = {}
+        for status, _, _ in measured:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+        result = summarize([duration for _, duration, _ in measured])
+        if options['asgi']:
+            total, count = metrics.DB_QUERIES.totals(name)
+            result['queries_mean'] = (
+                (total - before[0]) / (count - before[1])
+                if count > before[1] else 0.0
+            )
+        else:
+            queries = [count for _, _, count in measured]
+            result['queries_mean'] = sum(queries) / len(queries)
+            result['queries_max'] = max(queries)
+        result['statuses'] = statuses
+        return result
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1:
+            raise CommandError('--requests должно быть больше нуля')
+        if options['concurrency'] < 1:
+            raise CommandError('--concurrency должно быть больше нуля')
+        self.rng = random.Random(options['seed'])
+        samples = route_samples()
+        cookie = self.session_cookie(options)
+        results = {}
+        for name, params in routes(options['unsafe']):
+            result = self.run(name, params, samples, cookie, options)
+            if result is None:
+                self.stdout.write(f'{name}: нет данных для параметров')
+                continue
+            results[name] = result
+            self.stdout.write(
+                f'{format_summary(name, result)} '
+                f'sql={result["queries_mean"]:.1f} '
+                f'статусы={result["statuses"]}'
+            )
+        run = {
+            'label': options['label'],
+            'created': timezone.now().isoformat(),
+            'requests': options['requests'],
+            'anonymous': options['anonymous'],
+            'server': 'asgi' if options['asgi'] else 'wsgi',
+            'concurrency': options['concurrency'] if options['asgi'] else 1,
+            'results': results,
+        }
+        os.makedirs(options['output'], exist_ok=True)
+        path = os.path.join(
+            options['output'],
+            f'{timezone.now():%Y%m%d-%H%M%S}'
+            f'{"-" + options["label"] if options["label"] else ""}.json',
+        )
+        with open(path, 'w') as file:
+            json.dump(run, file, ensure_ascii=False, indent=2)
+        self.stdout.write(self.style.SUCCESS(f'Результаты: {path}'))
+        if options['compare']:
+            with open(options['compare']) as file:
+                previous = json.load(file)
+            for line in compare(previous['results'], results):
+                self.stdout.write(line)
@@ -0,0 +1,83 @@
+import os
+import random
+import tempfile
+import time
+from shutil import rmtree
+
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.urls import reverse
+
+from core.benchmark import format_summary, summarize
+from core.cache_backends.sqlite import SQLiteCache
+
+CARDS_PER_PAGE = 10
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает FileBasedCache и SQLiteCache на нагрузке главной '
+        'страницы: токены карточек через get_many и срез страницы'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=5000)
+        parser.add_argument(
+            '--pages', type=int, default=200,
+            help='Число различных страниц (курсоров) в нагрузке',
+        )
+        parser.add_argument('--max-entries', type=int, default=1000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def sample_page(self):
+        """Отрендеренная главная страница как типичное значение в кэше."""
+        try:
+            response = Client().get(reverse('posts:index'))
+        except Exception:
+            response = None
+        if response is not None and response.status_code == 200:
+            return response.content.decode()
+        return 'x' * 30000
+
+    def run_workload(self, cache, page, options):
+        rng = random.Random(options['seed'])
+        timings = []
+        for _ in range(options['requests']):
+            # Популярность страниц подчиняется степенному закону: первые
+            # страницы ленты читают гораздо чаще глубоких.
+            number = min(int(rng.paretovariate(1.2)), options['pages'])
+            started = time.perf_counter()
+            cache.get_many(
+                [f'version:post:{number * CARDS_PER_PAGE + card}'
+                 for card in range(CARDS_PER_PAGE)]
+            )
+            if cache.get(f'page:posts:index:{number}') is None:
+                cache.set(f'page:posts:index:{number}', page, 3600)
+                cache.set_many(
+                    {f'version:post:{number * CARDS_PER_PAGE + card}': card
+                     for card in range(CARDS_PER_PAGE)},
+                    None,
+                )
+            timings.append(time.perf_counter() - started)
+        return timings
+
+    def handle(self, *args, **options):
+        page = self.sample_page()
+        self.stdout.write(f'Размер значения страницы: {len(page)} символов')
+        params = {'OPTIONS': {'MAX_ENTRIES': options['max_entries']}}
+        directory = tempfile.mkdtemp()
+        try:
+            backends = {
+                'FileBasedCache': FileBasedCache(
+                    os.path.join(directory, 'files'), params
+                ),
+                'SQLiteCache': SQLiteCache(
+                    os.path.join(directory, 'cache.sqlite3'), params
+                ),
+            }
+            for name, cache in backends.items():
+                summary = summarize(self.run_workload(cache, page, options))
+                self.stdout.write(format_summary(name, summary))
+        finally:
+            rmtree(directory, ignore_errors=True)
@@ -0,0 +1,49 @@
+import os
+import socket
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.utils import timezone
+
+from core import tasks
+from core.models import Task
+
+
+class Command(BaseCommand):
+    help = 'Воркер очереди фоновых задач core.tasks'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Выполнить готовые задачи и завершиться',
+        )
+        parser.add_argument(
+            '--sleep', type=float, default=settings.TASK_POLL_INTERVAL,
+            help='Пауза в секундах, когда очередь пуста',
+        )
+        parser.add_argument(
+            '--retry-failed', action='store_true',
+            help='Вернуть в очередь задачи, исчерпавшие попытки',
+        )
+
+    def handle(self, *args, **options):
+        worker = f'{socket.gethostname()}:{os.getpid()}'
+        if options['retry_failed']:
+            count = Task.objects.filter(status=Task.FAILED).update(
+                status=Task.PENDING, attempts=0, run_at=timezone.now(),
+            )
+            self.stdout.write(f'Возвращено в очередь: {count}')
+        while True:
+            close_old_connections()
+            stale = tasks.requeue_stale()
+            if stale:
+                self.stderr.write(f'Зависших задач возвращено: {stale}')
+            done, failed = tasks.work_off(worker)
+            if done or failed:
+                self.stdout.write(f'Выполнено: {done}, с ошибкой: {failed}')
+            if options['once']:
+                return
+            if not done and not failed:
+                time.sleep(options['sleep'])
@@ -0,0 +1,150 @@
+"""Гистограммы стоимости запросов по представлениям.
+
+MetricsMiddleware заводит на каждый запрос RequestStats: через
+connection.execute_wrapper он считает SQL-запросы и время в базе,
+а бэкенд шаблонов core.template_backends добавляет время рендеринга.
+Итог раскладывается по гистограммам с меткой view (posts:index, …),
+которые отдаются в текстовом формате Prometheus. Значения живут
+в памяти процесса, поэтому каждый воркер экспортирует свои.
+"""
+import threading
+import time
+
+SECONDS_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class Histogram:
+    def __init__(self, name, documentation, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, view, value):
+        with self._lock:
+            series = self._series.setdefault(
+                view, {'buckets': [0] * len(self.buckets), 'sum': 0,
+                       'count': 0}
+            )
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series['buckets'][index] += 1
+            series['sum'] += value
+            series['count'] += 1
+
+    def totals(self, view):
+        """Сумма и число наблюдений view."""
+        with self._lock:
+            series = self._series.get(view, {'sum': 0, 'count': 0})
+            return series['sum'], series['count']
+
+    def reset(self):
+        with self._lock:
+            self._series = {}
+
+    def render(self):
+        lines = [
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} histogram',
+        ]
+        with self._lock:
+            snapshot = sorted(
+                (view, dict(series, buckets=list(series['buckets'])))
+                for view, series in self._series.items()
+            )
+        for view, series in snapshot:
+            label = view.replace('\\', '\\\\').replace('"', '\\"')
+            bounds = [str(bound) for bound in self.buckets] + ['+Inf']
+            counts = series['buckets'] + [series['count']]
+            for bound, count in zip(bounds, counts):
+                lines.append(
+                    f'{self.name}_bucket{{view="{label}",le="{bound}"}}'
+                    f' {count}'
+                )
+            lines.append(
+                f'{self.name}_sum{{view="{label}"}} {series["sum"]}'
+            )
+            lines.append(
+                f'{self.name}_count{{view="{label}"}} {series["count"]}'
+            )
+        return lines
+
+
+REQUEST_SECONDS = Histogram(
+    'yatube_request_duration_seconds', 'Время ответа', SECONDS_BUCKETS,
+)
+DB_QUERIES = Histogram(
+    'yatube_db_queries', 'SQL-запросов на ответ', QUERY_BUCKETS,
+)
+DB_SECONDS = Histogram(
+    'yatube_db_duration_seconds', 'Время в базе на ответ', SECONDS_BUCKETS,
+)
+TEMPLATE_SECONDS = Histogram(
+    'yatube_template_render_seconds', 'Время рендеринга шаблонов на ответ',
+    SECONDS_BUCKETS,
+)
+HISTOGRAMS = (REQUEST_SECONDS, DB_QUERIES, DB_SECONDS, TEMPLATE_SECONDS)
+
+
+class RequestStats:
+    """Счётчики одного запроса; сам является обёрткой execute_wrapper."""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        # Запросы из core.parallel.gather идут из нескольких потоков.
+        self._lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            with self._lock:
+                self.db_time += duration
+                self.queries += 1
+
+
+_local = threading.local()
+
+
+def start():
+    _local.stats = RequestStats()
+    return _local.stats
+
+
+def finish():
+    _local.stats = None
+
+
+def current():
+    return getattr(_local, 'stats', None)
+
+
+def record(view, stats, duration):
+    REQUEST_SECONDS.observe(view, duration)
+    DB_QUERIES.observe(view, stats.queries)
+    DB_SECONDS.observe(view, stats.db_time)
+    TEMPLATE_SECONDS.observe(view, stats.template_time)
+
+
+def reset():
+    for histogram in HISTOGRAMS:
+        histogram.reset()
+
+
+def render():
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines += histogram.render()
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,54 @@
+import logging
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unresolved'
+    return match.view_name
+
+
+class MetricsMiddleware:
+    """Записывает время ответа, число и время SQL-запросов по view.
+
+    Если запросов больше, чем указано для view в QUERY_BUDGETS, пишет
+    предупреждение, а при QUERY_BUDGET_STRICT выбрасывает исключение.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = metrics.start()
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(stats))
+                response = self.get_response(request)
+        finally:
+            metrics.finish()
+        view = view_name(request)
+        metrics.record(view, stats, time.perf_counter() - start)
+        self.check_budget(view, stats)
+        return response
+
+    def check_budget(self, view, stats):
+        budget = settings.QUERY_BUDGETS.get(view)
+        if budget is None or stats.queries <= budget:
+            return
+        message = (
+            f'{view}: {stats.queries} SQL-запросов при бюджете {budget}'
+        )
+        if settings.QUERY_BUDGET_STRICT:
+            raise metrics.QueryBudgetExceeded(message)
+        logger.warning(message)
@@ -0,0 +1,62 @@
+"""Одновременное выполнение независимых запросов к базе.
+
+gather() запускает функции в пуле из CONCURRENT_QUERY_THREADS потоков.
+У каждого потока своё соединение, так что, например, страница постов
+и состояние подписки в profile читаются параллельно. Потоки получают
+маршрутизацию реплик и обёртки execute_wrapper вызывающего потока,
+поэтому метрики и бюджеты запросов учитывают их SQL. Внутри транзакции
+чужие соединения не видят её изменений, и там функции, как и при
+CONCURRENT_QUERY_THREADS = 0, выполняются по очереди.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, close_old_connections, connections
+
+from . import db
+
+_executor = None
+
+
+def executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.CONCURRENT_QUERY_THREADS,
+            thread_name_prefix='query',
+        )
+    return _executor
+
+
+def _in_transaction():
+    return any(
+        connection.in_atomic_block for connection in connections.all()
+    )
+
+
+def _call(func, state, wrappers):
+    db.restore(state)
+    close_old_connections()
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                for wrapper in wrappers:
+                    stack.enter_context(connection.execute_wrapper(wrapper))
+            return func()
+    finally:
+        close_old_connections()
+        db.reset()
+
+
+def gather(*funcs):
+    """Результаты вызовов funcs в том же порядке."""
+    if (len(funcs) < 2 or not settings.CONCURRENT_QUERY_THREADS
+            or _in_transaction()):
+        return [func() for func in funcs]
+    state = db.snapshot()
+    wrappers = list(connections[DEFAULT_DB_ALIAS].execute_wrappers)
+    futures = [
+        executor().submit(_call, func, state, wrappers) for func in funcs
+    ]
+    return [future.result() for future in futures]
@@ -0,0 +1,130 @@
+"""Очередь фоновых задач в базе данных.
+
+Функция с декоратором @task получает метод delay(): вызов сохраняется
+строкой Task в текущей транзакции, если она открыта, и тогда её откат
+отменяет и задачу. ATOMIC_REQUESTS выключен, так что запрос транзакцией
+не обёрнут: задачу, которая имеет смысл только после сохранения записи,
+ставят из transaction.on_commit после save() (см. users.models).
+Команда run_tasks забирает задачи условным UPDATE, повторяет упавшие
+с экспоненциальной задержкой до max_attempts попыток и возвращает
+в очередь задачи воркеров, пропавших дольше чем на TASK_LOCK_TIMEOUT.
+Аргументы задач должны сериализоваться в JSON.
+"""
+import json
+import traceback
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Task
+
+
+def task_name(func):
+    return f'{func.__module__}.{func.__qualname__}'
+
+
+def enqueue(func, args=(), kwargs=None, max_attempts=None):
+    """Ставит вызов func(*args, **kwargs) в очередь."""
+    kwargs = kwargs or {}
+    if settings.TASKS_EAGER:
+        transaction.on_commit(lambda: func(*args, **kwargs))
+        return None
+    return Task.objects.create(
+        name=task_name(func),
+        payload=json.dumps([list(args), kwargs], cls=DjangoJSONEncoder),
+        max_attempts=max_attempts or settings.TASK_MAX_ATTEMPTS,
+    )
+
+
+def task(func=None, *, max_attempts=None):
+    """Добавляет функции метод delay() с теми же аргументами.
+
+    Сама функция остаётся обычной: её можно вызвать напрямую или
+    передать в пул процессов.
+    """
+    def decorate(func):
+        @wraps(func)
+        def delay(*args, **kwargs):
+            return enqueue(func, args, kwargs, max_attempts)
+
+        func.delay = delay
+        return func
+    return decorate if func is None else decorate(func)
+
+
+def backoff(attempts):
+    """Задержка перед попыткой номер attempts + 1, в секундах."""
+    return min(
+        settings.TASK_RETRY_DELAY * 2 ** (attempts - 1),
+        settings.TASK_RETRY_MAX_DELAY,
+    )
+
+
+def requeue_stale():
+    """Возвращает в очередь задачи, воркер которых не отвечает."""
+    deadline = timezone.now() - timedelta(seconds=settings.TASK_LOCK_TIMEOUT)
+    return Task.objects.filter(
+        status=Task.RUNNING, locked_at__lt=deadline
+    ).update(status=Task.PENDING, locked_by='', locked_at=None)
+
+
+def claim(worker):
+    """Забирает следующую готовую задачу или возвращает None."""
+    now = timezone.now()
+    ready = Task.objects.filter(
+        status=Task.PENDING, run_at__lte=now
+    ).order_by('run_at', 'pk')
+    for task in ready[:10]:
+        claimed = Task.objects.filter(
+            pk=task.pk, status=Task.PENDING
+        ).update(
+            status=Task.RUNNING, locked_by=worker, locked_at=now,
+            attempts=F('attempts') + 1,
+        )
+        if claimed:
+            task.status = Task.RUNNING
+            task.attempts += 1
+            return task
+    return None
+
+
+def run(task):
+    """Выполняет задачу; возвращает True, если она прошла успешно."""
+    try:
+        func = import_string(task.name)
+        args, kwargs = json.loads(task.payload)
+        func(*args, **kwargs)
+    except Exception:
+        failed = task.attempts >= task.max_attempts
+        Task.objects.filter(pk=task.pk).update(
+            status=Task.FAILED if failed else Task.PENDING,
+            run_at=timezone.now() + timedelta(
+                seconds=backoff(task.attempts)
+            ),
+            locked_by='',
+            locked_at=None,
+            last_error=traceback.format_exc(),
+        )
+        return False
+    Task.objects.filter(pk=task.pk).delete()
+    return True
+
+
+def work_off(worker, limit=None):
+    """Выполняет готовые задачи, пока они есть; возвращает (ок, ошибки)."""
+    done = failed = 0
+    while limit is None or done + failed < limit:
+        task = claim(worker)
+        if task is None:
+            break
+        if run(task):
+            done += 1
+        else:
+            failed += 1
+    return done, failed
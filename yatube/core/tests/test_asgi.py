@@ -0,0 +1,167 @@
+import asyncio
+import json
+import os
+import tempfile
+import threading
+from io import StringIO
+from shutil import rmtree
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import SimpleTestCase, TransactionTestCase
+from django.urls import reverse
+
+from posts.models import Group, Post, User
+
+from .. import parallel
+from ..asgi import build_environ
+from ..metrics import RequestStats
+
+
+def call(application, scope, body=b''):
+    """Выполняет ASGI-приложение, возвращает отправленные сообщения."""
+    messages = []
+    incoming = [{'type': 'http.request', 'body': body}]
+
+    async def receive():
+        return incoming.pop(0)
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(application(scope, receive, send))
+    return messages
+
+
+class BuildEnvironTests(SimpleTestCase):
+    def test_headers_and_path(self):
+        environ = build_environ({
+            'type': 'http', 'method': 'POST', 'path': '/профиль/',
+            'query_string': b'page=2',
+            'headers': [
+                (b'content-type', b'text/plain'),
+                (b'accept', b'text/html'), (b'accept', b'*/*'),
+            ],
+        }, b'body')
+        self.assertEqual(environ['REQUEST_METHOD'], 'POST')
+        self.assertEqual(
+            environ['PATH_INFO'].encode('latin-1').decode(), '/профиль/'
+        )
+        self.assertEqual(environ['QUERY_STRING'], 'page=2')
+        self.assertEqual(environ['CONTENT_TYPE'], 'text/plain')
+        self.assertEqual(environ['HTTP_ACCEPT'], 'text/html,*/*')
+        self.assertEqual(environ['wsgi.input'].read(), b'body')
+
+
+class ASGITests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='author')
+        self.group = Group.objects.create(title='Группа', slug='group')
+        Post.objects.create(
+            text='Пост через ASGI', author=self.user, group=self.group
+        )
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_serves_pages(self):
+        """yatube.asgi отдаёт ту же страницу, что и WSGI-приложение."""
+        from yatube.asgi import application
+
+        messages = call(application, {
+            'type': 'http', 'method': 'GET',
+            'path': reverse('posts:profile', args=['author']),
+            'query_string': b'', 'headers': [(b'host', b'testserver')],
+        })
+        start, *bodies = messages
+        self.assertEqual(start['status'], 200)
+        self.assertIn(
+            (b'content-type', b'text/html; charset=utf-8'), start['headers']
+        )
+        body = b''.join(message['body'] for message in bodies)
+        self.assertIn('Пост через ASGI', body.decode())
+        self.assertFalse(bodies[-1].get('more_body'))
+
+    def test_lifespan(self):
+        from yatube.asgi import application
+
+        incoming = [
+            {'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'},
+        ]
+        sent = []
+
+        async def receive():
+            return incoming.pop(0)
+
+        async def send(message):
+            sent.append(message['type'])
+
+        asyncio.run(application({'type': 'lifespan'}, receive, send))
+        self.assertEqual(sent, [
+            'lifespan.startup.complete', 'lifespan.shutdown.complete',
+        ])
+
+    def test_gather_runs_queries_in_other_threads(self):
+        """Запросы идут параллельно и попадают в обёртки вызывающего."""
+        stats = RequestStats()
+
+        def count_posts():
+            return threading.current_thread(), Post.objects.count()
+
+        def group_title():
+            return threading.current_thread(), Group.objects.get().title
+
+        with connection.execute_wrapper(stats):
+            posts, group = parallel.gather(count_posts, group_title)
+        self.assertEqual(posts[1], 1)
+        self.assertEqual(group[1], 'Группа')
+        self.assertNotEqual(posts[0], threading.current_thread())
+        self.assertEqual(stats.queries, 2)
+
+    def test_gather_fallback_matches_threaded_path(self):
+        """Без потоков порядок результатов и ошибки те же, что с ними."""
+        def title():
+            return threading.current_thread(), Group.objects.get().title
+
+        def count():
+            return threading.current_thread(), Post.objects.count()
+
+        def fail(message):
+            def func():
+                raise ValueError(message)
+            return func
+
+        def run():
+            results = parallel.gather(title, count)
+            with self.assertRaisesMessage(ValueError, 'первая'):
+                parallel.gather(count, fail('первая'), fail('вторая'))
+            return [value for _, value in results], results[0][0]
+
+        threaded, worker = run()
+        self.assertNotEqual(worker, threading.current_thread())
+        with self.settings(CONCURRENT_QUERY_THREADS=0):
+            sequential, worker = run()
+        self.assertEqual(worker, threading.current_thread())
+        with transaction.atomic():
+            in_transaction, worker = run()
+        self.assertEqual(worker, threading.current_thread())
+        self.assertEqual(threaded, ['Группа', 1])
+        self.assertEqual(sequential, threaded)
+        self.assertEqual(in_transaction, threaded)
+
+    def test_benchmark_through_asgi(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(rmtree, directory, ignore_errors=True)
+        call_command(
+            'benchmark', asgi=True, concurrency=2, requests=2, warmup=0,
+            anonymous=True, output=directory, stdout=StringIO(),
+        )
+        name, = os.listdir(directory)
+        with open(os.path.join(directory, name)) as file:
+            run = json.load(file)
+        self.assertEqual(run['server'], 'asgi')
+        index = run['results']['posts:index']
+        self.assertEqual(index['statuses'], {'200': 2})
+        self.assertGreater(index['queries_mean'], 0)
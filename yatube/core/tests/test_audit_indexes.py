@@ -0,0 +1,48 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+
+from ..management.commands.audit_indexes import problems
+
+
+class AuditIndexesTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        call_command(
+            'generate_data', users=20, groups=3, posts=300, comments=200,
+            follows=5, stdout=StringIO(),
+        )
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_feeds_use_indexes(self):
+        """Ленты читаются по индексам, без сортировки в памяти."""
+        out = StringIO()
+        call_command('audit_indexes', stdout=out)
+        report = out.getvalue()
+        for name in ('index', 'group_list', 'profile', 'post_detail',
+                     'follow_index'):
+            with self.subTest(name=name):
+                self.assertIn(f'posts:{name}: ok', report)
+
+    def test_shared_cache_is_kept(self):
+        """Аудит не стирает общий кэш работающего сервера."""
+        cache.set('audit:marker', 'на месте')
+        call_command('audit_indexes', stdout=StringIO())
+        self.assertEqual(cache.get('audit:marker'), 'на месте')
+
+    def test_problems_are_flagged(self):
+        """Полное сканирование и временное B-дерево попадают в отчёт."""
+        plan = [
+            (2, 0, 0, 'SCAN posts_post'),
+            (3, 0, 0, 'SEARCH posts_comment USING INDEX x (post_id=?)'),
+            (4, 0, 0, 'SCAN posts_post USING INDEX post_pub_date_idx'),
+            (5, 0, 0, 'USE TEMP B-TREE FOR ORDER BY'),
+        ]
+        self.assertEqual(
+            list(problems(plan)),
+            ['SCAN posts_post', 'USE TEMP B-TREE FOR ORDER BY'],
+        )
@@ -0,0 +1,71 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from shutil import rmtree
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+
+from posts.models import Comment, FeedEntry, Follow, Group, Post, User
+
+from ..benchmark import compare
+
+
+class BenchmarkTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        cache.clear()
+        rmtree(self.directory, ignore_errors=True)
+
+    def test_generate_data(self):
+        """Генератор создаёт связанные данные и пересобирает счётчики."""
+        call_command(
+            'generate_data', users=30, groups=3, posts=200, comments=100,
+            follows=5, stdout=StringIO(),
+        )
+        self.assertEqual(User.objects.count(), 30)
+        self.assertEqual(Group.objects.count(), 3)
+        self.assertEqual(Post.objects.count(), 200)
+        self.assertEqual(Comment.objects.count(), 100)
+        self.assertTrue(Follow.objects.exists())
+        self.assertTrue(FeedEntry.objects.exists())
+        top = User.objects.order_by('-profile__posts_count').first()
+        self.assertEqual(top.profile.posts_count, top.posts.count())
+        dates = Post.objects.values_list('pub_date', flat=True)
+        self.assertGreater(len(set(dates)), 1)
+
+    def test_benchmark_stores_and_compares_runs(self):
+        """Бенчмарк проходит по всем адресам и сохраняет результаты."""
+        call_command(
+            'generate_data', users=10, groups=2, posts=30, comments=10,
+            follows=3, stdout=StringIO(),
+        )
+        options = {
+            'requests': 2, 'warmup': 0, 'output': self.directory,
+            'stdout': StringIO(),
+        }
+        call_command('benchmark', label='first', **options)
+        first, = os.listdir(self.directory)
+        with open(os.path.join(self.directory, first)) as file:
+            run = json.load(file)
+        results = run['results']
+        self.assertIn('posts:index', results)
+        self.assertIn('posts:post_detail', results)
+        self.assertIn('users:login', results)
+        self.assertNotIn('posts:profile_follow', results)
+        self.assertEqual(results['posts:index']['statuses'], {'200': 2})
+        self.assertGreater(results['posts:index']['queries_mean'], 0)
+        out = StringIO()
+        call_command(
+            'benchmark', compare=os.path.join(self.directory, first),
+            **dict(options, stdout=out),
+        )
+        self.assertIn('sql=', out.getvalue())
+        self.assertEqual(
+            len(list(compare(results, results))), len(results)
+        )
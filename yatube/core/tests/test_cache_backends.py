@@ -0,0 +1,67 @@
+import os
+import tempfile
+import time
+from shutil import rmtree
+
+from django.test import SimpleTestCase
+
+from ..cache_backends.sqlite import SQLiteCache
+
+
+class SQLiteCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = self.make_cache(max_entries=5)
+
+    def tearDown(self):
+        rmtree(self.directory, ignore_errors=True)
+
+    def make_cache(self, **options):
+        params = {
+            'OPTIONS': {
+                'MAX_ENTRIES': options.get('max_entries', 300),
+                'CULL_FREQUENCY': 5,
+                'ACCESS_RESOLUTION': 0,
+            }
+        }
+        return SQLiteCache(
+            os.path.join(self.directory, 'cache.sqlite3'), params
+        )
+
+    def test_basic_operations(self):
+        self.cache.set('key', {'value': 1})
+        self.assertEqual(self.cache.get('key'), {'value': 1})
+        self.assertFalse(self.cache.add('key', 'other'))
+        self.assertTrue(self.cache.add('new', 'value'))
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+        self.cache.set('counter', 1)
+        self.assertEqual(self.cache.incr('counter', 2), 3)
+        self.cache.set_many({'a': 1, 'b': 2})
+        self.assertEqual(self.cache.get_many(['a', 'b', 'c']),
+                         {'a': 1, 'b': 2})
+        self.cache.delete_many(['a', 'b'])
+        self.assertIsNone(self.cache.get('a'))
+        self.cache.clear()
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_expired_values_are_not_returned(self):
+        self.cache.set('key', 'value', 0.01)
+        time.sleep(0.02)
+        self.assertIsNone(self.cache.get('key'))
+        self.assertTrue(self.cache.add('key', 'fresh'))
+
+    def test_least_recently_used_entries_are_evicted(self):
+        """При переполнении вытесняются давно не читанные записи."""
+        for i in range(5):
+            self.cache.set(f'key{i}', i)
+        time.sleep(0.01)
+        self.cache.get('key0')
+        self.cache.set('key5', 5)
+        self.assertEqual(self.cache.get('key0'), 0)
+        self.assertIsNone(self.cache.get('key1'))
+
+    def test_shared_between_instances(self):
+        """Разные экземпляры (процессы) видят один и тот же файл."""
+        self.cache.set('shared', 'value')
+        self.assertEqual(self.make_cache().get('shared'), 'value')
@@ -0,0 +1,81 @@
+import time
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.urls import resolve, reverse
+
+from posts.models import Post
+
+from .. import db
+
+REPLICA = 'replica1'
+
+
+@override_settings(DATABASE_REPLICAS=[REPLICA])
+class ReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = db.ReplicaRouter()
+        self.factory = RequestFactory()
+        db._health[REPLICA] = (True, time.monotonic())
+
+    def tearDown(self):
+        db._health.clear()
+        db.reset()
+
+    def serve(self, request, write=False):
+        """Прогоняет запрос через middleware, возвращает базу чтения."""
+        request.resolver_match = resolve(request.path)
+        chosen = []
+
+        def view(request):
+            if write:
+                self.router.db_for_write(Post)
+            chosen.append(self.router.db_for_read(Post))
+            return HttpResponse()
+
+        middleware = db.ReplicaMiddleware(view)
+
+        def get_response(request):
+            middleware.process_view(request, view, (), {})
+            return view(request)
+
+        middleware.get_response = get_response
+        response = middleware(request)
+        return chosen[0], response
+
+    def test_read_only_view_reads_from_replica(self):
+        alias, response = self.serve(self.factory.get(reverse('posts:index')))
+        self.assertEqual(alias, REPLICA)
+        self.assertNotIn(settings.REPLICA_STICKY_COOKIE, response.cookies)
+
+    def test_other_views_read_from_primary(self):
+        alias, _ = self.serve(self.factory.get(reverse('posts:search')))
+        self.assertEqual(alias, 'default')
+        alias, _ = self.serve(self.factory.post(reverse('posts:index')))
+        self.assertEqual(alias, 'default')
+
+    def test_write_makes_reads_sticky(self):
+        """После записи чтение идёт с основной базы, пока жива кука."""
+        url = reverse('posts:post_create')
+        alias, response = self.serve(self.factory.post(url), write=True)
+        self.assertEqual(alias, 'default')
+        cookie = response.cookies[settings.REPLICA_STICKY_COOKIE]
+        self.assertEqual(cookie['max-age'], settings.REPLICA_STICKY_SECONDS)
+        request = self.factory.get(reverse('posts:index'))
+        request.COOKIES[settings.REPLICA_STICKY_COOKIE] = cookie.value
+        alias, _ = self.serve(request)
+        self.assertEqual(alias, 'default')
+
+    def test_unhealthy_replica_is_skipped(self):
+        db._health[REPLICA] = (False, time.monotonic())
+        alias, _ = self.serve(self.factory.get(reverse('posts:index')))
+        self.assertEqual(alias, 'default')
+
+    @override_settings(REPLICA_HEALTH_INTERVAL=0)
+    def test_missing_replica_is_unhealthy(self):
+        self.assertFalse(db.replica_is_healthy('no_such_database'))
+
+    def test_outside_requests_reads_go_to_primary(self):
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+        self.assertFalse(self.router.allow_migrate(REPLICA, 'posts'))
@@ -0,0 +1,58 @@
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import metrics
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+        self.client = Client()
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_request_is_recorded_per_view(self):
+        """Ответ попадает в гистограммы с меткой своего view."""
+        self.client.get(reverse('posts:index'))
+        series = metrics.DB_QUERIES._series['posts:index']
+        self.assertEqual(series['count'], 1)
+        self.assertGreater(series['sum'], 0)
+        template = metrics.TEMPLATE_SECONDS._series['posts:index']
+        self.assertGreater(template['sum'], 0)
+
+    def test_prometheus_endpoint(self):
+        """Эндпоинт отдаёт гистограммы в формате Prometheus."""
+        self.client.get(reverse('posts:index'))
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        text = response.content.decode()
+        self.assertIn('# TYPE yatube_request_duration_seconds histogram', text)
+        self.assertIn(
+            'yatube_db_queries_count{view="posts:index"} 1', text
+        )
+        self.assertIn('le="+Inf"', text)
+
+    def test_endpoint_is_internal_only(self):
+        response = self.client.get(
+            reverse('metrics'), REMOTE_ADDR='10.0.0.1'
+        )
+        self.assertEqual(response.status_code, 403)
+
+    @override_settings(QUERY_BUDGETS={'posts:index': 0})
+    def test_budget_warning(self):
+        """Превышение бюджета по умолчанию только пишет предупреждение."""
+        with self.assertLogs('core.middleware', 'WARNING') as logs:
+            response = self.client.get(reverse('posts:index'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('posts:index', logs.output[0])
+
+    @override_settings(
+        QUERY_BUDGETS={'posts:index': 0}, QUERY_BUDGET_STRICT=True
+    )
+    def test_strict_budget_fails(self):
+        """В строгом режиме превышение бюджета — исключение."""
+        with self.assertRaises(metrics.QueryBudgetExceeded):
+            self.client.get(reverse('posts:index'))
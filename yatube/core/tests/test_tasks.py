@@ -0,0 +1,163 @@
+import tempfile
+from datetime import timedelta
+from email.mime.base import MIMEBase
+from email.mime.text import MIMEText
+from shutil import rmtree
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from users.models import Profile
+
+from .. import tasks
+from ..models import Task
+
+User = get_user_model()
+
+CALLS = []
+
+
+@tasks.task
+def remember(value, suffix=''):
+    CALLS.append(f'{value}{suffix}')
+
+
+@tasks.task(max_attempts=2)
+def explode():
+    raise ValueError('Сбой задачи')
+
+
+class TaskQueueTests(TestCase):
+    def setUp(self):
+        CALLS.clear()
+
+    def test_delay_stores_task_until_worker_runs_it(self):
+        remember.delay('a', suffix='!')
+        task = Task.objects.get()
+        self.assertEqual(task.name, 'core.tests.test_tasks.remember')
+        self.assertEqual(CALLS, [])
+        self.assertEqual(tasks.work_off('test'), (1, 0))
+        self.assertEqual(CALLS, ['a!'])
+        self.assertFalse(Task.objects.exists())
+
+    def test_failed_task_is_retried_with_backoff(self):
+        """Упавшая задача откладывается, затем помечается ошибкой."""
+        explode.delay()
+        self.assertEqual(tasks.work_off('test'), (0, 1))
+        task = Task.objects.get()
+        self.assertEqual(task.status, Task.PENDING)
+        self.assertEqual(task.attempts, 1)
+        self.assertGreater(task.run_at, timezone.now())
+        self.assertIn('Сбой задачи', task.last_error)
+        # До истечения задержки задача не выполняется.
+        self.assertEqual(tasks.work_off('test'), (0, 0))
+
+        Task.objects.update(run_at=timezone.now())
+        self.assertEqual(tasks.work_off('test'), (0, 1))
+        task.refresh_from_db()
+        self.assertEqual(task.status, Task.FAILED)
+        self.assertEqual(task.attempts, 2)
+
+    def test_backoff_grows_to_limit(self):
+        with self.settings(TASK_RETRY_DELAY=10, TASK_RETRY_MAX_DELAY=60):
+            self.assertEqual(
+                [tasks.backoff(attempt) for attempt in range(1, 6)],
+                [10, 20, 40, 60, 60],
+            )
+
+    def test_stale_task_is_requeued(self):
+        remember.delay('stale')
+        self.assertIsNotNone(tasks.claim('lost-worker'))
+        self.assertIsNone(tasks.claim('test'))
+        Task.objects.update(locked_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(tasks.requeue_stale(), 1)
+        self.assertEqual(tasks.work_off('test'), (1, 0))
+        self.assertEqual(CALLS, ['stale'])
+
+    @override_settings(
+        EMAIL_BACKEND='core.mail.QueuedEmailBackend',
+        TASK_EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    )
+    def test_email_goes_through_queue(self):
+        message = mail.EmailMultiAlternatives(
+            'Тема', 'Текст', 'from@example.com', ['to@example.com'],
+        )
+        message.attach_alternative('<p>Текст</p>', 'text/html')
+        message.send()
+        self.assertEqual(mail.outbox, [])
+        self.assertEqual(tasks.work_off('test'), (1, 0))
+        sent, = mail.outbox
+        self.assertEqual(sent.subject, 'Тема')
+        self.assertEqual(sent.to, ['to@example.com'])
+        self.assertEqual(sent.alternatives, [('<p>Текст</p>', 'text/html')])
+
+    @override_settings(
+        EMAIL_BACKEND='core.mail.QueuedEmailBackend',
+        TASK_EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    )
+    def test_mime_attachment_goes_through_queue(self):
+        """Вложение MIMEBase переживает сериализацию в задачу."""
+        part = MIMEText('Отчёт за день', 'plain', 'utf-8')
+        part.add_header('Content-Disposition', 'attachment',
+                        filename='report.txt')
+        message = mail.EmailMessage(
+            'Тема', 'Текст', 'from@example.com', ['to@example.com'],
+        )
+        message.attach(part)
+        message.attach('data.csv', 'a,b', 'text/csv')
+        message.send()
+        self.assertEqual(tasks.work_off('test'), (1, 0))
+        sent, = mail.outbox
+        mime, plain = sent.attachments
+        self.assertIsInstance(mime, MIMEBase)
+        self.assertEqual(mime.get_filename(), 'report.txt')
+        self.assertEqual(
+            mime.get_payload(decode=True).decode(), 'Отчёт за день'
+        )
+        self.assertEqual(plain, ('data.csv', 'a,b', 'text/csv'))
+        self.assertIn(b'report.txt', sent.message().as_bytes())
+
+
+class ReplacedFileTests(TransactionTestCase):
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(rmtree, media, ignore_errors=True)
+        media_settings = override_settings(MEDIA_ROOT=media)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+
+    def replace_avatar(self):
+        user = User.objects.create_user(username='avatar')
+        profile = Profile.objects.get(user=user)
+        Profile.objects.filter(pk=profile.pk).update(avatar='photos/old.gif')
+        profile.refresh_from_db()
+        Profile._meta.get_field('avatar').save_form_data(
+            profile, SimpleUploadedFile('new.gif', b'GIF89a')
+        )
+        return profile
+
+    def test_replaced_avatar_is_deleted_after_commit(self):
+        """Удаление старого файла ставится после коммита нового."""
+        profile = self.replace_avatar()
+        self.assertFalse(Task.objects.exists())
+        with transaction.atomic():
+            profile.save()
+            self.assertFalse(Task.objects.exists())
+        task = Task.objects.get()
+        self.assertEqual(task.name, 'users.tasks.delete_file')
+        self.assertEqual(task.payload, '[["photos/old.gif"], {}]')
+
+    def test_failed_save_keeps_old_avatar(self):
+        profile = self.replace_avatar()
+        with self.assertRaises(ValueError):
+            with transaction.atomic():
+                profile.save()
+                raise ValueError('Откат')
+        self.assertFalse(Task.objects.exists())
+        self.assertEqual(
+            Profile.objects.get(pk=profile.pk).avatar.name, 'photos/old.gif'
+        )
@@ -0,0 +1,12 @@
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+
+from . import metrics
+
+
+def prometheus_metrics(request):
+    if request.META.get('REMOTE_ADDR') not in settings.INTERNAL_IPS:
+        return HttpResponseForbidden()
+    return HttpResponse(
+        metrics.render(), content_type='text/plain; version=0.0.4'
+    )
@@ -0,0 +1,152 @@
+"""Версионный кэш фрагментов и срезов страниц.
+
+У каждого кэшируемого объекта есть токен версии в кэше: ('post', id),
+('author', id), ('group', id), а также глобальные ('posts',), ('users',)
+и ('groups',). Ключи фрагментов и срезов включают токены всех объектов,
+от которых они зависят, а сигналы моделей подменяют токены при любом
+изменении, поэтому старые записи просто перестают читаться и вытесняются
+по TTL. Токен ('following', id) меняется, когда пользователь подписывается
+или отписывается, и входит в ETag его страниц с кнопками подписки.
+"""
+import hashlib
+from functools import wraps
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.http import condition
+
+from . import images
+from .utils import paginator
+
+
+def version_key(scope, pk=None):
+    if pk is None:
+        return f'version:{scope}'
+    return f'version:{scope}:{pk}'
+
+
+def _tokens(keys):
+    tokens = cache.get_many(keys)
+    missing = {key: uuid4().hex for key in keys if key not in tokens}
+    if missing:
+        for key, token in missing.items():
+            # add() не перетирает токен, созданный параллельным запросом.
+            if not cache.add(key, token, None):
+                missing[key] = cache.get(key, token)
+        tokens.update(missing)
+    return tokens
+
+
+def get_token(*scopes):
+    """Общий токен версии для набора областей вида ('post', 1)."""
+    keys = [version_key(*scope) for scope in scopes]
+    tokens = _tokens(keys)
+    return '.'.join(tokens[key] for key in keys)
+
+
+def bump(*scopes):
+    """Делает недействительными все фрагменты, зависящие от областей."""
+    cache.set_many(
+        {version_key(*scope): uuid4().hex for scope in scopes}, None
+    )
+
+
+def card_scopes(post):
+    return (
+        ('post', post.pk),
+        ('author', post.author_id),
+        ('group', post.group_id),
+        ('users',),
+    )
+
+
+def attach_card_tokens(posts):
+    """Проставляет post.cache_version всем карточкам одним запросом.
+
+    Заодно карточки получают общий загрузчик картинок страницы
+    (images.attach_pictures), чтобы промахи кэша фрагментов не читали
+    варианты и миниатюры по одной.
+    """
+    keys = {
+        post.pk: [version_key(*scope) for scope in card_scopes(post)]
+        for post in posts
+    }
+    tokens = _tokens({key for post_keys in keys.values() for key in post_keys})
+    for post in posts:
+        post.cache_version = '.'.join(tokens[key] for key in keys[post.pk])
+    images.attach_pictures(posts)
+    return posts
+
+
+def cached_page(request, post_list, *scopes, ordering=None):
+    """Страница постов из кэша срезов или из базы.
+
+    Ключ среза включает имя представления, курсор и токены областей,
+    от которых зависит состав страницы.
+    """
+    token = get_token(*scopes, ('users',), ('groups',))
+    cursor = request.GET.get('cursor', '')
+    digest = hashlib.md5(f'{cursor}:{token}'.encode()).hexdigest()
+    key = f'page:{request.resolver_match.view_name}:{digest}'
+    page_obj = cache.get(key)
+    if page_obj is None:
+        page_obj = paginator(request, post_list, ordering)
+        cache.set(key, page_obj, settings.PAGE_CACHE_TIMEOUT)
+    attach_card_tokens(page_obj.object_list)
+    return page_obj
+
+
+def set_cache_headers(request, response):
+    """Анонимам — общий кэш на HTTP_CACHE_TIMEOUT, остальным — приватный."""
+    if response.status_code not in (200, 304):
+        return response
+    if request.user.is_authenticated or response.cookies:
+        patch_cache_control(response, private=True, max_age=0)
+        patch_vary_headers(response, ['Cookie'])
+    else:
+        patch_cache_control(
+            response, public=True, max_age=0,
+            s_maxage=settings.HTTP_CACHE_TIMEOUT,
+        )
+    return response
+
+
+def conditional_page(scopes):
+    """Условный GET для страницы, зависящей от областей scopes.
+
+    scopes(*args, **kwargs) возвращает области страницы или None, если
+    объекта нет. ETag строится из их токенов, пользователя, адреса и
+    CSRF-куки, поэтому 304 отдаётся без запросов к постам и рендеринга.
+    """
+    def etag(request, *args, **kwargs):
+        page_scopes = scopes(*args, **kwargs)
+        if page_scopes is None:
+            return None
+        viewer_scopes = (
+            (('following', request.user.pk),)
+            if request.user.is_authenticated else ()
+        )
+        token = get_token(
+            *page_scopes, *viewer_scopes, ('users',), ('groups',)
+        )
+        parts = (
+            request.resolver_match.view_name,
+            request.get_full_path(),
+            str(request.user.pk),
+            request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''),
+            token,
+        )
+        return hashlib.md5('\n'.join(parts).encode()).hexdigest()
+
+    def decorator(view):
+        conditional_view = condition(etag_func=etag)(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            return set_cache_headers(
+                request, conditional_view(request, *args, **kwargs)
+            )
+        return wrapper
+    return decorator
@@ -0,0 +1,62 @@
+"""Ветки комментариев на странице поста.
+
+Страница — COMMENTS_PER_PAGE корневых комментариев, выбранных
+keyset-пагинацией от новых или от старых, и все ответы на них. Корни
+страницы идут подряд в порядке id, поэтому ответы на них лежат в одном
+диапазоне материализованных путей и читаются одним запросом: страница
+стоит два запроса при любом числе комментариев к посту.
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.db.models import CharField, Value
+from django.db.models.functions import Cast, LPad
+
+from .models import Comment
+from .utils import CursorPaginator
+
+NEWEST = 'newest'
+OLDEST = 'oldest'
+ORDERINGS = {NEWEST: ('-pk',), OLDEST: ('pk',)}
+
+
+def get_order(request):
+    order = request.GET.get('order')
+    return order if order in ORDERINGS else OLDEST
+
+
+def _replies(post, roots):
+    first = min(roots, key=lambda root: root.path)
+    last = max(roots, key=lambda root: root.path)
+    replies = post.comments.filter(
+        parent__isnull=False,
+        path__gt=first.subtree_bounds()[0],
+        path__lt=last.subtree_bounds()[1],
+    ).select_related('author').order_by('path')
+    threads = defaultdict(list)
+    for reply in replies:
+        threads[reply.path[:Comment.PATH_WIDTH]].append(reply)
+    return threads
+
+
+def threads(post, order=OLDEST, cursor=None):
+    """Страница веток: корни по порядку order, ответы — по пути."""
+    roots = post.comments.filter(parent=None).select_related('author')
+    page = CursorPaginator(
+        roots, settings.COMMENTS_PER_PAGE, ordering=ORDERINGS[order]
+    ).get_page(cursor)
+    if page.object_list:
+        replies = _replies(post, page.object_list)
+        page.object_list = [
+            comment
+            for root in page.object_list
+            for comment in [root, *replies[root.path]]
+        ]
+    return page
+
+
+def fill_root_paths():
+    """Пути корневых комментариев, вставленных bulk_create без save()."""
+    return Comment.objects.filter(path='', parent=None).update(
+        path=LPad(Cast('pk', CharField()), Comment.PATH_WIDTH, Value('0'))
+    )
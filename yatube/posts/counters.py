@@ -0,0 +1,79 @@
+"""Денормализованные счётчики постов и подписок.
+
+Счётчики меняются атомарно через F()-выражения из сигналов моделей,
+а reconcile() пересчитывает их по исходным таблицам и чинит расхождения.
+"""
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from users.models import Profile
+
+from .models import Follow, Group, Post
+
+
+def _change(queryset, field, delta):
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    queryset.update(**{field: F(field) + delta})
+
+
+def change_author_posts(author_id, delta):
+    _change(Profile.objects.filter(user_id=author_id), 'posts_count', delta)
+
+
+def change_group_posts(group_id, delta):
+    if group_id is not None:
+        _change(Group.objects.filter(pk=group_id), 'posts_count', delta)
+
+
+def change_follows(user_id, author_id, delta):
+    _change(Profile.objects.filter(user_id=author_id),
+            'followers_count', delta)
+    _change(Profile.objects.filter(user_id=user_id),
+            'following_count', delta)
+
+
+def _count(queryset, field, outer):
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{field: OuterRef(outer)})
+            .order_by()
+            .values(field)
+            .annotate(count=Count('pk'))
+            .values('count')
+        ),
+        0,
+    )
+
+
+def _counters():
+    """Пары (queryset, поле счётчика, выражение с точным значением)."""
+    return (
+        (Profile.objects.all(), 'posts_count',
+         _count(Post.objects.all(), 'author_id', 'user_id')),
+        (Profile.objects.all(), 'followers_count',
+         _count(Follow.objects.all(), 'author_id', 'user_id')),
+        (Profile.objects.all(), 'following_count',
+         _count(Follow.objects.all(), 'user_id', 'user_id')),
+        (Group.objects.all(), 'posts_count',
+         _count(Post.objects.all(), 'group_id', 'pk')),
+    )
+
+
+def reconcile(fix=True):
+    """Находит разошедшиеся счётчики и, если fix, исправляет их.
+
+    Возвращает словарь {'<модель>.<поле>': число исправленных строк}.
+    """
+    report = {}
+    for queryset, field, actual in _counters():
+        drifted = queryset.annotate(actual=actual).exclude(
+            **{field: F('actual')}
+        )
+        label = f'{queryset.model._meta.label}.{field}'
+        report[label] = drifted.count()
+        if fix and report[label]:
+            queryset.filter(pk__in=drifted.values('pk')).update(
+                **{field: actual}
+            )
+    return report
@@ -1,4 +1,5 @@
 from django import forms
+from django.conf import settings
 
 from .models import Comment, Post
 
@@ -18,8 +19,23 @@ class PostForm(forms.ModelForm):
 
 
 class CommentForm(forms.ModelForm):
+    def __init__(self, *args, post=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if post is not None:
+            self.fields['parent'].queryset = post.comments.all()
+
+    def clean_parent(self):
+        parent = self.cleaned_data['parent']
+        limit = settings.COMMENTS_MAX_DEPTH
+        if parent is not None and parent.depth >= limit:
+            # Слишком глубокий ответ уходит к предку на пределе вложенности.
+            ancestor = parent.path.split(Comment.PATH_SEPARATOR)[limit - 1]
+            parent = Comment.objects.get(pk=int(ancestor))
+        return parent
+
     class Meta:
         model = Comment
-        fields = ['text']
+        fields = ['text', 'parent']
         labels = {'text': 'Добавить комментарий'}
         help_texts = {'text': 'Текст комментария'}
+        widgets = {'parent': forms.HiddenInput()}
@@ -0,0 +1,274 @@
+"""Граф подписок: списки смежности в кэше и подсказки «на кого подписаться».
+
+Для каждого пользователя в кэше лежат два отсортированных массива id —
+на кого он подписан и кто подписан на него. Проверка подписки — бинарный
+поиск по массиву, поэтому состояние подписки на всех авторов страницы
+стоит одного чтения кэша. В массиве хранится только голова списка —
+GRAPH_HEAD_SIZE наибольших id: сигналы Follow удаляют оба затронутых
+массива, и даже у автора с миллионом подписчиков следующее чтение
+перестраивает голову одним запросом с LIMIT по индексу. Что глубже
+головы, читается из индексов (author, user) и (user, author).
+
+Представления собирают авторов страницы в FollowStates запроса и
+проставляют author.is_followed за одну выборку; кнопки подписки рисуются
+вне кэшированных карточек, поэтому кэш карточек общий для всех.
+
+Подсказки считаются офлайн пачками пользователей (rebuild_suggestions):
+кандидаты — авторы, на которых подписаны подписки пользователя, вес —
+число таких подписок. Виджет читает готовые строки FollowSuggestion.
+"""
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from core.bulk import batched
+
+from .models import Follow, FollowSuggestion, User
+from .utils import NEXT, CursorPage, decode_cursor
+
+FOLLOWING = 'following'
+FOLLOWERS = 'followers'
+# Поле Follow с id владельца списка и поле с id соседей.
+FIELDS = {FOLLOWING: ('user_id', 'author_id'),
+          FOLLOWERS: ('author_id', 'user_id')}
+TYPECODE = 'q'
+
+
+def _key(kind, user_id):
+    return f'graph:{kind}:{user_id}'
+
+
+def _query(kind, user_ids):
+    owner, neighbour = FIELDS[kind]
+    return Follow.objects.filter(
+        **{f'{owner}__in': user_ids}
+    ).order_by(owner, neighbour).values_list(owner, neighbour)
+
+
+def _neighbours_range(kind, user_id, after=None, before=None,
+                      descending=True, limit=None):
+    """id соседей строго между after и before, прямо из индекса."""
+    owner, neighbour = FIELDS[kind]
+    lookups = {owner: user_id}
+    if after is not None:
+        lookups[f'{neighbour}__gt'] = after
+    if before is not None:
+        lookups[f'{neighbour}__lt'] = before
+    return Follow.objects.filter(**lookups).order_by(
+        f'-{neighbour}' if descending else neighbour
+    ).values_list(neighbour, flat=True)[:limit]
+
+
+def adjacency(kind, user_id):
+    """(голова, полный ли список) соседей пользователя.
+
+    Голова — не больше GRAPH_HEAD_SIZE наибольших id по возрастанию;
+    если список неполный, в голове есть все id соседей от head[0].
+    """
+    key = _key(kind, user_id)
+    cached = cache.get(key)
+    ids = array(TYPECODE)
+    if cached is not None:
+        raw, complete = cached
+        ids.frombytes(raw)
+        return ids, complete
+    size = settings.GRAPH_HEAD_SIZE
+    head = list(_neighbours_range(kind, user_id, limit=size + 1))
+    complete = len(head) <= size
+    ids.extend(reversed(head[:size]))
+    cache.set(key, (ids.tobytes(), complete), settings.GRAPH_CACHE_TIMEOUT)
+    return ids, complete
+
+
+def invalidate(user_id, author_id):
+    cache.delete_many([_key(FOLLOWING, user_id), _key(FOLLOWERS, author_id)])
+
+
+def _contains(ids, value):
+    index = bisect_left(ids, value)
+    return index < len(ids) and ids[index] == value
+
+
+def is_following_many(user_id, author_ids):
+    """Множество тех author_ids, на кого подписан user_id."""
+    if user_id is None:
+        return set()
+    ids, complete = adjacency(FOLLOWING, user_id)
+    followed = {pk for pk in author_ids if _contains(ids, pk)}
+    deeper = [] if complete else [pk for pk in author_ids if pk < ids[0]]
+    if deeper:
+        followed.update(Follow.objects.filter(
+            user_id=user_id, author_id__in=deeper
+        ).values_list('author_id', flat=True))
+    return followed
+
+
+def is_following(user_id, author_id):
+    return bool(is_following_many(user_id, [author_id]))
+
+
+class FollowStates:
+    """Подписки зрителя на авторов, собранные за один запрос страницы."""
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.known = {}
+
+    def annotate(self, authors):
+        """Проставляет author.is_followed всем authors одной выборкой."""
+        missing = {author.pk for author in authors} - self.known.keys()
+        if missing:
+            followed = is_following_many(self.user_id, missing)
+            self.known.update({pk: pk in followed for pk in missing})
+        for author in authors:
+            author.is_followed = self.known[author.pk]
+        return authors
+
+
+def follow_states(request):
+    """FollowStates текущего запроса."""
+    states = getattr(request, '_follow_states', None)
+    if states is None:
+        states = request._follow_states = FollowStates(request.user.pk)
+    return states
+
+
+def annotate_authors(request, posts):
+    """Проставляет post.author.is_followed карточкам страницы."""
+    follow_states(request).annotate([post.author for post in posts])
+    return posts
+
+
+class AdjacencyPaginator:
+    """Курсорная пагинация списка смежности, от больших id к меньшим.
+
+    Курсор хранит id крайнего показанного пользователя. Страницы в голове
+    списка — срез кэшированного массива, более глубокие читаются
+    диапазоном индекса Follow; пользователи страницы — один запрос.
+    """
+
+    def __init__(self, kind, user_id, per_page):
+        self.kind = kind
+        self.user_id = user_id
+        self.per_page = per_page
+        self.head, self.complete = adjacency(kind, user_id)
+        self.cursor = None
+
+    def _range(self, after, before, descending, limit):
+        head = self.head
+        start = 0 if after is None else bisect_right(head, after)
+        end = len(head) if before is None else bisect_left(head, before)
+        found = head[start:end]
+        found = list(found[::-1] if descending else found)[:limit]
+        # Ниже head[0] голова неполного списка ничего не знает.
+        covered = (
+            self.complete
+            or (after is not None and after >= head[0])
+            or (descending and len(found) == limit)
+        )
+        if covered:
+            return found
+        return list(_neighbours_range(
+            self.kind, self.user_id, after, before, descending, limit
+        ))
+
+    def get_page(self, cursor=None):
+        self.cursor = cursor
+        direction, values = (
+            decode_cursor(cursor) if cursor else None
+        ) or (NEXT, None)
+        if values is not None and (
+            len(values) != 1 or not isinstance(values[0], int)
+        ):
+            direction, values = NEXT, None
+        value = values[0] if values else None
+        if direction == NEXT:
+            ids = self._range(None, value, True, self.per_page + 1)
+            has_next, has_previous = len(ids) > self.per_page, bool(values)
+            ids = ids[:self.per_page]
+        else:
+            ids = self._range(value, None, False, self.per_page + 1)
+            has_next, has_previous = bool(values), len(ids) > self.per_page
+            ids = ids[:self.per_page][::-1]
+        users = User.objects.select_related('profile').in_bulk(ids)
+        return CursorPage(
+            [users[pk] for pk in ids if pk in users],
+            self,
+            next_values=[ids[-1]] if ids and has_next else None,
+            previous_values=[ids[0]] if ids and has_previous else None,
+        )
+
+
+def page(kind, user_id, cursor=None):
+    return AdjacencyPaginator(
+        kind, user_id, settings.FOLLOWS_PER_PAGE
+    ).get_page(cursor)
+
+
+def suggestions(user_id):
+    """Готовые подсказки без авторов, на которых уже подписались."""
+    if user_id is None:
+        return []
+    rows = list(
+        FollowSuggestion.objects.filter(user_id=user_id)
+        .select_related('author')
+        .order_by('-score', 'author')[:settings.FOLLOW_SUGGESTIONS]
+    )
+    followed = is_following_many(user_id, [row.author_id for row in rows])
+    return [
+        row for row in rows if row.author_id not in followed
+    ][:settings.FOLLOW_SUGGESTIONS_SHOWN]
+
+
+def _neighbours(kind, user_ids, batch_size=500):
+    neighbours = defaultdict(list)
+    for batch in batched(user_ids, batch_size):
+        for owner, neighbour in _query(kind, batch).iterator():
+            neighbours[owner].append(neighbour)
+    return neighbours
+
+
+def compute_suggestions(user_ids):
+    """Пересчитывает подсказки пачки пользователей; возвращает их число."""
+    following = _neighbours(FOLLOWING, user_ids)
+    second = _neighbours(FOLLOWING, set().union(*following.values()))
+    rows = []
+    for user_id in user_ids:
+        own = set(following.get(user_id, ()))
+        counts = Counter()
+        for followee in own:
+            counts.update(second.get(followee, ()))
+        for author_id in own | {user_id}:
+            counts.pop(author_id, None)
+        best = sorted(counts.items(), key=lambda item: (-item[1], item[0]))
+        rows.extend(
+            FollowSuggestion(user_id=user_id, author_id=author_id,
+                             score=score)
+            for author_id, score in best[:settings.FOLLOW_SUGGESTIONS]
+        )
+    with transaction.atomic():
+        FollowSuggestion.objects.filter(user_id__in=user_ids).delete()
+        FollowSuggestion.objects.bulk_create(rows)
+    return len(rows)
+
+
+def rebuild_suggestions(batch_size=500):
+    """Пересчитывает подсказки всех, у кого есть подписки."""
+    FollowSuggestion.objects.exclude(
+        user_id__in=Follow.objects.values('user_id')
+    ).delete()
+    user_ids = Follow.objects.order_by('user_id').values_list(
+        'user_id', flat=True
+    ).distinct()
+    total = 0
+    last_id = 0
+    while True:
+        batch = list(user_ids.filter(user_id__gt=last_id)[:batch_size])
+        if not batch:
+            return total
+        total += compute_suggestions(batch)
+        last_id = batch[-1]
@@ -0,0 +1,189 @@
+"""Адаптивные варианты картинок для srcset и <picture>.
+
+Для каждой загруженной картинки генерируются несколько ширин в самых
+экономных форматах, которые умеет текущая сборка Pillow (AVIF и WebP,
+если поддерживаются, и JPEG как запасной). Имена файлов строятся из
+хэша содержимого исходника, поэтому их можно раздавать с «вечными»
+заголовками кэширования.
+"""
+import hashlib
+import io
+import os
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models import Count, Sum
+from PIL import Image, ImageOps
+
+from . import thumbnails
+from .models import ImageVariant
+
+# Пропорции совпадают с миниатюрами thumbnails.SPECS того же имени.
+SPECS = {
+    'post_card': {'ratio': (960, 339), 'widths': (320, 640, 960)},
+    'avatar_small': {'ratio': (1, 1), 'widths': (125, 250, 500)},
+    'avatar_large': {'ratio': (6, 7), 'widths': (150, 300, 600)},
+}
+FORMATS = (
+    ('AVIF', 'avif', 'image/avif'),
+    ('WEBP', 'webp', 'image/webp'),
+    ('JPEG', 'jpg', 'image/jpeg'),
+)
+MIME_TYPES = {extension: mime for _, extension, mime in FORMATS}
+
+
+def supported_formats():
+    Image.init()
+    return [
+        (pil_format, extension) for pil_format, extension, _ in FORMATS
+        if pil_format in Image.SAVE
+    ]
+
+
+def cache_key(name, spec_name):
+    digest = hashlib.md5(f'{name}:{spec_name}'.encode()).hexdigest()
+    return f'image_variants:{digest}'
+
+
+def _encode(image, pil_format):
+    buffer = io.BytesIO()
+    if pil_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    image.save(buffer, pil_format, quality=settings.IMAGE_VARIANT_QUALITY,
+               optimize=True)
+    return buffer.getvalue()
+
+
+def generate(name, spec_name):
+    """Создаёт варианты картинки name и возвращает записи ImageVariant."""
+    spec = SPECS[spec_name]
+    with default_storage.open(name, 'rb') as source:
+        content = source.read()
+    digest = hashlib.sha1(content).hexdigest()
+    source_image = Image.open(io.BytesIO(content))
+    source_image.load()
+    variants = []
+    ratio_width, ratio_height = spec['ratio']
+    for width in spec['widths']:
+        height = max(round(width * ratio_height / ratio_width), 1)
+        resized = ImageOps.fit(
+            source_image, (width, height), Image.LANCZOS
+        )
+        for pil_format, extension in supported_formats():
+            variant_name = os.path.join(
+                'variants', digest[:2],
+                f'{digest}-{spec_name}-{width}.{extension}',
+            )
+            if default_storage.exists(variant_name):
+                size = default_storage.size(variant_name)
+            else:
+                data = _encode(resized, pil_format)
+                default_storage.save(variant_name, ContentFile(data))
+                size = len(data)
+            variants.append(ImageVariant(
+                source=name,
+                spec=spec_name,
+                width=width,
+                height=height,
+                format=extension,
+                name=variant_name,
+                size=size,
+                source_size=len(content),
+            ))
+    ImageVariant.objects.filter(source=name, spec=spec_name).delete()
+    ImageVariant.objects.bulk_create(variants)
+    cache.delete(cache_key(name, spec_name))
+    return variants
+
+
+def variants_many(names, spec_name):
+    """Варианты картинок names: одно чтение кэша и запрос на промахи."""
+    keys = {cache_key(name, spec_name): name for name in set(names)}
+    cached = cache.get_many(keys)
+    variants = {keys[key]: value for key, value in cached.items()}
+    missing = [name for key, name in keys.items() if key not in cached]
+    if missing:
+        found = {name: [] for name in missing}
+        rows = ImageVariant.objects.filter(
+            source__in=missing, spec=spec_name
+        ).order_by('source', 'width').values_list(
+            'source', 'format', 'width', 'height', 'name'
+        )
+        for source, *variant in rows:
+            found[source].append(tuple(variant))
+        cache.set_many(
+            {cache_key(name, spec_name): value
+             for name, value in found.items()},
+            settings.PAGE_CACHE_TIMEOUT,
+        )
+        variants.update(found)
+    return variants
+
+
+def variants_for(name, spec_name):
+    """Варианты картинки: [(формат, ширина, высота, имя файла)]."""
+    return variants_many([name], spec_name)[name]
+
+
+class PagePictures:
+    """Варианты и миниатюры всех картинок страницы, прочитанные разом.
+
+    Загружаются при первой карточке, которую пришлось рендерить: если все
+    карточки страницы есть в кэше фрагментов, чтений нет вовсе.
+    """
+
+    def __init__(self, fieldfiles, spec_name):
+        self.fieldfiles = [fieldfile for fieldfile in fieldfiles if fieldfile]
+        self.spec_name = spec_name
+        self.pictures = None
+
+    def _load(self):
+        variants = variants_many(
+            [fieldfile.name for fieldfile in self.fieldfiles], self.spec_name
+        )
+        ready = thumbnails.ready_thumbnails(
+            [fieldfile for fieldfile in self.fieldfiles
+             if not variants[fieldfile.name]],
+            self.spec_name,
+        )
+        return {
+            name: (value, ready.get(name)) for name, value in variants.items()
+        }
+
+    def get(self, fieldfile, spec_name):
+        """(варианты, готовая миниатюра) или None для чужой картинки."""
+        if spec_name != self.spec_name:
+            return None
+        if self.pictures is None:
+            self.pictures = self._load()
+        return self.pictures.get(fieldfile.name)
+
+
+def attach_pictures(posts, spec_name='post_card'):
+    """Проставляет post.pictures — общий загрузчик картинок страницы."""
+    pictures = PagePictures([post.image for post in posts], spec_name)
+    for post in posts:
+        post.pictures = pictures
+    return posts
+
+
+def savings():
+    """Экономия байтов по каждому варианту относительно исходников."""
+    rows = (
+        ImageVariant.objects.values('spec', 'width', 'format')
+        .annotate(
+            count=Count('pk'),
+            size=Sum('size'),
+            source_size=Sum('source_size'),
+        )
+        .order_by('spec', 'width', 'format')
+    )
+    for row in rows:
+        row['saved'] = row['source_size'] - row['size']
+        row['percent'] = (
+            100 * row['saved'] / row['source_size']
+            if row['source_size'] else 0
+        )
+        yield row
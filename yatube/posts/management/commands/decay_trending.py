@@ -0,0 +1,47 @@
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from posts import trending
+
+LAST_RUN_KEY = 'trending:decayed_at'
+
+
+class Command(BaseCommand):
+    help = (
+        'Затухание рейтингов популярного; запускается периодически, '
+        'например раз в час из cron'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hours', type=float,
+            help='Сколько часов затухания применить; по умолчанию время '
+                 'с прошлого запуска',
+        )
+        parser.add_argument(
+            '--rebuild', action='store_true',
+            help='Пересчитать рейтинги с нуля по постам и комментариям',
+        )
+        parser.add_argument(
+            '--days', type=int, default=trending.REBUILD_DAYS
+        )
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        if options['rebuild']:
+            count = trending.rebuild(options['days'], now)
+            self.stdout.write(f'Пересчитано постов: {count}')
+        else:
+            hours = options['hours']
+            if hours is None:
+                last_run = cache.get(LAST_RUN_KEY)
+                hours = (
+                    (now - last_run).total_seconds() / 3600
+                    if last_run else 1
+                )
+            removed = trending.decay(hours)
+            self.stdout.write(
+                f'Затухание за {hours:.2f} ч, удалено остывших: {removed}'
+            )
+        cache.set(LAST_RUN_KEY, now, None)
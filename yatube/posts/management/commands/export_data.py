@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = 'Потоково выгружает данные в NDJSON или CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=list(transfer.SPECS))
+        parser.add_argument(
+            '--output', help='Файл для выгрузки, по умолчанию stdout',
+        )
+        parser.add_argument('--format', choices=transfer.FORMATS)
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        path = options['output']
+        fmt = options['format'] or (
+            transfer.guess_format(path) if path else transfer.NDJSON
+        )
+        if path is None:
+            count = transfer.export(
+                options['kind'], self.stdout, fmt, options['batch_size']
+            )
+        else:
+            with open(path, 'w', newline='', encoding='utf-8') as stream:
+                count = transfer.export(
+                    options['kind'], stream, fmt, options['batch_size']
+                )
+        self.stderr.write(f'Выгружено записей: {count}')
@@ -0,0 +1,193 @@
+import io
+import random
+from datetime import timedelta
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image
+
+from core.bulk import batched, explicit_dates
+from posts import transfer
+from posts.models import Comment, Follow, Group, Post, User
+from users.models import Profile
+
+WORDS = (
+    'котик', 'лето', 'море', 'город', 'книга', 'поезд', 'утро', 'кофе',
+    'дождь', 'горы', 'друзья', 'музыка', 'проект', 'python', 'django',
+    'выходные', 'прогулка', 'фото', 'закат', 'работа', 'история', 'лес',
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу синтетическими данными для нагрузочных тестов: '
+        'популярность авторов и граф подписок подчиняются степенному закону'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument('--comments', type=int, default=20000)
+        parser.add_argument(
+            '--follows', type=int, default=20,
+            help='Среднее число подписок на пользователя',
+        )
+        parser.add_argument(
+            '--images', type=int, default=0,
+            help='Сколько постов получат картинки',
+        )
+        parser.add_argument('--days', type=int, default=365)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--password', default='benchmark',
+            help='Пароль всех созданных пользователей',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+
+    def log(self, message):
+        self.stdout.write(message)
+
+    def text(self, words):
+        return ' '.join(self.rng.choices(WORDS, k=words)).capitalize()
+
+    def date(self):
+        seconds = self.rng.random() * self.options['days'] * 86400
+        return self.now - timedelta(seconds=seconds)
+
+    def create_users(self):
+        password = make_password(self.options['password'])
+        prefix = f'bench{self.now:%Y%m%d%H%M%S}'
+        users = (
+            User(username=f'{prefix}_{number}', password=password)
+            for number in range(self.options['users'])
+        )
+        for batch in batched(users, self.options['batch_size']):
+            User.objects.bulk_create(batch)
+        user_ids = list(User.objects.filter(
+            username__startswith=f'{prefix}_'
+        ).values_list('pk', flat=True))
+        profiles = (Profile(user_id=user_id) for user_id in user_ids)
+        for batch in batched(profiles, self.options['batch_size']):
+            Profile.objects.bulk_create(batch)
+        self.log(f'Пользователей: {len(user_ids)}')
+        return user_ids
+
+    def create_groups(self):
+        prefix = f'bench-{self.now:%Y%m%d%H%M%S}'
+        Group.objects.bulk_create(
+            Group(
+                title=f'Группа {number}',
+                slug=f'{prefix}-{number}',
+                description=self.text(12),
+            )
+            for number in range(self.options['groups'])
+        )
+        group_ids = list(Group.objects.filter(
+            slug__startswith=f'{prefix}-'
+        ).values_list('pk', flat=True))
+        self.log(f'Групп: {len(group_ids)}')
+        return group_ids
+
+    def popularity(self, count):
+        """Накопленные веса по закону Ципфа: немногие собирают почти всё."""
+        return list(accumulate(1 / (rank + 1) for rank in range(count)))
+
+    def create_posts(self, user_ids, group_ids):
+        weights = self.popularity(len(user_ids))
+        posts = (
+            Post(
+                author_id=self.rng.choices(user_ids, cum_weights=weights)[0],
+                group_id=(
+                    self.rng.choice(group_ids)
+                    if group_ids and self.rng.random() < 0.5 else None
+                ),
+                text=self.text(self.rng.randint(5, 60)),
+                pub_date=self.date(),
+            )
+            for _ in range(self.options['posts'])
+        )
+        first = Post.objects.order_by('-pk').values_list(
+            'pk', flat=True
+        ).first() or 0
+        for batch in batched(posts, self.options['batch_size']):
+            Post.objects.bulk_create(batch)
+        post_ids = list(Post.objects.filter(
+            pk__gt=first
+        ).values_list('pk', flat=True))
+        self.log(f'Постов: {len(post_ids)}')
+        return post_ids
+
+    def create_follows(self, user_ids):
+        weights = self.popularity(len(user_ids))
+        mean = self.options['follows']
+        follows = set()
+        for user_id in user_ids:
+            # Число подписок тоже с тяжёлым хвостом, в среднем около mean.
+            count = min(
+                int(self.rng.paretovariate(2) * mean / 2), len(user_ids) - 1
+            )
+            for author_id in self.rng.choices(
+                user_ids, cum_weights=weights, k=count
+            ):
+                if author_id != user_id:
+                    follows.add((user_id, author_id))
+        objects = (
+            Follow(user_id=user_id, author_id=author_id)
+            for user_id, author_id in follows
+        )
+        for batch in batched(objects, self.options['batch_size']):
+            Follow.objects.bulk_create(batch, ignore_conflicts=True)
+        self.log(f'Подписок: {len(follows)}')
+
+    def create_comments(self, user_ids, post_ids):
+        objects = (
+            Comment(
+                post_id=self.rng.choice(post_ids),
+                author_id=self.rng.choice(user_ids),
+                text=self.text(self.rng.randint(3, 25)),
+                created=self.date(),
+            )
+            for _ in range(self.options['comments'])
+        )
+        for batch in batched(objects, self.options['batch_size']):
+            Comment.objects.bulk_create(batch)
+        self.log(f'Комментариев: {self.options["comments"]}')
+
+    def create_images(self, post_ids):
+        count = min(self.options['images'], len(post_ids))
+        for post_id in self.rng.sample(post_ids, count):
+            buffer = io.BytesIO()
+            color = tuple(self.rng.randrange(256) for _ in range(3))
+            Image.new('RGB', (1200, 800), color).save(buffer, 'JPEG')
+            name = default_storage.save(
+                f'posts/bench_{post_id}.jpg', ContentFile(buffer.getvalue())
+            )
+            Post.objects.filter(pk=post_id).update(image=name)
+        self.log(f'Картинок: {count}')
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.rng = random.Random(options['seed'])
+        self.now = timezone.now()
+        # bulk_create не шлёт сигналы, поэтому всё, что делали бы сигналы,
+        # восстанавливает в конце тот же проход, что после import_data.
+        with transaction.atomic(), explicit_dates(
+            (Post, 'pub_date'), (Comment, 'created')
+        ):
+            user_ids = self.create_users()
+            group_ids = self.create_groups()
+            post_ids = self.create_posts(user_ids, group_ids)
+            self.create_follows(user_ids)
+            if post_ids:
+                self.create_comments(user_ids, post_ids)
+                self.create_images(post_ids)
+        transfer.fixup(transfer.SPECS)
+        self.stdout.write(self.style.SUCCESS(
+            'Данные созданы; пароль пользователей: ' + options['password']
+        ))
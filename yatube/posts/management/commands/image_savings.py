@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from posts import images
+
+
+class Command(BaseCommand):
+    help = 'Показывает, сколько байтов экономит каждый вариант картинок'
+
+    def handle(self, *args, **options):
+        total = saved = 0
+        for row in images.savings():
+            total += row['source_size']
+            saved += row['saved']
+            self.stdout.write(
+                f"{row['spec']} {row['width']}w {row['format']}:"
+                f" файлов {row['count']}, {row['size']} из"
+                f" {row['source_size']} байт, экономия {row['percent']:.1f}%"
+            )
+        percent = 100 * saved / total if total else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'Всего сэкономлено {saved} байт ({percent:.1f}%)'
+        ))
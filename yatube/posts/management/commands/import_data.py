@@ -0,0 +1,52 @@
+import os
+
+from django.core.management.base import BaseCommand
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоково загружает данные из NDJSON или CSV через bulk_create; '
+        'после сбоя продолжает с последней сохранённой пачки'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=list(transfer.SPECS))
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=transfer.FORMATS)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--restart', action='store_true',
+            help='Игнорировать чекпойнт и загрузить файл с начала',
+        )
+        parser.add_argument(
+            '--skip-fixup', action='store_true',
+            help='Не пересчитывать счётчики, ленты и поиск после загрузки',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or transfer.guess_format(path)
+        checkpoint = f'{path}.checkpoint'
+        skip = 0
+        if os.path.exists(checkpoint) and not options['restart']:
+            with open(checkpoint) as file:
+                skip = int(file.read().strip() or 0)
+            self.stdout.write(f'Продолжаем после записи {skip}')
+
+        def save_checkpoint(done):
+            with open(checkpoint, 'w') as file:
+                file.write(str(done))
+            self.stdout.write(f'Загружено записей: {done}')
+
+        with open(path, newline='', encoding='utf-8') as stream:
+            done = transfer.load(
+                options['kind'], stream, fmt, options['batch_size'],
+                skip=skip, on_batch=save_checkpoint,
+            )
+        if os.path.exists(checkpoint):
+            os.remove(checkpoint)
+        if not options['skip_fixup']:
+            transfer.fixup([options['kind']])
+        self.stdout.write(self.style.SUCCESS(f'Готово, записей: {done}'))
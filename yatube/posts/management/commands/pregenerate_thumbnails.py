@@ -0,0 +1,36 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+from posts.models import Post
+from users.models import Profile
+
+
+class Command(BaseCommand):
+    help = 'Параллельно генерирует миниатюры для уже загруженных картинок'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=settings.THUMBNAIL_WORKERS or 1,
+        )
+        parser.add_argument('--chunksize', type=int, default=16)
+
+    def jobs(self):
+        posts = Post.objects.exclude(image='').values_list('pk', 'image')
+        for pk, name in posts.iterator():
+            yield name, 'post', (('post', pk),)
+        profiles = Profile.objects.exclude(avatar='').exclude(
+            avatar__isnull=True
+        ).values_list('user_id', 'avatar')
+        for user_id, name in profiles.iterator():
+            yield name, 'avatar', (('author', user_id),)
+
+    def handle(self, *args, **options):
+        executor = thumbnails.get_executor(options['workers'])
+        done = 0
+        for name in executor.map(thumbnails.render_job, self.jobs(),
+                                 chunksize=options['chunksize']):
+            done += 1
+            self.stdout.write(f'{done}: {name}')
+        executor.shutdown()
+        self.stdout.write(self.style.SUCCESS(f'Готово миниатюр: {done}'))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from posts import timeline
+from posts.models import Follow
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает материализованные ленты подписок'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'usernames', nargs='*',
+            help='Пользователи, ленты которых нужно пересобрать',
+        )
+
+    def handle(self, *args, **options):
+        follows = Follow.objects.all()
+        if options['usernames']:
+            follows = follows.filter(user__username__in=options['usernames'])
+        user_ids = follows.values_list('user_id', flat=True).distinct()
+        rebuilt = 0
+        for user_id in user_ids.iterator():
+            timeline.rebuild(user_id)
+            rebuilt += 1
+        self.stdout.write(self.style.SUCCESS(f'Пересобрано лент: {rebuilt}'))
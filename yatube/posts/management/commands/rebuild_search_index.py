@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from posts import search
+
+
+class Command(BaseCommand):
+    help = 'Переиндексирует посты и комментарии для полнотекстового поиска'
+
+    def handle(self, *args, **options):
+        if not search.is_available():
+            self.stdout.write(self.style.WARNING(
+                'Индекс FTS5 доступен только на SQLite'
+            ))
+            return
+        search.rebuild()
+        self.stdout.write(self.style.SUCCESS('Поисковый индекс пересобран'))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from posts import graph
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает подсказки «на кого подписаться» пачками '
+        'пользователей; запускается периодически, например раз в сутки'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        count = graph.rebuild_suggestions(options['batch_size'])
+        self.stdout.write(f'Подсказок: {count}')
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from posts import counters
+
+
+class Command(BaseCommand):
+    help = 'Сверяет денормализованные счётчики с данными и чинит расхождения'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать расхождения, ничего не меняя',
+        )
+
+    def handle(self, *args, **options):
+        report = counters.reconcile(fix=not options['dry_run'])
+        for label, drifted in report.items():
+            style = self.style.WARNING if drifted else self.style.SUCCESS
+            self.stdout.write(style(f'{label}: расхождений {drifted}'))
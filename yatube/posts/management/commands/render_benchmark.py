@@ -0,0 +1,125 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.template import Context, Engine
+from django.template.backends.django import get_installed_libraries
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from core.benchmark import percentile
+from posts import caching, links
+from posts.models import Post
+from posts.templatetags.post_cards import CARD_TEMPLATE
+
+PAGES = {
+    'include.html': (
+        '{% for post in page_obj %}'
+        f"{{% include '{CARD_TEMPLATE}' %}}"
+        '{% endfor %}'
+    ),
+    'tag.html': (
+        '{% load post_cards %}'
+        '{% for post in page_obj %}{% post_card post button %}{% endfor %}'
+    ),
+}
+# Фрагментный кэш отключён: сравнивается сам рендеринг карточек.
+NO_CACHE = {
+    'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+}
+
+
+def engine(cached):
+    loaders = [
+        ('django.template.loaders.locmem.Loader', PAGES),
+        'django.template.loaders.filesystem.Loader',
+        'django.template.loaders.app_directories.Loader',
+    ]
+    if cached:
+        loaders = [('django.template.loaders.cached.Loader', loaders)]
+    return Engine(
+        dirs=settings.TEMPLATES[0]['DIRS'], loaders=loaders,
+        libraries=get_installed_libraries(),
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает время рендеринга карточки поста: include без кэша '
+        'шаблонов, include с кэшированным загрузчиком и тег post_card '
+        'со скомпилированной функцией, а также адреса карточки через '
+        'reverse() и posts.links'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--posts', type=int, default=settings.POSTS_FOR_ONE_PAGE,
+            help='Карточек на странице',
+        )
+        parser.add_argument('--rounds', type=int, default=200)
+        parser.add_argument('--warmup', type=int, default=10)
+
+    def measure(self, engine, page, posts, options):
+        timings = []
+        for number in range(options['warmup'] + options['rounds']):
+            start = time.perf_counter()
+            engine.get_template(page).render(
+                Context({'page_obj': posts, 'button': True})
+            )
+            if number >= options['warmup']:
+                timings.append((time.perf_counter() - start) / len(posts))
+        return sorted(timings)
+
+    def measure_links(self, build, posts, options):
+        timings = []
+        for number in range(options['warmup'] + options['rounds']):
+            start = time.perf_counter()
+            for post in posts:
+                build('posts:profile', post.author.username)
+                build('posts:post_detail', post.pk)
+                if post.group:
+                    build('posts:group_list', post.group.slug)
+            if number >= options['warmup']:
+                timings.append((time.perf_counter() - start) / len(posts))
+        return sorted(timings)
+
+    def report(self, name, timings, baseline):
+        mean = sum(timings) / len(timings)
+        self.stdout.write(
+            f'{name:<16} mean={mean * 1e6:.1f}мкс '
+            f'p50={percentile(timings, 50) * 1e6:.1f}мкс '
+            f'p95={percentile(timings, 95) * 1e6:.1f}мкс '
+            f'на карточку, x{(baseline or mean) / mean:.1f}'
+        )
+        return mean
+
+    def handle(self, *args, **options):
+        if options['rounds'] < 1:
+            raise CommandError('--rounds должно быть больше нуля')
+        posts = list(Post.objects.select_related(
+            'group', 'author'
+        ).with_comment_stats().order_by('-pub_date')[:options['posts']])
+        if not posts:
+            raise CommandError('Нет постов, сначала выполните generate_data')
+        caching.attach_card_tokens(posts)
+        modes = (
+            ('include', engine(cached=False), 'include.html', False),
+            ('include+cached', engine(cached=True), 'include.html', False),
+            ('compiled', engine(cached=True), 'tag.html', True),
+        )
+        baseline = None
+        with override_settings(CACHES=NO_CACHE):
+            for name, mode_engine, page, compiled in modes:
+                with override_settings(COMPILED_POST_CARDS=compiled):
+                    timings = self.measure(mode_engine, page, posts, options)
+                mean = self.report(name, timings, baseline)
+                baseline = baseline or mean
+        baseline = None
+        for name, build in (('reverse', self.reverse), ('links', links.url)):
+            timings = self.measure_links(build, posts, options)
+            mean = self.report(name, timings, baseline)
+            baseline = baseline or mean
+
+    @staticmethod
+    def reverse(name, *args):
+        return reverse(name, args=args)
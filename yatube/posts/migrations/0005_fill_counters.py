@@ -0,0 +1,41 @@
+from django.db import migrations
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count(model, field, outer):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{field: OuterRef(outer)})
+            .order_by()
+            .values(field)
+            .annotate(count=Count('pk'))
+            .values('count')
+        ),
+        0,
+    )
+
+
+def fill_counters(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    Group = apps.get_model('posts', 'Group')
+    Follow = apps.get_model('posts', 'Follow')
+    Profile = apps.get_model('users', 'Profile')
+    Profile.objects.update(
+        posts_count=count(Post, 'author_id', 'user_id'),
+        followers_count=count(Follow, 'author_id', 'user_id'),
+        following_count=count(Follow, 'user_id', 'user_id'),
+    )
+    Group.objects.update(posts_count=count(Post, 'group_id', 'pk'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0004_group_posts_count'),
+        ('users', '0002_profile_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
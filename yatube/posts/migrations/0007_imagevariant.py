@@ -0,0 +1,30 @@
+# Generated by Django 2.2.19 on 2026-10-18 17:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0006_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageVariant',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(db_index=True, max_length=255)),
+                ('spec', models.CharField(max_length=16)),
+                ('width', models.PositiveIntegerField()),
+                ('height', models.PositiveIntegerField()),
+                ('format', models.CharField(max_length=8)),
+                ('name', models.CharField(max_length=255)),
+                ('size', models.PositiveIntegerField()),
+                ('source_size', models.PositiveIntegerField()),
+            ],
+            options={
+                'ordering': ['source', 'width'],
+            },
+        ),
+    ]
@@ -1,11 +1,39 @@
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from . import links
 
 
 User = get_user_model()
 
 
+def comment_stats(post_ref='pk'):
+    """Аннотации comments_count и last_comment для поста в поле post_ref."""
+    comments = Comment.objects.filter(post=OuterRef(post_ref)).order_by()
+    return {
+        'comments_count': Coalesce(
+            Subquery(
+                comments.values('post')
+                .annotate(count=Count('pk'))
+                .values('count')
+            ),
+            0,
+        ),
+        'last_comment': Subquery(
+            comments.order_by('-created', '-pk').values('text')[:1]
+        ),
+    }
+
+
+class PostQuerySet(models.QuerySet):
+    def with_comment_stats(self):
+        """Число комментариев и текст последнего из них одним запросом."""
+        return self.annotate(**comment_stats())
+
+
 class Post(models.Model):
     text = models.TextField(
         verbose_name='Текст поста',
@@ -32,13 +60,26 @@ class Post(models.Model):
         help_text='Группа, к которой будет относиться пост'
     )
 
+    objects = PostQuerySet.as_manager()
+
     def __str__(self):
         return self.text[:settings.TEXT_MAX_LENGTH]
 
+    def get_absolute_url(self):
+        return links.post_url(self.pk)
+
     class Meta:
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
         ordering = ['-pub_date']
+        indexes = [
+            models.Index(fields=['-pub_date', '-id'],
+                         name='post_pub_date_idx'),
+            models.Index(fields=['author', '-pub_date', '-id'],
+                         name='post_author_pub_date_idx'),
+            models.Index(fields=['group', '-pub_date', '-id'],
+                         name='post_group_pub_date_idx'),
+        ]
 
 
 class Group(models.Model):
@@ -54,10 +95,14 @@ class Group(models.Model):
         verbose_name='URL',
     )
     description = models.TextField(verbose_name='Описание Группы')
+    posts_count = models.PositiveIntegerField(default=0)
 
     def __str__(self):
         return self.title
 
+    def get_absolute_url(self):
+        return links.group_url(self.slug)
+
     class Meta:
         verbose_name = 'Группу'
         verbose_name_plural = 'Группы'
@@ -65,16 +110,65 @@ class Group(models.Model):
 
 
 class Comment(models.Model):
+    # Материализованный путь: id предков и самого комментария, дополненные
+    # нулями до PATH_WIDTH и разделённые PATH_SEPARATOR. Лексикографический
+    # порядок путей совпадает с порядком обхода ветки, поэтому поддерево —
+    # один запрос по диапазону индекса (post, path).
+    PATH_WIDTH = 10
+    PATH_SEPARATOR = '/'
+
     post = models.ForeignKey(Post, on_delete=models.CASCADE,
                              related_name="comments")
     author = models.ForeignKey(User, on_delete=models.CASCADE,
                                related_name="comments")
+    parent = models.ForeignKey('self', on_delete=models.CASCADE,
+                               blank=True, null=True,
+                               related_name="replies")
+    path = models.CharField(max_length=255, blank=True, default='',
+                            editable=False)
     text = models.TextField()
     created = models.DateTimeField("date published", auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['post', 'created'],
+                         name='comment_post_created_idx'),
+            models.Index(fields=['post', 'path'],
+                         name='comment_post_path_idx'),
+            models.Index(fields=['post', 'parent'],
+                         name='comment_post_parent_idx'),
+        ]
+
     def __str__(self):
         return self.text
 
+    @classmethod
+    def segment(cls, pk):
+        return f'{pk:0{cls.PATH_WIDTH}d}'
+
+    @property
+    def depth(self):
+        return self.path.count(self.PATH_SEPARATOR)
+
+    def subtree_bounds(self):
+        """Границы (от, до) путей ответов на комментарий."""
+        prefix = self.path + self.PATH_SEPARATOR
+        return prefix, prefix[:-1] + chr(ord(self.PATH_SEPARATOR) + 1)
+
+    def save(self, *args, **kwargs):
+        # id известен только после вставки, а комментарий без пути
+        # встал бы не в свою ветку: вставка и путь — одна транзакция.
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if not self.path:
+                segment = self.segment(self.pk)
+                path = (
+                    f'{self.parent.path}{self.PATH_SEPARATOR}{segment}'
+                    if self.parent_id else segment
+                )
+                Comment.objects.filter(pk=self.pk).update(path=path)
+                self.path = path
+
 
 class Follow(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE,
@@ -92,3 +186,80 @@ class Follow(models.Model):
                 name='prevent_self_follow',
             ),
         ]
+        indexes = [
+            models.Index(fields=['author', 'user'],
+                         name='follow_author_user_idx'),
+        ]
+
+
+class FeedEntry(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE,
+                             related_name="feed_entries")
+    post = models.ForeignKey(Post, on_delete=models.CASCADE,
+                             related_name="feed_entries")
+    author = models.ForeignKey(User, on_delete=models.CASCADE,
+                               related_name="+")
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                name='unique_feed_entry'),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-pub_date', '-post'],
+                         name='feed_user_pub_date_post_idx'),
+            models.Index(fields=['user', 'author'],
+                         name='feed_user_author_idx'),
+        ]
+
+
+class ImageVariant(models.Model):
+    source = models.CharField(max_length=255, db_index=True)
+    spec = models.CharField(max_length=16)
+    width = models.PositiveIntegerField()
+    height = models.PositiveIntegerField()
+    format = models.CharField(max_length=8)
+    name = models.CharField(max_length=255)
+    size = models.PositiveIntegerField()
+    source_size = models.PositiveIntegerField()
+
+    class Meta:
+        ordering = ['source', 'width']
+
+
+class TrendingScore(models.Model):
+    post = models.OneToOneField(Post, on_delete=models.CASCADE,
+                                primary_key=True, related_name="trending")
+    group = models.ForeignKey(Group, on_delete=models.SET_NULL,
+                              blank=True, null=True, related_name="+")
+    score = models.FloatField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-score', '-post'],
+                         name='trending_score_idx'),
+            models.Index(fields=['group', '-score', '-post'],
+                         name='trending_group_score_idx'),
+        ]
+
+
+class FollowSuggestion(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE,
+                             related_name="follow_suggestions")
+    author = models.ForeignKey(User, on_delete=models.CASCADE,
+                               related_name="+")
+    # Сколько подписок пользователя подписаны на автора.
+    score = models.PositiveIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'author'],
+                name='unique_follow_suggestion'),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-score', 'author'],
+                         name='suggestion_user_score_idx'),
+        ]
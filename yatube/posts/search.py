@@ -0,0 +1,216 @@
+"""Полнотекстовый поиск по постам и комментариям.
+
+На SQLite индекс — виртуальная таблица FTS5 posts_search, которую
+поддерживают сигналы моделей. Пост хранится под rowid = 2 * id,
+комментарий — под rowid = 2 * id + 1, поэтому обновление и удаление
+документа — это поиск по rowid, без сканирования индекса.
+
+Слова запроса приводятся к основе лёгким стеммером для русского языка
+и ищутся как префиксы, так что «котиков» находит «котик» и «котики».
+На других СУБД поиск деградирует до icontains.
+"""
+import re
+
+from django.db import connections
+from django.db.models import Q
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Post
+from .utils import NEXT, decode_cursor, encode_cursor
+
+TABLE = 'posts_search'
+POST = 'post'
+COMMENT = 'comment'
+MARK_START = '\x02'
+MARK_END = '\x03'
+
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+REFLEXIVE = ('ся', 'сь')
+ENDINGS = sorted((
+    'иями', 'ями', 'ами', 'ого', 'его', 'ому', 'ему', 'ыми', 'ими', 'иях',
+    'ией', 'ешь', 'ете', 'ите', 'ях', 'ах', 'ов', 'ев', 'ей', 'ой', 'ий',
+    'ый', 'ая', 'яя', 'ое', 'ее', 'ые', 'ие', 'ую', 'юю', 'ом', 'ем',
+    'ам', 'ям', 'их', 'ых', 'ть', 'ти', 'ет', 'ют', 'ут', 'ит', 'ат',
+    'ят', 'ла', 'ло', 'ли', 'а', 'я', 'о', 'е', 'ы', 'и', 'у', 'ю', 'ь',
+    'й',
+), key=len, reverse=True)
+MIN_STEM = 3
+
+
+def stem(word):
+    """Отбрасывает типичное окончание русского слова."""
+    word = word.lower().replace('ё', 'е')
+    for ending in REFLEXIVE:
+        if word.endswith(ending) and len(word) - len(ending) >= MIN_STEM:
+            word = word[:-len(ending)]
+            break
+    for ending in ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= MIN_STEM:
+            return word[:-len(ending)]
+    return word
+
+
+def build_query(text):
+    """Запрос FTS5: все основы слов как префиксы."""
+    return ' '.join(f'"{stem(word)}"*' for word in WORD_RE.findall(text))
+
+
+def _connection():
+    return connections[Post.objects.db]
+
+
+def is_available():
+    return _connection().vendor == 'sqlite'
+
+
+def _replace(rowid, text, post_id, kind):
+    if not is_available():
+        return
+    with _connection().cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE} WHERE rowid = %s', [rowid])
+        cursor.execute(
+            f'INSERT INTO {TABLE} (rowid, text, post_id, kind)'
+            ' VALUES (%s, %s, %s, %s)',
+            [rowid, text, post_id, kind],
+        )
+
+
+def _remove(rowid):
+    if not is_available():
+        return
+    with _connection().cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE} WHERE rowid = %s', [rowid])
+
+
+def index_post(post):
+    _replace(2 * post.pk, post.text, post.pk, POST)
+
+
+def unindex_post(post_id):
+    _remove(2 * post_id)
+
+
+def index_comment(comment):
+    _replace(2 * comment.pk + 1, comment.text, comment.post_id, COMMENT)
+
+
+def unindex_comment(comment_id):
+    _remove(2 * comment_id + 1)
+
+
+def rebuild():
+    """Переиндексирует все посты и комментарии."""
+    if not is_available():
+        return
+    with _connection().cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE}')
+        cursor.execute(
+            f'INSERT INTO {TABLE} (rowid, text, post_id, kind)'
+            f" SELECT 2 * id, text, id, '{POST}' FROM posts_post"
+        )
+        cursor.execute(
+            f'INSERT INTO {TABLE} (rowid, text, post_id, kind)'
+            f" SELECT 2 * id + 1, text, post_id, '{COMMENT}'"
+            ' FROM posts_comment'
+        )
+
+
+def highlight(snippet):
+    """Безопасный HTML фрагмента с выделенными совпадениями."""
+    html = escape(snippet)
+    html = html.replace(MARK_START, '<mark>').replace(MARK_END, '</mark>')
+    return mark_safe(html)
+
+
+class SearchResult:
+    def __init__(self, post, kind, snippet):
+        self.post = post
+        self.kind = kind
+        self.snippet = snippet
+
+
+class SearchPage:
+    def __init__(self, results, next_cursor=None):
+        self.results = results
+        self.next_cursor = next_cursor
+
+    def __iter__(self):
+        return iter(self.results)
+
+    def __len__(self):
+        return len(self.results)
+
+
+def _attach_posts(rows):
+    posts = Post.objects.select_related('author', 'group').in_bulk(
+        {row[1] for row in rows}
+    )
+    return [
+        SearchResult(posts[post_id], kind, highlight(snippet))
+        for _, post_id, kind, snippet, _ in rows
+        if post_id in posts
+    ]
+
+
+def _fts_search(query, group_id, author_id, key, limit):
+    where = [f'{TABLE} MATCH %s']
+    params = [query]
+    if key is not None:
+        where.append(f'(rank > %s OR (rank = %s AND {TABLE}.rowid > %s))')
+        params += [key[0], key[0], key[1]]
+    if group_id is not None:
+        where.append('p.group_id = %s')
+        params.append(group_id)
+    if author_id is not None:
+        where.append('p.author_id = %s')
+        params.append(author_id)
+    sql = (
+        f'SELECT {TABLE}.rowid, {TABLE}.post_id, {TABLE}.kind,'
+        f" snippet({TABLE}, 0, '{MARK_START}', '{MARK_END}', '…', 16), rank"
+        f' FROM {TABLE} JOIN posts_post p ON p.id = {TABLE}.post_id'
+        f' WHERE {" AND ".join(where)}'
+        f' ORDER BY rank, {TABLE}.rowid LIMIT %s'
+    )
+    params.append(limit)
+    with _connection().cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def _fallback_search(text, group_id, author_id, key, limit):
+    posts = Post.objects.filter(
+        Q(text__icontains=text) | Q(comments__text__icontains=text)
+    ).distinct()
+    if group_id is not None:
+        posts = posts.filter(group_id=group_id)
+    if author_id is not None:
+        posts = posts.filter(author_id=author_id)
+    if key is not None:
+        posts = posts.filter(pk__lt=key[1])
+    rows = posts.order_by('-pk').values_list('pk', 'text')[:limit]
+    return [(pk, pk, POST, text[:200], 0) for pk, text in rows]
+
+
+def search(text, group_id=None, author_id=None, cursor=None, per_page=10):
+    """Страница результатов, отсортированных по релевантности (bm25).
+
+    Пагинация курсорная по паре (rank, rowid).
+    """
+    query = build_query(text)
+    if not query:
+        return SearchPage([])
+    key = None
+    decoded = decode_cursor(cursor) if cursor else None
+    if decoded and decoded[0] == NEXT and decoded[1] and len(decoded[1]) == 2:
+        key = decoded[1]
+    if is_available():
+        rows = _fts_search(query, group_id, author_id, key, per_page + 1)
+    else:
+        rows = _fallback_search(text, group_id, author_id, key, per_page + 1)
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        rowid, _, _, _, rank = rows[-1]
+        next_cursor = encode_cursor(NEXT, [rank, rowid])
+    return SearchPage(_attach_posts(rows), next_cursor)
@@ -0,0 +1,161 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from users.models import Profile
+
+from . import caching, counters, graph, search, timeline, trending
+from .models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+@receiver(pre_save, sender=Post)
+def remember_group(sender, instance, **kwargs):
+    instance._previous_group_id = None
+    if instance.pk is not None:
+        instance._previous_group_id = Post.objects.filter(
+            pk=instance.pk
+        ).values_list('group_id', flat=True).first()
+
+
+@receiver(post_save, sender=Post)
+def count_post(sender, instance, created, **kwargs):
+    if created:
+        counters.change_author_posts(instance.author_id, 1)
+        counters.change_group_posts(instance.group_id, 1)
+    elif instance._previous_group_id != instance.group_id:
+        counters.change_group_posts(instance._previous_group_id, -1)
+        counters.change_group_posts(instance.group_id, 1)
+
+
+@receiver(post_delete, sender=Post)
+def uncount_post(sender, instance, **kwargs):
+    counters.change_author_posts(instance.author_id, -1)
+    counters.change_group_posts(instance.group_id, -1)
+
+
+@receiver(post_save, sender=Post)
+def fan_out_post(sender, instance, created, **kwargs):
+    # Дата публикации и автор при редактировании не меняются, а удаление
+    # поста каскадно удаляет его записи в лентах.
+    if created:
+        timeline.fan_out(instance)
+
+
+@receiver(post_save, sender=Follow)
+def count_follow(sender, instance, created, **kwargs):
+    if created:
+        counters.change_follows(instance.user_id, instance.author_id, 1)
+
+
+@receiver(post_delete, sender=Follow)
+def uncount_follow(sender, instance, **kwargs):
+    counters.change_follows(instance.user_id, instance.author_id, -1)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_timeline(sender, instance, created, **kwargs):
+    if created:
+        timeline.follow(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def trim_timeline(sender, instance, **kwargs):
+    timeline.unfollow(instance.user_id, instance.author_id)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post(sender, instance, **kwargs):
+    scopes = [
+        ('posts',),
+        ('post', instance.pk),
+        ('author', instance.author_id),
+        ('group', instance.group_id),
+    ]
+    previous_group_id = getattr(instance, '_previous_group_id', None)
+    if previous_group_id is not None:
+        scopes.append(('group', previous_group_id))
+    caching.bump(*scopes)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comment(sender, instance, **kwargs):
+    scopes = [('posts',), ('post', instance.post_id)]
+    try:
+        post = instance.post
+    except Post.DoesNotExist:
+        # Пост удалён каскадно, его области сбросит invalidate_post.
+        post = None
+    if post is not None:
+        scopes += [('author', post.author_id), ('group', post.group_id)]
+    caching.bump(*scopes)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_follow(sender, instance, **kwargs):
+    caching.bump(
+        ('author', instance.author_id), ('author', instance.user_id),
+        ('following', instance.user_id),
+    )
+    graph.invalidate(instance.user_id, instance.author_id)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_group(sender, instance, **kwargs):
+    caching.bump(('groups',), ('group', instance.pk))
+
+
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+def invalidate_profile(sender, instance, **kwargs):
+    caching.bump(('author', instance.user_id))
+
+
+@receiver(post_save, sender=User)
+def invalidate_user(sender, instance, created, update_fields=None,
+                    **kwargs):
+    # У нового пользователя ещё нет карточек, а вход в систему сохраняет
+    # только last_login, который нигде не показывается.
+    if created or (update_fields is not None
+                   and set(update_fields) <= {'last_login'}):
+        return
+    caching.bump(('users',), ('author', instance.pk))
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, **kwargs):
+    search.index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    search.unindex_post(instance.pk)
+
+
+@receiver(post_save, sender=Comment)
+def index_comment(sender, instance, **kwargs):
+    search.index_comment(instance)
+
+
+@receiver(post_delete, sender=Comment)
+def unindex_comment(sender, instance, **kwargs):
+    search.unindex_comment(instance.pk)
+
+
+@receiver(post_save, sender=Post)
+def trend_post(sender, instance, created, **kwargs):
+    if created:
+        trending.add_post(instance)
+    elif instance._previous_group_id != instance.group_id:
+        trending.move_post(instance)
+
+
+@receiver(post_save, sender=Comment)
+def trend_comment(sender, instance, created, **kwargs):
+    if created:
+        trending.add_comment(instance)
@@ -0,0 +1,164 @@
+"""Ленты Atom, RSS и JSON Feed для главной, групп и авторов.
+
+Лента зависит от тех же областей версий, что и HTML-страница, поэтому
+ETag считается по их токенам без запросов к постам, и опрос без новых
+записей стоит 304. Документ отдаётся потоком по мере чтения постов и
+заодно целиком кладётся в кэш под ключом с токенами: следующие
+читатели получают готовый блоб, пока сигналы не сменят токен.
+"""
+import hashlib
+import json
+from io import StringIO
+from itertools import chain
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.feedgenerator import (Atom1Feed, Rss201rev2Feed,
+                                        SyndicationFeed)
+from django.utils.http import quote_etag
+from django.utils.text import Truncator
+from django.utils.xmlutils import SimplerXMLGenerator
+
+from . import caching
+
+
+class _StreamingXMLFeed:
+    """Пишет шапку документа, затем по элементу на пост, затем хвост."""
+
+    item_tag = None
+    tail = None
+
+    def latest_post_date(self):
+        return self.feed['updated']
+
+    def stream(self, items):
+        head = self.writeString('utf-8')
+        assert head.endswith(self.tail)
+        yield head[:-len(self.tail)]
+        for item in items:
+            self.add_item(**item)
+            item = self.items.pop()
+            buffer = StringIO()
+            handler = SimplerXMLGenerator(buffer, 'utf-8')
+            handler.startElement(self.item_tag, self.item_attributes(item))
+            self.add_item_elements(handler, item)
+            handler.endElement(self.item_tag)
+            yield buffer.getvalue()
+        yield self.tail
+
+
+class AtomFeed(_StreamingXMLFeed, Atom1Feed):
+    item_tag = 'entry'
+    tail = '</feed>'
+
+
+class RssFeed(_StreamingXMLFeed, Rss201rev2Feed):
+    item_tag = 'item'
+    tail = '</channel></rss>'
+
+
+class JSONFeed(SyndicationFeed):
+    """JSON Feed 1.1 (https://jsonfeed.org/version/1.1)."""
+
+    content_type = 'application/feed+json; charset=utf-8'
+
+    def stream(self, items):
+        head = json.dumps({
+            'version': 'https://jsonfeed.org/version/1.1',
+            'title': self.feed['title'],
+            'home_page_url': self.feed['link'],
+            'feed_url': self.feed['feed_url'],
+            'description': self.feed['description'],
+        }, ensure_ascii=False)
+        yield head[:-1] + ', "items": ['
+        for number, item in enumerate(items):
+            entry = {
+                'id': item['unique_id'],
+                'url': item['link'],
+                'title': item['title'],
+                'content_text': item['description'],
+                'date_published': item['pubdate'].isoformat(),
+                'authors': [{'name': item['author_name']}],
+            }
+            if item['categories']:
+                entry['tags'] = item['categories']
+            yield (', ' if number else '') + json.dumps(
+                entry, ensure_ascii=False
+            )
+        yield ']}'
+
+
+FORMATS = {'atom': AtomFeed, 'rss': RssFeed, 'json': JSONFeed}
+
+
+def _items(request, posts):
+    for post in posts:
+        link = request.build_absolute_uri(
+            reverse('posts:post_detail', args=[post.pk])
+        )
+        yield {
+            'title': Truncator(post.text.split('\n', 1)[0]).chars(80),
+            'link': link,
+            'description': post.text,
+            'unique_id': link,
+            'pubdate': post.pub_date,
+            'author_name': post.author.get_full_name()
+            or post.author.username,
+            'categories': [post.group.title] if post.group else [],
+        }
+
+
+def _caching(key, chunks):
+    parts = []
+    for chunk in chunks:
+        parts.append(chunk)
+        yield chunk
+    cache.set(key, ''.join(parts), settings.SYNDICATION_CACHE_TIMEOUT)
+
+
+def feed_response(request, fmt, scopes, describe, post_list):
+    """Лента fmt из постов post_list, зависящая от областей scopes.
+
+    describe() возвращает title, link и description ленты; она и запрос
+    постов выполняются, только если документа ещё нет в кэше.
+    """
+    if fmt not in FORMATS or scopes is None:
+        raise Http404
+    feed_class = FORMATS[fmt]
+    token = caching.get_token(*scopes, ('users',), ('groups',))
+    digest = hashlib.md5(
+        f'{request.get_host()}\n{request.path}\n{token}'.encode()
+    ).hexdigest()
+    etag = quote_etag(digest)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        key = f'syndication:{digest}'
+        blob = cache.get(key)
+        if blob is not None:
+            response = HttpResponse(blob, content_type=feed_class.content_type)
+        else:
+            posts = post_list.select_related('author', 'group').order_by(
+                '-pub_date', '-pk'
+            )[:settings.SYNDICATION_ITEMS]
+            rows = posts.iterator()
+            first = next(rows, None)
+            posts = [] if first is None else chain([first], rows)
+            meta = describe()
+            feed = feed_class(
+                title=meta['title'],
+                link=request.build_absolute_uri(meta['link']),
+                description=meta['description'],
+                feed_url=request.build_absolute_uri(),
+                language='ru',
+                updated=first.pub_date if first else timezone.now(),
+            )
+            response = StreamingHttpResponse(
+                _caching(key, feed.stream(_items(request, posts))),
+                content_type=feed_class.content_type,
+            )
+    response['ETag'] = etag
+    return caching.set_cache_headers(request, response)
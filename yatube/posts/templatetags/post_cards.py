@@ -0,0 +1,110 @@
+"""Тег {% post_card post button %}: карточка поста в ленте.
+
+Карточка рендерится в каждой ленте по разу на пост, поэтому вне DEBUG
+(COMPILED_POST_CARDS) она собирается функцией render_card без движка
+шаблонов. В режиме разработки тег рендерит CARD_TEMPLATE, чтобы правки
+разметки были видны сразу; render_card повторяет этот шаблон, и тест
+сверяет их вывод. Обе ветки кэшируют карточку так же, как {% cache %}.
+"""
+from functools import lru_cache
+
+from django import template
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.utils import make_template_fragment_key
+from django.template.defaultfilters import date
+from django.utils.safestring import mark_safe
+from django.utils.timezone import template_localtime
+from django.utils.translation import get_language
+
+from posts import links
+
+from .post_images import picture
+
+register = template.Library()
+
+CARD_TEMPLATE = 'includes/create-one-post.html'
+CARD_TIMEOUT = 3600
+CARD_SIZES = '(max-width: 960px) 100vw, 960px'
+HTML_ESCAPES = {
+    ord('&'): '&amp;',
+    ord('<'): '&lt;',
+    ord('>'): '&gt;',
+    ord('"'): '&quot;',
+    ord("'"): '&#39;',
+}
+
+
+def fragment_cache():
+    if 'template_fragments' in settings.CACHES:
+        return caches['template_fragments']
+    return caches['default']
+
+
+def _escape(value):
+    # Как django.utils.html.escape, но без обёртки keep_lazy.
+    return str(value).translate(HTML_ESCAPES)
+
+
+@lru_cache(maxsize=1024)
+def _date(day, language):
+    return _escape(date(day, 'd E Y'))
+
+
+def render_card(post, button):
+    """Разметка CARD_TEMPLATE, собранная без шаблонизатора.
+
+    Даты повторяются от карточки к карточке и запоминаются, адреса
+    собирает posts.links.
+    """
+    author = post.author.username
+    profile_url = _escape(links.profile_url(author))
+    detail_url = _escape(links.post_url(post.pk))
+    pub_date = _date(
+        template_localtime(post.pub_date).date(), get_language()
+    )
+    parts = [
+        f'<article><ul><li>Автор: {_escape(author)} '
+        f'<a class="btn btn-sm btn-primary" href="{profile_url}">'
+        f'все посты пользователя</a></li>'
+        f'<li>Дата публикации: {pub_date}</li>'
+    ]
+    if post.image:
+        parts.append(picture(
+            post.image, 'post_card', sizes=CARD_SIZES,
+            pictures=getattr(post, 'pictures', None),
+        ))
+    parts.append(
+        f'</ul><p>{_escape(post.text)}</p>'
+        f'<a class="btn btn-sm btn-primary" href="{detail_url}">'
+        f'подробная информация</a>'
+    )
+    if post.comments_count:
+        parts.append(
+            f'<div>Комментариев: {post.comments_count}</div>'
+            f'<div>{_escape(post.last_comment)}</div>'
+        )
+    if post.group and button:
+        group_url = _escape(links.group_url(post.group.slug))
+        parts.append(
+            f'<a class="btn btn-sm btn-primary" href="{group_url}">'
+            f'все записи группы</a>'
+        )
+    parts.append('</article>')
+    return mark_safe(''.join(parts))
+
+
+@register.simple_tag(takes_context=True)
+def post_card(context, post, button=False):
+    if not settings.COMPILED_POST_CARDS:
+        card = context.template.engine.get_template(CARD_TEMPLATE)
+        return card.render(context.new({'post': post, 'button': button}))
+    cache = fragment_cache()
+    key = make_template_fragment_key(
+        'post_card', [post.pk, post.cache_version, button]
+    )
+    html = cache.get(key)
+    if html is None:
+        html = render_card(post, button)
+        cache.set(key, html, CARD_TIMEOUT)
+    return mark_safe(html)
@@ -0,0 +1,56 @@
+from django import template
+from django.core.files.storage import default_storage
+from django.utils.html import format_html, format_html_join
+
+from posts import images, thumbnails
+
+register = template.Library()
+
+
+@register.simple_tag
+def ready_thumbnail(fieldfile, spec):
+    """Миниатюра, если она готова, иначе оригинальный файл."""
+    return thumbnails.ready_thumbnail(fieldfile, spec) or fieldfile
+
+
+@register.simple_tag
+def picture(fieldfile, spec, sizes='100vw', pictures=None, **attrs):
+    """Разметка <picture> с srcset по всем готовым вариантам картинки.
+
+    Пока варианты не сгенерированы, выводится обычный <img> с миниатюрой
+    или оригиналом. pictures — загрузчик images.PagePictures, которым
+    карточки страницы читают варианты и миниатюры разом.
+    """
+    if not fieldfile:
+        return ''
+    attributes = format_html_join(
+        '', ' {}="{}"', sorted(attrs.items())
+    )
+    loaded = pictures.get(fieldfile, spec) if pictures else None
+    if loaded is None:
+        variants = images.variants_for(fieldfile.name, spec)
+        thumbnail = None if variants else ready_thumbnail(fieldfile, spec)
+    else:
+        variants, thumbnail = loaded
+    if not variants:
+        image = thumbnail or fieldfile
+        return format_html('<img src="{}"{}>', image.url, attributes)
+    srcsets = {}
+    for extension, width, _, name in variants:
+        srcsets.setdefault(extension, []).append(
+            f'{default_storage.url(name)} {width}w'
+        )
+    *modern, fallback = [
+        extension for _, extension, _ in images.FORMATS
+        if extension in srcsets
+    ]
+    sources = format_html_join(
+        '', '<source type="{}" srcset="{}" sizes="{}">',
+        ((images.MIME_TYPES[extension], ', '.join(srcsets[extension]), sizes)
+         for extension in modern),
+    )
+    largest = srcsets[fallback][-1].rsplit(' ', 1)[0]
+    return format_html(
+        '<picture>{}<img src="{}" srcset="{}" sizes="{}"{}></picture>',
+        sources, largest, ', '.join(srcsets[fallback]), sizes, attributes,
+    )
@@ -0,0 +1,11 @@
+from django import template
+
+from posts import links
+
+register = template.Library()
+
+
+@register.simple_tag
+def link(name, *args):
+    """{% url %} для адресов лент через запомненные posts.links."""
+    return links.url(name, *args)
@@ -0,0 +1,149 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DatabaseError, connection
+from django.db.models.query import QuerySet
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import comments
+from ..forms import CommentForm
+from ..models import Comment, Post
+
+User = get_user_model()
+
+
+@override_settings(COMMENTS_PER_PAGE=2)
+class CommentThreadTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='commentator')
+        self.post = Post.objects.create(author=self.user, text='Пост')
+
+    def tearDown(self):
+        cache.clear()
+
+    def comment(self, text, parent=None):
+        return Comment.objects.create(
+            post=self.post, author=self.user, text=text, parent=parent
+        )
+
+    def texts(self, order=comments.OLDEST, cursor=None):
+        page = comments.threads(self.post, order, cursor)
+        return [comment.text for comment in page], page
+
+    def test_reply_path_extends_parent_path(self):
+        root = self.comment('Корень')
+        reply = self.comment('Ответ', parent=root)
+        answer = self.comment('Ответ на ответ', parent=reply)
+        self.assertEqual(root.path, Comment.segment(root.pk))
+        self.assertEqual(
+            Comment.objects.get(pk=answer.pk).path,
+            f'{root.path}/{Comment.segment(reply.pk)}'
+            f'/{Comment.segment(answer.pk)}',
+        )
+        self.assertEqual([root.depth, reply.depth, answer.depth], [0, 1, 2])
+
+    def test_failed_path_update_rolls_back_insert(self):
+        """Комментарий без пути не остаётся в базе."""
+        update = QuerySet.update
+
+        def failing_update(queryset, **kwargs):
+            if queryset.model is Comment and 'path' in kwargs:
+                raise DatabaseError('Сбой')
+            return update(queryset, **kwargs)
+
+        with mock.patch.object(QuerySet, 'update', failing_update):
+            with self.assertRaises(DatabaseError):
+                self.comment('Без пути')
+        self.assertFalse(Comment.objects.filter(text='Без пути').exists())
+
+    def test_pages_keep_threads_together(self):
+        """Ответы идут сразу за своим корнем, страницы — по корням."""
+        first = self.comment('Первый')
+        second = self.comment('Второй')
+        self.comment('Третий')
+        reply = self.comment('Ответ первому', parent=first)
+        self.comment('Ответ на ответ', parent=reply)
+        self.comment('Ответ второму', parent=second)
+        self.comment('Ещё ответ первому', parent=first)
+
+        texts, page = self.texts()
+        self.assertEqual(texts, [
+            'Первый', 'Ответ первому', 'Ответ на ответ', 'Ещё ответ первому',
+            'Второй', 'Ответ второму',
+        ])
+        texts, page = self.texts(cursor=page.next_cursor)
+        self.assertEqual(texts, ['Третий'])
+        self.assertFalse(page.has_next())
+
+        texts, page = self.texts(comments.NEWEST)
+        self.assertEqual(texts, ['Третий', 'Второй', 'Ответ второму'])
+
+    def test_page_costs_two_queries(self):
+        for number in range(3):
+            root = self.comment(f'Корень {number}')
+            for _ in range(5):
+                root = self.comment('Ответ', parent=root)
+        with self.assertNumQueries(2):
+            list(comments.threads(self.post))
+
+    def test_post_detail_queries_do_not_grow_with_comments(self):
+        client = Client()
+        url = reverse('posts:post_detail', args=[self.post.pk])
+
+        def queries():
+            cache.clear()
+            with CaptureQueriesContext(connection) as captured:
+                client.get(url)
+            return len(captured)
+
+        self.comment('Первый')
+        few = queries()
+        for number in range(30):
+            self.comment(f'Комментарий {number}')
+        self.assertEqual(queries(), few)
+
+    def test_fragment_endpoint_returns_next_page(self):
+        for text in ('Первый', 'Второй', 'Третий'):
+            self.comment(text)
+        url = reverse('posts:post_comments', args=[self.post.pk])
+        response = self.client.get(url)
+        self.assertContains(response, 'Второй')
+        self.assertNotContains(response, 'Третий')
+        cursor = response.context['comments'].next_cursor
+        response = self.client.get(url, {'cursor': cursor})
+        self.assertContains(response, 'Третий')
+        self.assertNotContains(response, 'data-fragment')
+
+    def test_reply_form_limits_depth(self):
+        """Ответ глубже предела уходит к предку на пределе."""
+        chain = [self.comment('Корень')]
+        with self.settings(COMMENTS_MAX_DEPTH=2):
+            for _ in range(2):
+                chain.append(self.comment('Ответ', parent=chain[-1]))
+            form = CommentForm(
+                {'text': 'Глубже', 'parent': chain[-1].pk}, post=self.post
+            )
+            self.assertTrue(form.is_valid())
+            self.assertEqual(form.cleaned_data['parent'], chain[1])
+
+    def test_reply_to_other_post_is_rejected(self):
+        other = Post.objects.create(author=self.user, text='Другой')
+        foreign = Comment.objects.create(
+            post=other, author=self.user, text='Чужой'
+        )
+        form = CommentForm(
+            {'text': 'Ответ', 'parent': foreign.pk}, post=self.post
+        )
+        self.assertFalse(form.is_valid())
+
+    def test_bulk_created_roots_get_paths(self):
+        Comment.objects.bulk_create([
+            Comment(post=self.post, author=self.user, text='Из выгрузки'),
+        ])
+        self.assertEqual(comments.fill_root_paths(), 1)
+        comment = Comment.objects.get(text='Из выгрузки')
+        self.assertEqual(comment.path, Comment.segment(comment.pk))
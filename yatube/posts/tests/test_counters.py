@@ -0,0 +1,72 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from users.models import Profile
+
+from ..models import Follow, Group, Post
+
+User = get_user_model()
+
+
+class CountersTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author')
+        self.follower = User.objects.create_user(username='follower')
+        self.group = Group.objects.create(title='Первая', slug='first')
+        self.other_group = Group.objects.create(title='Вторая', slug='second')
+
+    def assertCounters(self, user, **expected):
+        profile = Profile.objects.get(user=user)
+        for field, value in expected.items():
+            with self.subTest(field=field):
+                self.assertEqual(getattr(profile, field), value)
+
+    def test_post_counters(self):
+        """Счётчики постов автора и группы следуют за постами."""
+        post = Post.objects.create(
+            author=self.author, group=self.group, text='Пост'
+        )
+        self.assertCounters(self.author, posts_count=1)
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 1)
+
+        post.group = self.other_group
+        post.save()
+        self.group.refresh_from_db()
+        self.other_group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 0)
+        self.assertEqual(self.other_group.posts_count, 1)
+
+        post.delete()
+        self.assertCounters(self.author, posts_count=0)
+        self.other_group.refresh_from_db()
+        self.assertEqual(self.other_group.posts_count, 0)
+
+    def test_follow_counters(self):
+        follow = Follow.objects.create(user=self.follower, author=self.author)
+        self.assertCounters(self.author, followers_count=1)
+        self.assertCounters(self.follower, following_count=1)
+        follow.delete()
+        self.assertCounters(self.author, followers_count=0)
+        self.assertCounters(self.follower, following_count=0)
+
+    def test_reconcile_repairs_drift(self):
+        """Команда reconcile_counters исправляет расхождения."""
+        Post.objects.create(author=self.author, group=self.group, text='Пост')
+        Follow.objects.create(user=self.follower, author=self.author)
+        Profile.objects.update(
+            posts_count=7, followers_count=7, following_count=7
+        )
+        Group.objects.update(posts_count=7)
+        call_command('reconcile_counters', stdout=StringIO())
+        self.assertCounters(
+            self.author, posts_count=1, followers_count=1, following_count=0
+        )
+        self.assertCounters(
+            self.follower, posts_count=0, followers_count=0, following_count=1
+        )
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 1)
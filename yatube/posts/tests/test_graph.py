@@ -0,0 +1,237 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core import parallel
+
+from .. import graph
+from ..models import Follow, FollowSuggestion, Post
+
+User = get_user_model()
+
+
+class FollowGraphTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.users = [
+            User.objects.create_user(username=f'user{number}')
+            for number in range(6)
+        ]
+
+    def tearDown(self):
+        cache.clear()
+
+    def follow(self, user, *authors):
+        for author in authors:
+            Follow.objects.create(user=user, author=author)
+
+    def test_is_following_many_reads_cache(self):
+        first, *others = self.users
+        self.follow(first, others[0], others[2])
+        ids = [user.pk for user in others]
+        self.assertEqual(
+            graph.is_following_many(first.pk, ids),
+            {others[0].pk, others[2].pk},
+        )
+        with self.assertNumQueries(0):
+            graph.is_following_many(first.pk, ids)
+        self.assertEqual(graph.is_following_many(None, ids), set())
+
+    def test_follow_and_unfollow_invalidate_adjacency(self):
+        user, author = self.users[:2]
+        self.assertFalse(graph.is_following(user.pk, author.pk))
+        ids, complete = graph.adjacency(graph.FOLLOWERS, author.pk)
+        self.assertEqual((list(ids), complete), ([], True))
+        self.follow(user, author)
+        self.assertTrue(graph.is_following(user.pk, author.pk))
+        ids, complete = graph.adjacency(graph.FOLLOWERS, author.pk)
+        self.assertEqual((list(ids), complete), ([user.pk], True))
+        Follow.objects.filter(user=user, author=author).delete()
+        self.assertFalse(graph.is_following(user.pk, author.pk))
+
+    @override_settings(FOLLOWS_PER_PAGE=2)
+    def test_follower_pages(self):
+        author, *followers = self.users
+        for follower in followers:
+            self.follow(follower, author)
+        expected = sorted((user.pk for user in followers), reverse=True)
+        seen = []
+        page = graph.page(graph.FOLLOWERS, author.pk)
+        self.assertFalse(page.has_previous())
+        while True:
+            seen.extend(user.pk for user in page)
+            if not page.has_next():
+                break
+            page = graph.page(graph.FOLLOWERS, author.pk, page.next_cursor)
+        self.assertEqual(seen, expected)
+        back = graph.page(graph.FOLLOWERS, author.pk, page.previous_cursor)
+        self.assertEqual([user.pk for user in back], expected[2:4])
+        last = graph.page(graph.FOLLOWERS, author.pk, page.last_cursor)
+        self.assertEqual([user.pk for user in last], expected[-2:])
+
+    @override_settings(GRAPH_HEAD_SIZE=2, FOLLOWS_PER_PAGE=2)
+    def test_cached_head_is_capped(self):
+        """В кэше только голова списка, глубже — запросы по индексу."""
+        author, *followers = self.users
+        for follower in followers:
+            self.follow(follower, author)
+        expected = sorted((user.pk for user in followers), reverse=True)
+        with CaptureQueriesContext(connection) as captured:
+            ids, complete = graph.adjacency(graph.FOLLOWERS, author.pk)
+        self.assertEqual((list(ids), complete), (expected[1::-1], False))
+        self.assertEqual(len(captured), 1)
+        self.assertIn('LIMIT 3', captured[0]['sql'])
+
+        seen = []
+        page = graph.page(graph.FOLLOWERS, author.pk)
+        while True:
+            seen.extend(user.pk for user in page)
+            if not page.has_next():
+                break
+            page = graph.page(graph.FOLLOWERS, author.pk, page.next_cursor)
+        self.assertEqual(seen, expected)
+        back = graph.page(graph.FOLLOWERS, author.pk, page.previous_cursor)
+        self.assertEqual([user.pk for user in back], expected[2:4])
+        last = graph.page(graph.FOLLOWERS, author.pk, page.last_cursor)
+        self.assertEqual([user.pk for user in last], expected[-2:])
+
+        user = followers[0]
+        authors = [pk for pk in expected if pk != user.pk]
+        self.follow(user, *User.objects.filter(pk__in=authors))
+        self.assertEqual(graph.is_following_many(user.pk, authors),
+                         set(authors))
+        Follow.objects.filter(user=user, author_id=min(authors)).delete()
+        self.assertFalse(graph.is_following(user.pk, min(authors)))
+
+    def test_follow_list_view(self):
+        author, follower, viewer = self.users[:3]
+        self.follow(follower, author)
+        self.follow(viewer, follower)
+        self.client.force_login(viewer)
+        response = self.client.get(
+            reverse('posts:followers', args=[author.username])
+        )
+        self.assertContains(response, follower.username)
+        self.assertEqual(
+            [item.is_followed for item in response.context['page_obj']],
+            [True],
+        )
+        self.assertContains(response, f'Отписаться от {follower.username}')
+        response = self.client.get(
+            reverse('posts:following', args=[follower.username])
+        )
+        self.assertEqual(list(response.context['page_obj']), [author])
+
+    def test_suggestions_are_friends_of_friends(self):
+        user, friend, other_friend, popular, niche, followed = self.users
+        self.follow(user, friend, other_friend, followed)
+        self.follow(friend, popular, niche, followed)
+        self.follow(other_friend, popular, user)
+        out = StringIO()
+        call_command('rebuild_suggestions', stdout=out)
+        self.assertEqual(
+            list(FollowSuggestion.objects.filter(user=user).order_by(
+                '-score', 'author'
+            ).values_list('author', 'score')),
+            [(popular.pk, 2), (niche.pk, 1)],
+        )
+        self.follow(user, popular)
+        with self.assertNumQueries(2):
+            shown = graph.suggestions(user.pk)
+        self.assertEqual([row.author for row in shown], [niche])
+
+    def test_follow_page_shows_suggestions(self):
+        user, friend, author = self.users[:3]
+        self.follow(user, friend)
+        self.follow(friend, author)
+        graph.rebuild_suggestions()
+        self.client.force_login(user)
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertContains(response, 'На кого подписаться')
+        self.assertContains(response, author.username)
+
+
+class FollowStatesTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.viewer = User.objects.create_user(username='viewer')
+        self.client.force_login(self.viewer)
+
+    def tearDown(self):
+        cache.clear()
+
+    def add_authors(self, count):
+        authors = [
+            User.objects.create_user(username=f'author{User.objects.count()}')
+            for _ in range(count)
+        ]
+        for author in authors:
+            Post.objects.create(author=author, text=f'Пост {author}')
+        return authors
+
+    def test_states_are_loaded_once_per_request(self):
+        followed, other = self.add_authors(2)
+        Follow.objects.create(user=self.viewer, author=followed)
+        states = graph.FollowStates(self.viewer.pk)
+        states.annotate([followed, other])
+        self.assertEqual([followed.is_followed, other.is_followed],
+                         [True, False])
+        with self.assertNumQueries(0):
+            states.annotate([User(pk=followed.pk), User(pk=other.pk)])
+
+    def test_index_queries_do_not_grow_with_authors(self):
+        """Кнопки подписки на странице не добавляют запросов на автора."""
+        def queries():
+            cache.clear()
+            client = Client()
+            client.force_login(self.viewer)
+            with CaptureQueriesContext(connection) as captured:
+                response = client.get(reverse('posts:index'))
+            return len(captured), response
+
+        followed, = self.add_authors(1)
+        Follow.objects.create(user=self.viewer, author=followed)
+        few, _ = queries()
+        self.add_authors(5)
+        many, response = queries()
+        self.assertEqual(many, few)
+        self.assertContains(response, f'Отписаться от {followed.username}')
+        self.assertContains(response, 'Подписаться на author', count=5)
+
+    def test_follow_changes_etag(self):
+        author, = self.add_authors(1)
+        url = reverse('posts:index')
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304
+        )
+        Follow.objects.create(user=self.viewer, author=author)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, f'Отписаться от {author.username}')
+
+    def test_profile_follow_state_is_gathered(self):
+        """Состояние подписки в profile читается вместе со страницей."""
+        author, = self.add_authors(1)
+        Follow.objects.create(user=self.viewer, author=author)
+        calls = []
+        original = parallel.gather
+
+        def gather(*funcs):
+            calls.append(len(funcs))
+            return original(*funcs)
+
+        with mock.patch.object(parallel, 'gather', gather):
+            response = self.client.get(
+                reverse('posts:profile', args=[author.username])
+            )
+        self.assertEqual(calls, [3])
+        self.assertTrue(response.context['author'].is_followed)
+        self.assertContains(response, 'Отписаться')
@@ -0,0 +1,166 @@
+import io
+import tempfile
+from shutil import rmtree
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.template import Context, Template
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from PIL import Image
+
+from .. import images, thumbnails
+from ..models import ImageVariant, Post
+
+User = get_user_model()
+
+
+def make_jpeg(width, height):
+    buffer = io.BytesIO()
+    Image.new('RGB', (width, height), (200, 120, 40)).save(
+        buffer, 'JPEG', quality=100
+    )
+    return buffer.getvalue()
+
+
+class ImageVariantTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        settings.MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+    @classmethod
+    def tearDownClass(cls):
+        rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='photographer')
+        self.post = Post.objects.create(
+            author=self.user,
+            text='Пост с большой картинкой',
+            image=SimpleUploadedFile(
+                'big.jpg', make_jpeg(1920, 1080), content_type='image/jpeg'
+            ),
+        )
+
+    def tearDown(self):
+        cache.clear()
+
+    def render_picture(self):
+        return Template(
+            "{% load post_images %}{% picture image 'post_card' %}"
+        ).render(Context({'image': self.post.image}))
+
+    def test_variants_have_all_widths_and_formats(self):
+        """Для каждой ширины создаётся вариант в каждом доступном формате."""
+        variants = images.generate(self.post.image.name, 'post_card')
+        formats = [extension for _, extension in images.supported_formats()]
+        self.assertIn('jpg', formats)
+        self.assertEqual(
+            sorted((v.width, v.format) for v in variants),
+            sorted(
+                (width, extension)
+                for width in images.SPECS['post_card']['widths']
+                for extension in formats
+            ),
+        )
+        for variant in variants:
+            self.assertTrue(default_storage.exists(variant.name))
+            self.assertEqual(
+                variant.height, round(variant.width * 339 / 960)
+            )
+
+    def test_names_depend_on_content_only(self):
+        """Имена вариантов — хэш содержимого, повтор ничего не плодит."""
+        first = {v.name for v in images.generate(
+            self.post.image.name, 'post_card'
+        )}
+        second = {v.name for v in images.generate(
+            self.post.image.name, 'post_card'
+        )}
+        self.assertEqual(first, second)
+        self.assertEqual(
+            ImageVariant.objects.filter(source=self.post.image.name).count(),
+            len(first),
+        )
+
+    def test_picture_tag_emits_srcset(self):
+        """Тег picture выводит srcset по ширинам после генерации."""
+        self.assertNotIn('srcset', self.render_picture())
+        images.generate(self.post.image.name, 'post_card')
+        html = self.render_picture()
+        self.assertIn('<picture>', html)
+        for width in images.SPECS['post_card']['widths']:
+            self.assertIn(f' {width}w', html)
+
+    def test_savings_report(self):
+        """Отчёт показывает экономию байтов для каждого варианта."""
+        images.generate(self.post.image.name, 'post_card')
+        rows = list(images.savings())
+        self.assertEqual(
+            len(rows), ImageVariant.objects.count()
+        )
+        smallest = rows[0]
+        self.assertEqual(smallest['width'], 320)
+        self.assertGreater(smallest['percent'], 0)
+        out = io.StringIO()
+        call_command('image_savings', stdout=out)
+        self.assertIn('post_card 320w', out.getvalue())
+
+    def add_image_posts(self, amount):
+        for number in range(amount):
+            post = Post.objects.create(
+                author=self.user,
+                text=f'Пост с картинкой {number}',
+                image=SimpleUploadedFile(
+                    f'small{number}.jpg', make_jpeg(64, 48),
+                    content_type='image/jpeg',
+                ),
+            )
+            # У половины картинок уже есть варианты, у остальных — нет,
+            # и карточка ищет миниатюру в kvstore sorl.
+            if number % 2:
+                images.generate(post.image.name, 'post_card')
+
+    def test_feed_queries_do_not_grow_with_images(self):
+        """Картинки карточек страницы читаются разом, а не по одной."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:profile', args=[self.user.username]),
+        )
+
+        def queries(url):
+            cache.clear()
+            with CaptureQueriesContext(connection) as captured:
+                self.client.get(url)
+            return len(captured)
+
+        few = {url: queries(url) for url in urls}
+        self.add_image_posts(4)
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(queries(url), few[url])
+
+    def test_ready_thumbnails_match_single_lookup(self):
+        self.add_image_posts(2)
+        thumbnails.render(self.post.image.name, 'post')
+        fieldfiles = [post.image for post in Post.objects.all()]
+        cache.clear()
+        ready = thumbnails.ready_thumbnails(fieldfiles, 'post_card')
+        names = [getattr(image, 'name', None) for image in ready.values()]
+        self.assertEqual(names.count(None), 2)
+        for fieldfile in fieldfiles:
+            cache.clear()
+            single = thumbnails.ready_thumbnail(fieldfile, 'post_card')
+            self.assertEqual(
+                getattr(ready[fieldfile.name], 'name', None),
+                getattr(single, 'name', None),
+            )
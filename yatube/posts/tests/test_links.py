@@ -0,0 +1,66 @@
+from django.contrib.auth import get_user_model
+from django.template import Context, Template
+from django.test import TestCase
+from django.urls import NoReverseMatch, reverse, set_script_prefix
+
+from .. import links
+from ..models import Group, Post
+
+User = get_user_model()
+
+
+class LinksTests(TestCase):
+    def test_url_matches_reverse(self):
+        cases = (
+            ('posts:profile', 'author'),
+            ('posts:profile', 'Автор'),
+            ('posts:profile', 'a b+c@d.e'),
+            ('posts:post_detail', 42),
+            ('posts:group_list', 'group-1'),
+            ('posts:post_edit', 7),
+        )
+        for name, value in cases:
+            with self.subTest(name=name, value=value):
+                self.assertEqual(
+                    links.url(name, value), reverse(name, args=[value])
+                )
+
+    def test_invalid_value_raises_no_reverse_match(self):
+        """Значение не по конвертеру даёт ту же ошибку, что reverse()."""
+        for name, value in (
+            ('posts:post_detail', 'abc'),
+            ('posts:group_list', 'не слаг'),
+        ):
+            with self.subTest(name=name):
+                with self.assertRaises(NoReverseMatch):
+                    links.url(name, value)
+
+    def test_url_respects_script_prefix(self):
+        set_script_prefix('/yatube/')
+        try:
+            self.assertEqual(links.post_url(1), '/yatube/posts/1/')
+        finally:
+            set_script_prefix('/')
+        self.assertEqual(links.post_url(1), '/posts/1/')
+
+    def test_get_absolute_url(self):
+        user = User.objects.create_user(username='author')
+        group = Group.objects.create(title='Группа', slug='group')
+        post = Post.objects.create(author=user, group=group, text='Текст')
+        self.assertEqual(
+            post.get_absolute_url(),
+            reverse('posts:post_detail', args=[post.pk]),
+        )
+        self.assertEqual(
+            group.get_absolute_url(),
+            reverse('posts:group_list', args=['group']),
+        )
+        self.assertEqual(
+            user.get_absolute_url(), reverse('posts:profile', args=['author'])
+        )
+
+    def test_link_tag(self):
+        html = Template(
+            "{% load post_links %}{% link 'posts:group_list' slug %}"
+        ).render(Context({'slug': 'group'}))
+        self.assertEqual(html, reverse('posts:group_list', args=['group']))
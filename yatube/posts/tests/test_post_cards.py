@@ -0,0 +1,90 @@
+import re
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.template import Context, Template
+from django.test import TestCase, override_settings
+
+from .. import caching
+from ..models import Comment, Group, Post
+
+User = get_user_model()
+
+NO_CACHE = {
+    'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+}
+PAGE = Template(
+    '{% load post_cards %}'
+    '{% for post in posts %}{% post_card post button %}{% endfor %}'
+)
+
+
+def normalize(html):
+    html = re.sub(r'\s+', ' ', html).replace(' >', '>')
+    return re.sub(r'\s*(<[^>]+>)\s*', r'\1', html).strip()
+
+
+@override_settings(CACHES=NO_CACHE)
+class PostCardTests(TestCase):
+    def setUp(self):
+        author = User.objects.create_user(username='author')
+        group = Group.objects.create(title='Группа', slug='group')
+        commented = Post.objects.create(
+            author=author, group=group, text='С <комментарием>'
+        )
+        Comment.objects.create(post=commented, author=author, text='Ответ')
+        Post.objects.create(author=author, text='Без группы')
+        self.posts = caching.attach_card_tokens(list(
+            Post.objects.select_related('group', 'author')
+            .with_comment_stats().order_by('pk')
+        ))
+
+    def render(self, button):
+        return PAGE.render(Context({'posts': self.posts, 'button': button}))
+
+    def test_compiled_card_matches_template(self):
+        """Скомпилированная карточка совпадает с шаблоном карточки."""
+        for button in (True, False):
+            with self.subTest(button=button):
+                with self.settings(COMPILED_POST_CARDS=False):
+                    expected = self.render(button)
+                with self.settings(COMPILED_POST_CARDS=True):
+                    compiled = self.render(button)
+                self.assertEqual(normalize(compiled), normalize(expected))
+                self.assertIn('С &lt;комментарием&gt;', compiled)
+
+    def test_render_benchmark(self):
+        out = StringIO()
+        call_command('render_benchmark', rounds=2, warmup=0, stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(
+            [line.split()[0] for line in lines],
+            ['include', 'include+cached', 'compiled', 'reverse', 'links'],
+        )
+
+
+class PostCardCacheTests(TestCase):
+    def tearDown(self):
+        cache.clear()
+
+    @override_settings(COMPILED_POST_CARDS=True)
+    def test_compiled_card_is_cached_until_post_changes(self):
+        cache.clear()
+        author = User.objects.create_user(username='author')
+        post = Post.objects.create(author=author, text='Первый текст')
+
+        def render():
+            card = caching.attach_card_tokens(list(
+                Post.objects.select_related('group', 'author')
+                .with_comment_stats()
+            ))
+            return PAGE.render(Context({'posts': card, 'button': True}))
+
+        self.assertIn('Первый текст', render())
+        Post.objects.filter(pk=post.pk).update(text='Второй текст')
+        self.assertIn('Первый текст', render())
+        post.text = 'Второй текст'
+        post.save()
+        self.assertIn('Второй текст', render())
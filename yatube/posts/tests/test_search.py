@@ -0,0 +1,82 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Group, Post
+from ..search import stem
+
+User = get_user_model()
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.other = User.objects.create_user(username='other')
+        cls.group = Group.objects.create(title='Котики', slug='cats')
+        cls.cat_post = Post.objects.create(
+            author=cls.author, group=cls.group,
+            text='Мои котики любят спать на <b>окне</b>',
+        )
+        cls.dog_post = Post.objects.create(
+            author=cls.other, text='Собака гуляет во дворе',
+        )
+        cls.comment = Comment.objects.create(
+            post=cls.dog_post, author=cls.author,
+            text='А у меня дома живёт котик',
+        )
+
+    def setUp(self):
+        self.client = Client()
+
+    def search(self, **params):
+        response = self.client.get(reverse('posts:search'), params)
+        return response, list(response.context['page_obj'])
+
+    def test_stemmer(self):
+        for word in ('котик', 'котики', 'котиков', 'Котиками'):
+            with self.subTest(word=word):
+                self.assertEqual(stem(word), 'котик')
+
+    def test_search_finds_posts_and_comments(self):
+        """Поиск находит и посты, и комментарии с формами слова."""
+        _, results = self.search(q='котиков')
+        found = {(result.kind, result.post.pk) for result in results}
+        self.assertEqual(
+            found,
+            {('post', self.cat_post.pk), ('comment', self.dog_post.pk)},
+        )
+
+    def test_filters(self):
+        _, results = self.search(q='котик', group=self.group.slug)
+        self.assertEqual([r.post.pk for r in results], [self.cat_post.pk])
+        _, results = self.search(q='собака', author=self.author.username)
+        self.assertEqual(results, [])
+
+    def test_snippet_is_highlighted_and_escaped(self):
+        response, _ = self.search(q='окно')
+        self.assertContains(response, '<mark>окне</mark>')
+        self.assertContains(response, '&lt;b&gt;')
+
+    def test_index_follows_edits_and_deletes(self):
+        post = Post.objects.get(pk=self.dog_post.pk)
+        post.text = 'Теперь здесь про хомяков'
+        post.save()
+        _, results = self.search(q='хомяк')
+        self.assertEqual([r.post.pk for r in results], [post.pk])
+        post.delete()
+        _, results = self.search(q='котик')
+        self.assertEqual([r.post.pk for r in results], [self.cat_post.pk])
+
+    def test_cursor_pagination(self):
+        for i in range(12):
+            Post.objects.create(author=self.other, text=f'Хомяк номер {i}')
+        response, first = self.search(q='хомяк')
+        cursor = response.context['page_obj'].next_cursor
+        self.assertEqual(len(first), 10)
+        _, second = self.search(q='хомяк', cursor=cursor)
+        self.assertEqual(len(second), 2)
+        self.assertFalse(
+            {r.post.pk for r in first} & {r.post.pk for r in second}
+        )
@@ -0,0 +1,101 @@
+import json
+from xml.etree import ElementTree
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Group, Post
+
+User = get_user_model()
+
+ATOM = '{http://www.w3.org/2005/Atom}'
+
+
+def content(response):
+    if response.streaming:
+        return b''.join(response.streaming_content).decode()
+    return response.content.decode()
+
+
+class SyndicationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        self.other = User.objects.create_user(username='other')
+        self.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        self.post = Post.objects.create(
+            author=self.author, group=self.group, text='Первая строка\nещё'
+        )
+        Post.objects.create(author=self.other, text='Чужой пост')
+        self.client = Client()
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_formats(self):
+        """Atom, RSS и JSON Feed содержат посты ленты."""
+        url = reverse('posts:group_feed', args=['group', 'atom'])
+        response = self.client.get(url)
+        self.assertTrue(response.streaming)
+        self.assertEqual(
+            response['Content-Type'], 'application/atom+xml; charset=utf-8'
+        )
+        feed = ElementTree.fromstring(content(response))
+        entries = feed.findall(f'{ATOM}entry')
+        self.assertEqual(len(entries), 1)
+        self.assertEqual(entries[0].find(f'{ATOM}title').text,
+                         'Первая строка')
+
+        url = reverse('posts:profile_feed', args=['other', 'rss'])
+        channel = ElementTree.fromstring(
+            content(self.client.get(url))
+        ).find('channel')
+        self.assertEqual(
+            [item.find('description').text
+             for item in channel.findall('item')],
+            ['Чужой пост'],
+        )
+
+        url = reverse('posts:index_feed', args=['json'])
+        feed = json.loads(content(self.client.get(url)))
+        self.assertEqual(
+            [item['content_text'] for item in feed['items']],
+            ['Чужой пост', 'Первая строка\nещё'],
+        )
+        self.assertEqual(feed['items'][1]['tags'], ['Группа'])
+
+    def test_unknown_feed(self):
+        for url in (
+            reverse('posts:index_feed', args=['xml']),
+            reverse('posts:group_feed', args=['missing', 'atom']),
+            reverse('posts:profile_feed', args=['missing', 'atom']),
+        ):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_conditional_get_and_cached_blob(self):
+        """Без новых постов — 304 или готовый блоб, с новым — новая лента."""
+        url = reverse('posts:group_feed', args=['group', 'atom'])
+        response = self.client.get(url)
+        body = content(response)
+        etag = response['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        # Только поиск группы по slug, постов не читаем.
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertFalse(response.streaming)
+        self.assertEqual(content(response), body)
+
+        Post.objects.create(
+            author=self.other, group=self.group, text='Новый пост'
+        )
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertIn('Новый пост', content(response))
@@ -0,0 +1,89 @@
+import tempfile
+from shutil import rmtree
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core.models import Task
+
+from .. import images, thumbnails
+from ..models import Post
+
+User = get_user_model()
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+class ThumbnailTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        settings.MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+    @classmethod
+    def tearDownClass(cls):
+        rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='photographer')
+        self.post = Post.objects.create(
+            author=self.user,
+            text='Пост с картинкой',
+            image=SimpleUploadedFile(
+                'small.gif', SMALL_GIF, content_type='image/gif'
+            ),
+        )
+        self.client = Client()
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_original_is_shown_until_thumbnail_is_ready(self):
+        """Пока миниатюры нет, страница показывает оригинал."""
+        self.assertIsNone(
+            thumbnails.ready_thumbnail(self.post.image, 'post_card')
+        )
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, self.post.image.url)
+
+    def test_rendered_thumbnail_replaces_original(self):
+        """После генерации в пуле карточка показывает варианты картинки."""
+        self.client.get(reverse('posts:index'))
+        thumbnails.render(
+            self.post.image.name, 'post', [('post', self.post.pk)]
+        )
+        self.assertIsNotNone(
+            thumbnails.ready_thumbnail(self.post.image, 'post_card')
+        )
+        variant = images.variants_for(self.post.image.name, 'post_card')[0]
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, default_storage.url(variant[3]))
+        self.assertNotContains(response, self.post.image.url)
+
+    def test_upload_queues_render_task(self):
+        """Загрузка картинки ставит генерацию миниатюр в очередь задач."""
+        self.client.force_login(self.user)
+        self.client.post(reverse('posts:post_create'), {
+            'text': 'Ещё картинка',
+            'image': SimpleUploadedFile(
+                'other.gif', SMALL_GIF, content_type='image/gif'
+            ),
+        })
+        post = Post.objects.get(text='Ещё картинка')
+        task = Task.objects.get()
+        self.assertEqual(task.name, 'posts.thumbnails.render')
+        self.assertIn(post.image.name, task.payload)
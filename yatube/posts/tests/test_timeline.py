@@ -0,0 +1,162 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from core import tasks
+
+from .. import timeline
+from ..models import FeedEntry, Follow, Post
+
+User = get_user_model()
+
+
+class TimelineTests(TestCase):
+    def setUp(self):
+        self.follower = User.objects.create_user(username='follower')
+        self.author = User.objects.create_user(username='author')
+        self.client = Client()
+        self.client.force_login(self.follower)
+
+    def get_feed(self):
+        response = self.client.get(reverse('posts:follow_index'))
+        return list(response.context['page_obj'])
+
+    def test_new_post_fans_out_to_followers(self):
+        """Новый пост попадает в ленты подписчиков."""
+        Follow.objects.create(user=self.follower, author=self.author)
+        post = Post.objects.create(author=self.author, text='Новый пост')
+        self.assertTrue(
+            FeedEntry.objects.filter(user=self.follower, post=post).exists()
+        )
+        self.assertEqual(self.get_feed(), [post])
+
+    def test_follow_backfills_and_unfollow_trims(self):
+        """Подписка заполняет ленту, отписка её очищает."""
+        post = Post.objects.create(author=self.author, text='Старый пост')
+        follow = Follow.objects.create(user=self.follower, author=self.author)
+        self.assertEqual(self.get_feed(), [post])
+        follow.delete()
+        self.assertFalse(FeedEntry.objects.filter(user=self.follower).exists())
+        self.assertEqual(self.get_feed(), [])
+
+    def test_post_delete_removes_feed_entries(self):
+        Follow.objects.create(user=self.follower, author=self.author)
+        post = Post.objects.create(author=self.author, text='Пост')
+        post.delete()
+        self.assertFalse(FeedEntry.objects.exists())
+
+    @override_settings(FEED_FANOUT_LIMIT=1)
+    def test_celebrity_posts_are_read_on_demand(self):
+        """Посты знаменитостей не раскладываются, но видны в ленте."""
+        Follow.objects.create(user=self.follower, author=self.author)
+        post = Post.objects.create(author=self.author, text='Пост звезды')
+        self.assertFalse(FeedEntry.objects.exists())
+        self.assertEqual(self.get_feed(), [post])
+
+    @override_settings(FEED_FANOUT_LIMIT=3)
+    def test_celebrity_is_counted_by_all_followers(self):
+        """Знаменитость — по числу всех подписчиков, а не только зрителя."""
+        fans = [
+            User.objects.create_user(username=f'fan{number}')
+            for number in range(2)
+        ]
+        for user in (self.follower, *fans):
+            Follow.objects.create(user=user, author=self.author)
+        other = User.objects.create_user(username='other')
+        Follow.objects.create(user=self.follower, author=other)
+        self.assertEqual(timeline.celebrity_ids(self.follower.pk),
+                         [self.author.pk])
+        star = Post.objects.create(author=self.author, text='Пост звезды')
+        regular = Post.objects.create(author=other, text='Обычный пост')
+        self.assertEqual(
+            list(FeedEntry.objects.values_list('post', flat=True)),
+            [regular.pk],
+        )
+        self.assertEqual(self.get_feed(), [regular, star])
+
+    @override_settings(FEED_FANOUT_LIMIT=2, POSTS_FOR_ONE_PAGE=2)
+    def test_pages_merge_entries_and_celebrity_posts(self):
+        """Курсор листает записи ленты и посты знаменитостей вместе."""
+        fan = User.objects.create_user(username='fan')
+        star = User.objects.create_user(username='star')
+        for user in (self.follower, fan):
+            Follow.objects.create(user=user, author=star)
+        Follow.objects.create(user=self.follower, author=self.author)
+        pub_date = timezone.now()
+        posts = []
+        for number in range(5):
+            post = Post.objects.create(
+                author=(star, self.author)[number % 2], text=f'Пост {number}'
+            )
+            # Одна дата на все посты: порядок держится на id.
+            Post.objects.filter(pk=post.pk).update(pub_date=pub_date)
+            FeedEntry.objects.filter(post=post).update(pub_date=pub_date)
+            posts.append(post)
+        expected = posts[::-1]
+        url = reverse('posts:follow_index')
+        seen = []
+        page = self.client.get(url).context['page_obj']
+        self.assertFalse(page.has_previous())
+        while True:
+            seen.extend(page)
+            if not page.has_next():
+                break
+            page = self.client.get(
+                url, {'cursor': page.next_cursor}
+            ).context['page_obj']
+        self.assertEqual(seen, expected)
+        back = self.client.get(
+            url, {'cursor': page.previous_cursor}
+        ).context['page_obj']
+        self.assertEqual(list(back), expected[2:4])
+        self.assertEqual(
+            [post.comments_count for post in back], [0, 0]
+        )
+
+    @override_settings(FEED_FANOUT_LIMIT=2)
+    def test_author_becoming_celebrity_is_not_duplicated(self):
+        """Разложенные посты новой знаменитости не повторяются в ленте."""
+        Follow.objects.create(user=self.follower, author=self.author)
+        post = Post.objects.create(author=self.author, text='Пост')
+        fan = User.objects.create_user(username='fan')
+        Follow.objects.create(user=fan, author=self.author)
+        self.assertEqual(self.get_feed(), [post])
+        self.assertEqual(tasks.work_off('test'), (1, 0))
+        self.assertFalse(FeedEntry.objects.filter(author=self.author).exists())
+        self.assertEqual(self.get_feed(), [post])
+
+    @override_settings(FEED_FANOUT_LIMIT=2)
+    def test_author_leaving_celebrities_is_fanned_out(self):
+        """Посты бывшей знаменитости раскладываются по лентам заново."""
+        fan = User.objects.create_user(username='fan')
+        for user in (self.follower, fan):
+            Follow.objects.create(user=user, author=self.author)
+        self.assertEqual(tasks.work_off('test'), (1, 0))
+        post = Post.objects.create(author=self.author, text='Пост звезды')
+        self.assertFalse(FeedEntry.objects.exists())
+        Follow.objects.filter(user=fan).delete()
+        self.assertEqual(tasks.work_off('test'), (1, 0))
+        self.assertTrue(
+            FeedEntry.objects.filter(user=self.follower, post=post).exists()
+        )
+        self.assertEqual(self.get_feed(), [post])
+
+    def test_feed_page_is_one_query(self):
+        """Страница ленты — один запрос по индексу ленты с постами."""
+        Follow.objects.create(user=self.follower, author=self.author)
+        for number in range(3):
+            Post.objects.create(author=self.author, text=f'Пост {number}')
+        with CaptureQueriesContext(connection) as captured:
+            page = timeline.get_feed(self.follower)
+            [post.author.username for post in page]
+        feed_queries = [
+            query['sql'] for query in captured
+            if 'posts_feedentry' in query['sql']
+        ]
+        self.assertEqual(len(feed_queries), 1)
+        self.assertIn('ORDER BY "posts_feedentry"."pub_date" DESC, '
+                      '"posts_feedentry"."post_id" DESC', feed_queries[0])
+        self.assertEqual(len(captured), 2)
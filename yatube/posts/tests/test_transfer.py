@@ -0,0 +1,111 @@
+import os
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from shutil import rmtree
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from .. import transfer, trending
+from ..models import Comment, FeedEntry, Follow, Group, Post
+
+User = get_user_model()
+
+
+class TransferTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.directory = tempfile.mkdtemp()
+        self.author = User.objects.create_user(
+            username='author', email='author@example.com'
+        )
+        self.reader = User.objects.create_user(username='reader')
+        self.author.profile.avatar = 'photos/avatar.jpg'
+        self.author.profile.save()
+        self.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        self.old_date = timezone.now() - timedelta(days=100)
+        for number in range(7):
+            post = Post.objects.create(
+                author=self.author, text=f'Пост {number}',
+                group=self.group if number % 2 else None,
+            )
+            Comment.objects.create(
+                post=post, author=self.reader, text=f'Ответ {number}'
+            )
+        Post.objects.filter(text='Пост 0').update(pub_date=self.old_date)
+        Follow.objects.create(user=self.reader, author=self.author)
+
+    def tearDown(self):
+        cache.clear()
+        rmtree(self.directory, ignore_errors=True)
+
+    def path(self, kind, fmt):
+        return os.path.join(self.directory, f'{kind}.{fmt}')
+
+    def round_trip(self, fmt):
+        for kind in transfer.SPECS:
+            call_command(
+                'export_data', kind, output=self.path(kind, fmt),
+                stdout=StringIO(), stderr=StringIO(),
+            )
+        User.objects.all().delete()
+        Group.objects.all().delete()
+        for kind in transfer.SPECS:
+            call_command(
+                'import_data', kind, self.path(kind, fmt), batch_size=3,
+                stdout=StringIO(),
+            )
+
+    def assert_restored(self):
+        self.assertEqual(User.objects.count(), 2)
+        self.assertEqual(Post.objects.count(), 7)
+        self.assertEqual(Comment.objects.count(), 7)
+        author = User.objects.get(username='author')
+        self.assertEqual(author.email, 'author@example.com')
+        self.assertEqual(author.profile.avatar, 'photos/avatar.jpg')
+        self.assertEqual(author.profile.posts_count, 7)
+        self.assertEqual(author.profile.followers_count, 1)
+        self.assertEqual(Group.objects.get().posts_count, 3)
+        self.assertEqual(
+            Post.objects.get(text='Пост 0').pub_date, self.old_date
+        )
+        reader = User.objects.get(username='reader')
+        self.assertEqual(FeedEntry.objects.filter(user=reader).count(), 7)
+        # Старый пост за пределами пересчёта популярного.
+        self.assertEqual(
+            set(trending.trending_posts().values_list('text', flat=True)),
+            {f'Пост {number}' for number in range(1, 7)},
+        )
+        post = Post.objects.create(author=author, text='После импорта')
+        self.assertGreater(post.pk, 7)
+
+    def test_ndjson_round_trip(self):
+        """Выгрузка и загрузка NDJSON восстанавливают все данные."""
+        self.round_trip(transfer.NDJSON)
+        self.assert_restored()
+
+    def test_csv_round_trip(self):
+        self.round_trip(transfer.CSV)
+        self.assert_restored()
+
+    def test_resume_from_checkpoint(self):
+        """Импорт продолжается с записи после сохранённого чекпойнта."""
+        path = self.path('posts', transfer.NDJSON)
+        call_command(
+            'export_data', 'posts', output=path,
+            stdout=StringIO(), stderr=StringIO(),
+        )
+        Post.objects.all().delete()
+        with open(f'{path}.checkpoint', 'w') as file:
+            file.write('4')
+        call_command('import_data', 'posts', path, stdout=StringIO())
+        self.assertEqual(Post.objects.count(), 3)
+        self.assertFalse(os.path.exists(f'{path}.checkpoint'))
+        call_command('import_data', 'posts', path, stdout=StringIO())
+        self.assertEqual(Post.objects.count(), 7)
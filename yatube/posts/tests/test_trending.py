@@ -0,0 +1,109 @@
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import trending
+from ..models import Comment, Follow, Group, Post, TrendingScore
+
+User = get_user_model()
+
+
+class TrendingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        self.star = User.objects.create_user(username='star')
+        for number in range(3):
+            fan = User.objects.create_user(username=f'fan{number}')
+            Follow.objects.create(user=fan, author=self.star)
+        self.group = Group.objects.create(title='Группа', slug='group')
+        self.quiet = Post.objects.create(author=self.author, text='Тихий')
+        self.popular = Post.objects.create(
+            author=self.star, text='Звёздный', group=self.group
+        )
+        self.client = Client()
+
+    def tearDown(self):
+        cache.clear()
+
+    def score(self, post):
+        return TrendingScore.objects.get(post=post).score
+
+    def titles(self, url, **params):
+        response = self.client.get(url, params)
+        return [post.text for post in response.context['page_obj']]
+
+    def test_new_post_score_depends_on_followers(self):
+        self.assertEqual(self.score(self.quiet), 1)
+        self.assertGreater(self.score(self.popular), self.score(self.quiet))
+
+    def test_comments_raise_score(self):
+        """Комментарии поднимают пост в популярном."""
+        self.assertEqual(
+            self.titles(reverse('posts:trending')), ['Звёздный', 'Тихий']
+        )
+        for _ in range(3):
+            Comment.objects.create(
+                post=self.quiet, author=self.star, text='Ого'
+            )
+        self.assertEqual(
+            self.score(self.quiet), 1 + 3 * settings.TRENDING_COMMENT_WEIGHT
+        )
+        self.assertEqual(
+            self.titles(reverse('posts:trending')), ['Тихий', 'Звёздный']
+        )
+
+    def test_decay(self):
+        """За период полураспада рейтинг падает вдвое, остывшие удаляются."""
+        before = self.score(self.popular)
+        call_command(
+            'decay_trending', hours=settings.TRENDING_HALF_LIFE,
+            stdout=StringIO(),
+        )
+        self.assertAlmostEqual(self.score(self.popular), before / 2)
+        call_command(
+            'decay_trending', hours=settings.TRENDING_HALF_LIFE * 20,
+            stdout=StringIO(),
+        )
+        self.assertFalse(TrendingScore.objects.exists())
+        Comment.objects.create(post=self.quiet, author=self.star, text='А')
+        self.assertEqual(
+            self.titles(reverse('posts:trending')), ['Тихий']
+        )
+
+    def test_group_trending(self):
+        """Вкладка популярного группы показывает только её посты."""
+        url = reverse('posts:group_trending', args=[self.group.slug])
+        self.assertEqual(self.titles(url), ['Звёздный'])
+        self.popular.group = None
+        self.popular.save()
+        self.assertEqual(self.titles(url), [])
+
+    def test_pagination_by_score(self):
+        posts = Post.objects.bulk_create(
+            Post(author=self.author, text=f'Пост {number}')
+            for number in range(settings.POSTS_FOR_ONE_PAGE)
+        )
+        self.assertTrue(posts)
+        call_command('decay_trending', rebuild=True, stdout=StringIO())
+        response = self.client.get(reverse('posts:trending'))
+        page_obj = response.context['page_obj']
+        self.assertEqual(len(page_obj), settings.POSTS_FOR_ONE_PAGE)
+        rest = self.titles(
+            reverse('posts:trending'), cursor=page_obj.next_cursor
+        )
+        self.assertEqual(len(rest), 2)
+        shown = [post.text for post in page_obj] + rest
+        self.assertEqual(len(set(shown)), len(shown))
+
+    def test_rebuild_matches_incremental_scores(self):
+        Comment.objects.create(post=self.quiet, author=self.star, text='Да')
+        incremental = self.score(self.quiet)
+        trending.rebuild(days=1, now=timezone.now())
+        self.assertAlmostEqual(self.score(self.quiet), incremental, places=3)
@@ -7,10 +7,13 @@ from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
 from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
-from ..models import Follow, Group, Post
+from ..models import Comment, Follow, Group, Post
+from ..utils import NEXT, encode_cursor
 
 User = get_user_model()
 
@@ -53,6 +56,7 @@ class PostTests(TestCase):
         super().tearDownClass()
 
     def setUp(self):
+        cache.clear()
         self.guest_client = Client()
         self.user = PostTests.post.author
         self.authorized_client = Client()
@@ -165,6 +169,7 @@ class PaginatorViewsTest(TestCase):
         }
 
     def setUp(self):
+        cache.clear()
         self.guest_client = Client()
         self.user = User.objects.create_user(username='NoName')
         self.authorized_client = Client()
@@ -180,11 +185,66 @@ class PaginatorViewsTest(TestCase):
 
     def test_second_page_contains_other_posts(self):
         for tested_url in self.list_urls.keys():
-            response = self.client.get(tested_url + "?page=2")
+            first_page = self.client.get(tested_url).context['page_obj']
+            response = self.client.get(
+                tested_url, {'cursor': first_page.next_cursor}
+            )
             self.assertEqual(
                 len(response.context.get('page_obj').object_list), 1
             )
 
+    def test_cursor_pages_do_not_overlap(self):
+        """Страницы курсорной пагинации идут без пропусков и повторов."""
+        url = reverse('posts:index')
+        first_page = self.client.get(url).context['page_obj']
+        second_page = self.client.get(
+            url, {'cursor': first_page.next_cursor}
+        ).context['page_obj']
+        self.assertFalse(second_page.has_next())
+        self.assertTrue(second_page.has_previous())
+        back_page = self.client.get(
+            url, {'cursor': second_page.previous_cursor}
+        ).context['page_obj']
+        last_page = self.client.get(
+            url, {'cursor': first_page.last_cursor}
+        ).context['page_obj']
+        texts = [post.text for post in list(first_page) + list(second_page)]
+        self.assertCountEqual(texts, [post.text for post in self.posts])
+        self.assertEqual(list(back_page), list(first_page))
+        self.assertEqual(last_page[len(last_page) - 1], second_page[0])
+        self.assertFalse(last_page.has_next())
+
+    def test_broken_cursor_returns_first_page(self):
+        response = self.client.get(
+            reverse('posts:index'), {'cursor': 'мусор'}
+        )
+        self.assertEqual(
+            len(response.context['page_obj']), settings.POSTS_FOR_ONE_PAGE
+        )
+
+    def test_tampered_cursor_returns_first_page(self):
+        """Подделанные значения ключа в курсоре не роняют страницу."""
+        tampered = (
+            ['foo', 1],
+            [{'a': 1}, 1],
+            ['2020-01-01T00:00:00', 'abc'],
+            [None, None],
+        )
+        urls = [
+            *self.list_urls,
+            reverse('posts:trending'),
+            reverse('posts:follow_index'),
+            reverse('api:posts'),
+        ]
+        for values in tampered:
+            cursor = encode_cursor(NEXT, values)
+            for url in urls:
+                with self.subTest(values=values, url=url):
+                    response = self.authorized_client.get(
+                        url, {'cursor': cursor}
+                    )
+                    self.assertEqual(response.status_code, HTTPStatus.OK)
+
 
 class FollowTests(TestCase):
     def setUp(self):
@@ -239,23 +299,182 @@ class CacheTests(TestCase):
     def setUpClass(cls):
         super().setUpClass()
         cls.user = User.objects.create_user(username='NoName')
+        cls.group = Group.objects.create(title='Группа', slug='cached')
         cls.post = Post.objects.create(
             author=cls.user,
+            group=cls.group,
             text='Тестовая запись для создания поста')
 
     def setUp(self):
+        cache.clear()
         self.guest_client = Client()
         self.authorized_client = Client()
         self.authorized_client.force_login(self.user)
 
+    def tearDown(self):
+        cache.clear()
+
     def test_cache_index(self):
+        """Страница берётся из кэша, пока данные не менялись."""
         first_step = self.authorized_client.get(reverse('posts:index'))
-        post_1 = Post.objects.get(pk=1)
-        post_1.text = 'Измененный текст'
-        post_1.save()
+        Post.objects.filter(pk=self.post.pk).update(text='Без сигналов')
         second_step = self.authorized_client.get(reverse('posts:index'))
         self.assertEqual(first_step.content, second_step.content)
         cache.clear()
         third_step = self.authorized_client.get(reverse('posts:index'))
         self.assertNotEqual(first_step.content, third_step.content)
+
+    def test_edit_invalidates_cached_pages(self):
+        """После правки поста, группы и комментария кэш не устаревает."""
+        pages = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.user.username}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+        )
+        for page in pages:
+            self.guest_client.get(page)
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Измененный текст'
+        post.save()
+        self.group.title = 'Новое название'
+        self.group.save()
+        Comment.objects.create(
+            post=post, author=self.user, text='Свежий комментарий'
+        )
+        for page in pages:
+            with self.subTest(page=page):
+                response = self.guest_client.get(page)
+                self.assertContains(response, 'Измененный текст')
+                self.assertContains(response, 'Свежий комментарий')
+
+    def test_follow_invalidates_profile_sidebar(self):
+        url = reverse('posts:profile', kwargs={'username': self.user.username})
+        self.guest_client.get(url)
+        follower = User.objects.create_user(username='follower')
+        Follow.objects.create(user=follower, author=self.user)
+        response = self.guest_client.get(url)
+        self.assertContains(response, 'Подписчиков: 1')
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(title='Группа', slug='fresh')
+        cls.post = Post.objects.create(
+            author=cls.user, group=cls.group, text='Свежий пост'
+        )
+        cls.pages = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': cls.group.slug}),
+            reverse('posts:profile', kwargs={'username': cls.user.username}),
+            reverse('posts:post_detail', kwargs={'post_id': cls.post.pk}),
+        )
+
+    def setUp(self):
         cache.clear()
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_not_modified_without_rendering(self):
+        """Совпавший ETag даёт 304 без запросов к постам."""
+        for page in self.pages:
+            with self.subTest(page=page):
+                etag = self.guest_client.get(page)['ETag']
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.guest_client.get(
+                        page, HTTP_IF_NONE_MATCH=etag
+                    )
+                self.assertEqual(response.status_code,
+                                 HTTPStatus.NOT_MODIFIED)
+                self.assertLessEqual(len(queries), 1)
+
+    def test_changes_produce_new_etag(self):
+        """После нового комментария ETag всех страниц меняется."""
+        etags = {page: self.guest_client.get(page)['ETag']
+                 for page in self.pages}
+        Comment.objects.create(
+            post=self.post, author=self.user, text='Комментарий'
+        )
+        for page, etag in etags.items():
+            with self.subTest(page=page):
+                response = self.guest_client.get(
+                    page, HTTP_IF_NONE_MATCH=etag
+                )
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_cache_control_depends_on_user(self):
+        """Анонимам — общий кэш, авторизованным — приватный с Vary."""
+        url = reverse('posts:index')
+        response = self.guest_client.get(url)
+        self.assertIn('public', response['Cache-Control'])
+        self.assertIn(
+            f's-maxage={settings.HTTP_CACHE_TIMEOUT}',
+            response['Cache-Control'],
+        )
+        response = self.authorized_client.get(url)
+        self.assertIn('private', response['Cache-Control'])
+        self.assertIn('Cookie', response['Vary'])
+        self.assertNotEqual(
+            response['ETag'], self.guest_client.get(url)['ETag']
+        )
+
+
+class CommentStatsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='commentator')
+        cls.group = Group.objects.create(title='Группа', slug='comments')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def tearDown(self):
+        cache.clear()
+
+    def add_posts(self, amount):
+        for i in range(amount):
+            post = Post.objects.create(
+                author=self.user, group=self.group, text=f'Пост {i}'
+            )
+            Comment.objects.create(post=post, author=self.user, text='Первый')
+            Comment.objects.create(
+                post=post, author=self.user, text='Последний'
+            )
+
+    def count_queries(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(url)
+        return len(context)
+
+    def test_list_pages_have_fixed_query_count(self):
+        """Число запросов не зависит от числа постов на странице."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.user.username}),
+        )
+        self.add_posts(1)
+        one_post = {url: self.count_queries(url) for url in urls}
+        self.add_posts(5)
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.count_queries(url), one_post[url])
+
+    def test_card_shows_comment_count_and_last_comment(self):
+        self.add_posts(1)
+        response = self.client.get(reverse('posts:index'))
+        post = response.context['page_obj'][0]
+        self.assertEqual(post.comments_count, 2)
+        self.assertEqual(post.last_comment, 'Последний')
+        self.assertContains(response, 'Комментариев: 2')
@@ -0,0 +1,138 @@
+"""Генерация миниатюр заранее, вне запроса.
+
+Вместо того чтобы sorl-thumbnail резал картинку внутри запроса первого
+зрителя, после сохранения поста или аватара миниатюры всех нужных
+размеров ставятся в очередь задач core.tasks, а pregenerate_thumbnails
+режет уже загруженные картинки в пуле процессов. Пока миниатюра не
+готова, шаблоны показывают оригинал (см. тег ready_thumbnail), а после
+генерации воркер сбрасывает версию кэша карточки.
+"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores import cached_db_kvstore
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+from core.tasks import task
+
+SPECS = {
+    'post_card': ('960x339', {'crop': 'center', 'upscale': True}),
+    'avatar_small': ('250x250', {'crop': 'center'}),
+    'avatar_large': ('300x350', {'crop': 'center'}),
+}
+KINDS = {
+    'post': ('post_card',),
+    'avatar': ('avatar_small', 'avatar_large'),
+}
+
+_executor = None
+
+
+def _init_worker():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+    import django
+    django.setup()
+
+
+def get_executor(max_workers=None):
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=max_workers or settings.THUMBNAIL_WORKERS,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+        )
+    return _executor
+
+
+@task
+def render(name, kind, scopes=()):
+    """Создаёт миниатюры и варианты файла name в процессе пула."""
+    from . import caching, images
+
+    for spec in KINDS[kind]:
+        geometry, options = SPECS[spec]
+        get_thumbnail(name, geometry, **options)
+        images.generate(name, spec)
+    if scopes:
+        caching.bump(*scopes)
+    return name
+
+
+def render_job(job):
+    return render(*job)
+
+
+def schedule(fieldfile, kind, scopes=()):
+    """Ставит генерацию миниатюр в очередь задач."""
+    if not fieldfile:
+        return
+    render.delay(fieldfile.name, kind, [list(scope) for scope in scopes])
+
+
+def _thumbnail_name(source, geometry, options):
+    # Те же умолчания, что подставляет ThumbnailBackend.get_thumbnail:
+    # от них зависит имя файла миниатюры.
+    backend = default.backend
+    options = dict(options)
+    if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+        options.setdefault('format', backend._get_format(source))
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(sorl_settings, attr)
+        if value != getattr(sorl_defaults, attr):
+            options.setdefault(key, value)
+    return backend._get_thumbnail_filename(source, geometry, options)
+
+
+def ready_thumbnails(fieldfiles, spec):
+    """Готовые миниатюры fieldfiles: {имя исходника: миниатюра или None}.
+
+    Ключи kvstore sorl читаются одним get_many и одним запросом на
+    промахи, как сделал бы cached_db_kvstore для каждого файла отдельно.
+    """
+    geometry, options = SPECS[spec]
+    thumbnails = {
+        fieldfile.name: ImageFile(
+            _thumbnail_name(ImageFile(fieldfile), geometry, options),
+            default.storage,
+        )
+        for fieldfile in fieldfiles if fieldfile
+    }
+    kvstore = default.kvstore
+    if not isinstance(kvstore, cached_db_kvstore.KVStore):
+        return {
+            name: kvstore.get(image) for name, image in thumbnails.items()
+        }
+    keys = {add_prefix(image.key): name for name, image in thumbnails.items()}
+    values = kvstore.cache.get_many(keys)
+    missing = [key for key in keys if key not in values]
+    if missing:
+        found = dict.fromkeys(missing, cached_db_kvstore.EMPTY_VALUE)
+        found.update(KVStoreModel.objects.filter(
+            key__in=missing
+        ).values_list('key', 'value'))
+        kvstore.cache.set_many(found, sorl_settings.THUMBNAIL_CACHE_TIMEOUT)
+        values.update(found)
+    return {
+        name: (
+            None if values[key] == cached_db_kvstore.EMPTY_VALUE
+            else deserialize_image_file(values[key])
+        )
+        for key, name in keys.items()
+    }
+
+
+def ready_thumbnail(fieldfile, spec):
+    """Готовая миниатюра или None, если она ещё не сгенерирована."""
+    if not fieldfile:
+        return None
+    return ready_thumbnails([fieldfile], spec)[fieldfile.name]
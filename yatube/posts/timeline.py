@@ -0,0 +1,213 @@
+"""Материализованная лента подписок (fan-out-on-write).
+
+Новый пост раскладывается по лентам подписчиков автора записями
+FeedEntry, поэтому страница /follow/ читается одним диапазоном по индексу
+(user, -pub_date, -post) keyset-пагинацией по ключу (pub_date, id поста)
+без сортировки во временном B-дереве. Для авторов с очень большим числом
+подписчиков раскладка не делается: их посты выбираются при чтении тем же
+курсором и сливаются со страницей ленты, а их записи FeedEntry в ленте
+не читаются. Когда автор пересекает FEED_FANOUT_LIMIT, задача убирает
+его записи из лент подписчиков или раскладывает туда его посты.
+"""
+from django.conf import settings
+
+from core.bulk import batched
+from core.tasks import task
+from users.models import Profile
+
+from .models import FeedEntry, Follow, Post, User, comment_stats
+from .utils import PREVIOUS, CursorPage, CursorPaginator, decode_cursor
+
+# Ключ страницы ленты — (pub_date, id поста) у записей и у постов.
+ENTRY_ORDERING = ('-pub_date', '-post_id')
+POST_ORDERING = ('-pub_date', '-pk')
+
+
+def is_celebrity(author_id):
+    """Автор, посты которого не раскладываются по лентам."""
+    return Profile.objects.filter(
+        user_id=author_id,
+        followers_count__gte=settings.FEED_FANOUT_LIMIT,
+    ).exists()
+
+
+def celebrity_ids(user_id):
+    """Авторы-знаменитости, на которых подписан пользователь."""
+    return list(
+        User.objects.filter(
+            following__user_id=user_id,
+            profile__followers_count__gte=settings.FEED_FANOUT_LIMIT,
+        ).values_list('pk', flat=True)
+    )
+
+
+def fan_out(post):
+    """Добавляет пост в ленты всех подписчиков автора."""
+    if is_celebrity(post.author_id):
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    FeedEntry.objects.bulk_create(
+        [
+            FeedEntry(user_id=user_id, post_id=post.pk,
+                      author_id=post.author_id, pub_date=post.pub_date)
+            for user_id in followers.iterator()
+        ],
+        batch_size=settings.FEED_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def backfill(user_id, author_id):
+    """Заполняет ленту последними постами автора после подписки."""
+    if is_celebrity(author_id):
+        return
+    posts = Post.objects.filter(author_id=author_id).values_list(
+        'pk', 'pub_date'
+    )[:settings.FEED_BACKFILL_SIZE]
+    FeedEntry.objects.bulk_create(
+        [
+            FeedEntry(user_id=user_id, post_id=post_id,
+                      author_id=author_id, pub_date=pub_date)
+            for post_id, pub_date in posts
+        ],
+        batch_size=settings.FEED_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+    trim(user_id)
+
+
+def trim(user_id):
+    """Обрезает ленту до FEED_MAX_LENGTH последних записей."""
+    boundary = list(
+        FeedEntry.objects.filter(user_id=user_id)
+        .order_by('-pub_date')
+        .values_list('pub_date', flat=True)
+        [settings.FEED_MAX_LENGTH:settings.FEED_MAX_LENGTH + 1]
+    )
+    if boundary:
+        FeedEntry.objects.filter(
+            user_id=user_id, pub_date__lt=boundary[0]
+        ).delete()
+
+
+def _followers_count(author_id):
+    return Profile.objects.filter(user_id=author_id).values_list(
+        'followers_count', flat=True
+    ).first()
+
+
+def follow(user_id, author_id):
+    """Обновляет ленты после подписки; счётчик уже увеличен."""
+    if _followers_count(author_id) == settings.FEED_FANOUT_LIMIT:
+        drop_author.delay(author_id)
+    else:
+        backfill(user_id, author_id)
+
+
+def unfollow(user_id, author_id):
+    """Убирает из ленты посты автора после отписки; счётчик уже уменьшен."""
+    FeedEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+    if _followers_count(author_id) == settings.FEED_FANOUT_LIMIT - 1:
+        refill_author.delay(author_id)
+
+
+def _follower_batches(author_id):
+    followers = Follow.objects.filter(author_id=author_id).values_list(
+        'user_id', flat=True
+    )
+    return batched(followers.iterator(), settings.FEED_BATCH_SIZE)
+
+
+@task
+def drop_author(author_id):
+    """Убирает из лент записи автора, ставшего знаменитостью."""
+    if not is_celebrity(author_id):
+        return
+    for user_ids in _follower_batches(author_id):
+        FeedEntry.objects.filter(
+            user_id__in=user_ids, author_id=author_id
+        ).delete()
+
+
+@task
+def refill_author(author_id):
+    """Раскладывает по лентам посты автора, переставшего быть знаменитостью."""
+    if is_celebrity(author_id):
+        return
+    for user_ids in _follower_batches(author_id):
+        for user_id in user_ids:
+            backfill(user_id, author_id)
+
+
+def rebuild(user_id):
+    """Пересобирает ленту пользователя с нуля."""
+    FeedEntry.objects.filter(user_id=user_id).delete()
+    author_ids = Follow.objects.filter(user_id=user_id).values_list(
+        'author_id', flat=True
+    )
+    for author_id in author_ids:
+        backfill(user_id, author_id)
+
+
+def _entry_post(entry):
+    post = entry.post
+    post.comments_count = entry.comments_count
+    post.last_comment = entry.last_comment
+    return post
+
+
+def _merge(page, other, cursor, per_page):
+    """Сливает две страницы одного курсора в одну страницу постов."""
+    posts = sorted(
+        [*page, *other], key=lambda post: (post.pub_date, post.pk),
+        reverse=True,
+    )
+    has_next = page.has_next() or other.has_next()
+    has_previous = page.has_previous() or other.has_previous()
+    decoded = decode_cursor(cursor) if cursor else None
+    if decoded and decoded[0] == PREVIOUS:
+        has_previous = has_previous or len(posts) > per_page
+        posts = posts[-per_page:]
+    else:
+        has_next = has_next or len(posts) > per_page
+        posts = posts[:per_page]
+    if not posts:
+        return CursorPage(posts, page.paginator)
+    return CursorPage(
+        posts,
+        page.paginator,
+        next_values=(
+            [posts[-1].pub_date, posts[-1].pk] if has_next else None
+        ),
+        previous_values=(
+            [posts[0].pub_date, posts[0].pk] if has_previous else None
+        ),
+    )
+
+
+def get_feed(user, cursor=None):
+    """Страница ленты подписок пользователя по курсору cursor."""
+    per_page = settings.POSTS_FOR_ONE_PAGE
+    celebrities = celebrity_ids(user.pk)
+    # Записи автора, только что ставшего знаменитостью, ещё не убраны
+    # задачей drop_author; его посты придут из второго потока.
+    entries = FeedEntry.objects.filter(user=user).exclude(
+        author_id__in=celebrities
+    ).select_related(
+        'post__group', 'post__author'
+    ).annotate(**comment_stats('post_id'))
+    page = CursorPaginator(
+        entries, per_page, ordering=ENTRY_ORDERING
+    ).get_page(cursor)
+    page.object_list = [_entry_post(entry) for entry in page]
+    if not celebrities:
+        return page
+    posts = Post.objects.filter(author_id__in=celebrities).select_related(
+        'group', 'author'
+    ).with_comment_stats()
+    other = CursorPaginator(
+        posts, per_page, ordering=POST_ORDERING
+    ).get_page(cursor)
+    return _merge(page, other, cursor, per_page)
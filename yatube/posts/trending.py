@@ -0,0 +1,109 @@
+"""Лента популярного с заранее посчитанным затухающим рейтингом.
+
+Рейтинг поста хранится в TrendingScore и меняется инкрементально:
+новый пост получает вес по числу подписчиков автора, каждый комментарий
+прибавляет TRENDING_COMMENT_WEIGHT через F(), а периодическая команда
+decay_trending умножает все рейтинги на коэффициент затухания и удаляет
+остывшие посты. Страница популярного — чтение диапазона индекса
+по score, без агрегации на каждый запрос.
+"""
+import math
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from users.models import Profile
+
+from . import caching
+from .models import Comment, Post, TrendingScore
+
+ORDERING = ('-trending__score', '-pk')
+# За сколько дней посты попадают в пересчёт рейтингов с нуля.
+REBUILD_DAYS = 14
+
+
+def decay_factor(hours):
+    return 0.5 ** (hours / settings.TRENDING_HALF_LIFE)
+
+
+def base_score(followers_count):
+    return 1 + settings.TRENDING_FOLLOWER_WEIGHT * math.log1p(followers_count)
+
+
+def add_post(post):
+    followers = Profile.objects.filter(user_id=post.author_id).values_list(
+        'followers_count', flat=True
+    ).first() or 0
+    TrendingScore.objects.create(
+        post=post, group_id=post.group_id, score=base_score(followers)
+    )
+
+
+def move_post(post):
+    TrendingScore.objects.filter(post_id=post.pk).update(
+        group_id=post.group_id
+    )
+
+
+def add_comment(comment):
+    weight = settings.TRENDING_COMMENT_WEIGHT
+    updated = TrendingScore.objects.filter(post_id=comment.post_id).update(
+        score=F('score') + weight
+    )
+    if not updated:
+        # Остывший пост снова попадает в популярное.
+        TrendingScore.objects.get_or_create(
+            post_id=comment.post_id,
+            defaults={'group_id': comment.post.group_id, 'score': weight},
+        )
+
+
+def decay(hours):
+    """Затухание всех рейтингов за hours часов; возвращает число удалённых."""
+    TrendingScore.objects.update(score=F('score') * decay_factor(hours))
+    removed, _ = TrendingScore.objects.filter(
+        score__lt=settings.TRENDING_MIN_SCORE
+    ).delete()
+    caching.bump(('trending',))
+    return removed
+
+
+def rebuild(days=REBUILD_DAYS, now=None):
+    """Пересчитывает рейтинги постов за последние days дней с нуля."""
+    now = now or timezone.now()
+    since = now - timedelta(days=days)
+    scores = {}
+    posts = Post.objects.filter(pub_date__gte=since).values_list(
+        'pk', 'group_id', 'pub_date', 'author__profile__followers_count'
+    )
+    for pk, group_id, pub_date, followers in posts.iterator():
+        age = (now - pub_date).total_seconds() / 3600
+        scores[pk] = [
+            group_id, base_score(followers or 0) * decay_factor(age)
+        ]
+    comments = Comment.objects.filter(post_id__in=Post.objects.filter(
+        pub_date__gte=since
+    )).values_list('post_id', 'created')
+    for post_id, created in comments.iterator():
+        age = (now - created).total_seconds() / 3600
+        scores[post_id][1] += (
+            settings.TRENDING_COMMENT_WEIGHT * decay_factor(age)
+        )
+    TrendingScore.objects.all().delete()
+    TrendingScore.objects.bulk_create(
+        [TrendingScore(post_id=pk, group_id=group_id, score=score)
+         for pk, (group_id, score) in scores.items()
+         if score >= settings.TRENDING_MIN_SCORE],
+        batch_size=5000,
+    )
+    caching.bump(('trending',))
+    return len(scores)
+
+
+def trending_posts(group=None):
+    posts = Post.objects.filter(trending__isnull=False)
+    if group is not None:
+        posts = posts.filter(trending__group=group)
+    return posts.select_related('group', 'author', 'trending')
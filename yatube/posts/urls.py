@@ -8,6 +8,9 @@ app_name = 'posts'
 urlpatterns = [
     path('', views.index, name='index'),
     path('group/<slug:slug>/', views.group_posts, name='group_list'),
+    path('group/<slug:slug>/trending/', views.group_trending,
+         name='group_trending'),
+    path('trending/', views.trending_posts, name='trending'),
     path('profile/<str:username>/', views.profile, name='profile'),
     path(
         'profile/<str:username>/edit/', views.profile_edit, name='profile_edit'
@@ -16,10 +19,22 @@ urlpatterns = [
          name="profile_follow"),
     path("profile/<str:username>/unfollow/", views.profile_unfollow,
          name="profile_unfollow"),
+    path('profile/<str:username>/followers/', views.follower_list,
+         name='followers'),
+    path('profile/<str:username>/following/', views.following_list,
+         name='following'),
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
     path('posts/<int:post_id>/comment/', views.add_comment,
          name='add_comment'),
+    path('posts/<int:post_id>/comments/', views.post_comments,
+         name='post_comments'),
     path('create/', views.post_create, name='post_create'),
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
     path("follow/", views.follow_index, name="follow_index"),
+    path('search/', views.search_posts, name='search'),
+    path('feed/<slug:fmt>/', views.index_feed, name='index_feed'),
+    path('group/<slug:slug>/feed/<slug:fmt>/', views.group_feed,
+         name='group_feed'),
+    path('profile/<str:username>/feed/<slug:fmt>/', views.profile_feed,
+         name='profile_feed'),
 ]
@@ -1,9 +1,216 @@
+import base64
+import binascii
+import datetime
+import json
+from functools import reduce
+from operator import or_
+
 from django.conf import settings
-from django.core.paginator import Paginator
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+NEXT = 'next'
+PREVIOUS = 'prev'
+
+
+def _json_default(value):
+    # isoformat() без усечения микросекунд, иначе ключ теряет точность.
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    return str(value)
+
+
+def encode_cursor(direction, values):
+    raw = json.dumps([direction, values], default=_json_default)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Возвращает (направление, значения ключа) или None для мусора."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        direction, values = json.loads(base64.urlsafe_b64decode(padded))
+    except (binascii.Error, ValueError, TypeError, UnicodeDecodeError):
+        return None
+    if direction not in (NEXT, PREVIOUS):
+        return None
+    if values is not None and not isinstance(values, list):
+        return None
+    return direction, values
+
+
+class CursorPage:
+    """Страница keyset-пагинации, совместимая с шаблоном паджинатора."""
+
+    def __init__(self, object_list, paginator, next_values=None,
+                 previous_values=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.cursor = paginator.cursor
+        self.next_cursor = (
+            encode_cursor(NEXT, next_values) if next_values else None
+        )
+        self.previous_cursor = (
+            encode_cursor(PREVIOUS, previous_values)
+            if previous_values else None
+        )
+
+    def __repr__(self):
+        return f'<CursorPage {self.cursor or "first"}>'
+
+    def __getstate__(self):
+        # Паджинатор держит queryset, который при pickle выполнился бы целиком.
+        state = self.__dict__.copy()
+        state['paginator'] = None
+        return state
+
+    def __str__(self):
+        return repr(self)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    @property
+    def last_cursor(self):
+        return encode_cursor(PREVIOUS, None)
+
+
+class CursorPaginator:
+    """Keyset-пагинация по полям сортировки (по умолчанию pub_date, id).
+
+    Страница выбирается условием на ключ последнего показанного объекта,
+    поэтому любая страница стоит столько же, сколько первая: без OFFSET
+    и без COUNT(*) на каждый запрос.
+    """
+
+    def __init__(self, object_list, per_page, ordering=('-pub_date', '-pk'),
+                 cursor=None):
+        self.object_list = object_list
+        self.per_page = per_page
+        self.ordering = ordering
+        self.cursor = cursor
+
+    @cached_property
+    def count(self):
+        """Приблизительное число объектов, не больше PAGINATOR_COUNT_LIMIT."""
+        limit = settings.PAGINATOR_COUNT_LIMIT
+        return self.object_list.order_by()[:limit].count()
+
+    def _field(self, name):
+        return name.lstrip('-')
+
+    def _to_python(self, name, value):
+        # Поле сортировки может лежать в связанной модели: trending__score.
+        model = self.object_list.model
+        try:
+            for part in name.split('__'):
+                field = (model._meta.pk if part == 'pk'
+                         else model._meta.get_field(part))
+                model = field.related_model
+        except FieldDoesNotExist:
+            return value
+        return field.to_python(value)
+
+    def _decode_values(self, values):
+        """Значения ключа из курсора или None, если их подделали."""
+        if len(values) != len(self.ordering):
+            return None
+        try:
+            values = [
+                self._to_python(self._field(name), value)
+                for name, value in zip(self.ordering, values)
+            ]
+        except (ValidationError, TypeError, ValueError):
+            return None
+        return None if None in values else values
+
+    def _key(self, obj):
+        values = []
+        for name in self.ordering:
+            value = obj
+            for attr in self._field(name).split('__'):
+                value = getattr(value, attr)
+            values.append(value)
+        return values
+
+    def _seek(self, values, forward):
+        """Условие «после ключа» для порядка сортировки ordering."""
+        conditions = []
+        for i, name in enumerate(self.ordering):
+            field = self._field(name)
+            descending = name.startswith('-')
+            lookup = 'lt' if descending == forward else 'gt'
+            condition = {
+                self._field(prev): value
+                for prev, value in zip(self.ordering[:i], values)
+            }
+            condition[f'{field}__{lookup}'] = values[i]
+            conditions.append(Q(**condition))
+        return reduce(or_, conditions)
+
+    def _ordered(self, forward):
+        if forward:
+            return self.object_list.order_by(*self.ordering)
+        reverse = [
+            name[1:] if name.startswith('-') else f'-{name}'
+            for name in self.ordering
+        ]
+        return self.object_list.order_by(*reverse)
+
+    def get_page(self, cursor=None):
+        self.cursor = cursor
+        decoded = decode_cursor(cursor) if cursor else None
+        if decoded is None:
+            direction, values = NEXT, None
+        else:
+            direction, values = decoded
+            if values is not None:
+                values = self._decode_values(values)
+                if values is None:
+                    direction = NEXT
+        forward = direction == NEXT
+        queryset = self._ordered(forward)
+        if values is not None:
+            queryset = queryset.filter(self._seek(values, forward))
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if not forward:
+            rows.reverse()
+        if not rows:
+            return CursorPage(rows, self)
+        if forward:
+            has_next, has_previous = has_more, values is not None
+        else:
+            has_next, has_previous = values is not None, has_more
+        return CursorPage(
+            rows,
+            self,
+            next_values=self._key(rows[-1]) if has_next else None,
+            previous_values=self._key(rows[0]) if has_previous else None,
+        )
 
 
-def paginator(request, post_list):
-    paginator = Paginator(post_list, settings.POSTS_FOR_ONE_PAGE)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+def paginator(request, post_list, ordering=None):
+    paginator = CursorPaginator(
+        post_list, settings.POSTS_FOR_ONE_PAGE,
+        ordering=ordering or ('-pub_date', '-pk'),
+    )
+    page_obj = paginator.get_page(request.GET.get('cursor'))
     return page_obj
@@ -1,19 +1,49 @@
 import logging
 
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import get_object_or_404, redirect, render
+from django.urls import reverse
+from django.utils.functional import SimpleLazyObject
 
+from core import parallel
 from users.forms import ProfileForm, UpdateUserForm
 
+from . import (
+    caching, comments, graph, search, syndication, thumbnails, trending,
+)
 from .forms import CommentForm, PostForm
 from .models import Follow, Group, Post, User
-from .utils import paginator
+from .timeline import get_feed
 
 
+def _group_scopes(slug):
+    pk = Group.objects.filter(slug=slug).values_list('pk', flat=True).first()
+    return None if pk is None else (('group', pk),)
+
+
+def _profile_scopes(username):
+    pk = User.objects.filter(
+        username=username
+    ).values_list('pk', flat=True).first()
+    return None if pk is None else (('author', pk),)
+
+
+def _post_scopes(post_id):
+    post = Post.objects.filter(pk=post_id).only(
+        'author_id', 'group_id'
+    ).first()
+    return None if post is None else caching.card_scopes(post)
+
+
+@caching.conditional_page(lambda: (('posts',),))
 def index(request):
     template = 'posts/index.html'
-    post_list = Post.objects.select_related('group', 'author').all()
-    page_obj = paginator(request, post_list)
+    post_list = Post.objects.select_related(
+        'group', 'author'
+    ).with_comment_stats()
+    page_obj = caching.cached_page(request, post_list, ('posts',))
+    graph.annotate_authors(request, page_obj)
     context = {
         'page_obj': page_obj,
         'button': True,
@@ -21,35 +51,161 @@ def index(request):
     return render(request, template, context=context)
 
 
+@caching.conditional_page(_group_scopes)
 def group_posts(request, slug):
     template = 'posts/group_list.html'
     group = get_object_or_404(Group, slug=slug)
-    post_list = group.posts.select_related('group').all()
-    page_obj = paginator(request, post_list)
+    post_list = group.posts.select_related(
+        'group', 'author'
+    ).with_comment_stats()
+    page_obj, group_version = parallel.gather(
+        lambda: caching.cached_page(request, post_list, ('group', group.pk)),
+        lambda: caching.get_token(('group', group.pk)),
+    )
+    graph.annotate_authors(request, page_obj)
     context = {
         'group': group,
+        'group_version': group_version,
         'page_obj': page_obj,
         'button': False
     }
     return render(request, template, context=context)
 
 
+@caching.conditional_page(_profile_scopes)
 def profile(request, username):
     template = 'posts/profile.html'
-    author = get_object_or_404(User, username=username)
-    post_list = author.posts.select_related('author').all()
-    page_obj = paginator(request, post_list)
-    following = False
-    if request.user.is_authenticated:
-        following = Follow.objects.filter(
-            user=request.user, author=author
-        ).exists()
+    author = get_object_or_404(
+        User.objects.select_related('profile'), username=username
+    )
+    post_list = author.posts.select_related(
+        'group', 'author'
+    ).with_comment_stats()
+    page_obj, _, author_version = parallel.gather(
+        lambda: caching.cached_page(
+            request, post_list, ('author', author.pk)
+        ),
+        lambda: graph.follow_states(request).annotate([author]),
+        lambda: caching.get_token(('author', author.pk)),
+    )
     context = {
         'author': author,
         'page_obj': page_obj,
         'button': True,
-        'post_count': page_obj.paginator.count,
-        'following': following,
+        'post_count': author.profile.posts_count,
+        'author_version': author_version,
+    }
+    return render(request, template, context=context)
+
+
+def _group_trending_scopes(slug):
+    scopes = _group_scopes(slug)
+    return None if scopes is None else scopes + (('posts',), ('trending',))
+
+
+@caching.conditional_page(lambda: (('posts',), ('trending',)))
+def trending_posts(request):
+    template = 'posts/index.html'
+    post_list = trending.trending_posts().with_comment_stats()
+    page_obj = caching.cached_page(
+        request, post_list, ('posts',), ('trending',),
+        ordering=trending.ORDERING,
+    )
+    graph.annotate_authors(request, page_obj)
+    context = {
+        'page_obj': page_obj,
+        'button': True,
+    }
+    return render(request, template, context=context)
+
+
+@caching.conditional_page(_group_trending_scopes)
+def group_trending(request, slug):
+    template = 'posts/group_list.html'
+    group = get_object_or_404(Group, slug=slug)
+    post_list = trending.trending_posts(group).with_comment_stats()
+    page_obj = caching.cached_page(
+        request, post_list, ('group', group.pk), ('posts',), ('trending',),
+        ordering=trending.ORDERING,
+    )
+    graph.annotate_authors(request, page_obj)
+    context = {
+        'group': group,
+        'group_version': caching.get_token(('group', group.pk)),
+        'page_obj': page_obj,
+        'button': False,
+        'trending': True,
+    }
+    return render(request, template, context=context)
+
+
+def index_feed(request, fmt):
+    return syndication.feed_response(
+        request, fmt, (('posts',),),
+        lambda: {
+            'title': 'Yatube: последние записи',
+            'link': reverse('posts:index'),
+            'description': 'Новые записи всех авторов',
+        },
+        Post.objects.all(),
+    )
+
+
+def group_feed(request, slug, fmt):
+    def describe():
+        group = get_object_or_404(Group, slug=slug)
+        return {
+            'title': f'Yatube: {group.title}',
+            'link': reverse('posts:group_list', args=[slug]),
+            'description': group.description,
+        }
+    return syndication.feed_response(
+        request, fmt, _group_scopes(slug), describe,
+        Post.objects.filter(group__slug=slug),
+    )
+
+
+def profile_feed(request, username, fmt):
+    def describe():
+        author = get_object_or_404(User, username=username)
+        return {
+            'title': f'Yatube: {author.get_full_name() or username}',
+            'link': reverse('posts:profile', args=[username]),
+            'description': f'Записи пользователя {username}',
+        }
+    return syndication.feed_response(
+        request, fmt, _profile_scopes(username), describe,
+        Post.objects.filter(author__username=username),
+    )
+
+
+def search_posts(request):
+    template = 'posts/search.html'
+    text = request.GET.get('q', '').strip()
+    group = author = None
+    if request.GET.get('group'):
+        group = get_object_or_404(Group, slug=request.GET['group'])
+    if request.GET.get('author'):
+        author = get_object_or_404(User, username=request.GET['author'])
+    page_obj = search.search(
+        text,
+        group_id=group.pk if group else None,
+        author_id=author.pk if author else None,
+        cursor=request.GET.get('cursor'),
+        per_page=settings.POSTS_FOR_ONE_PAGE,
+    )
+    next_query = None
+    if page_obj.next_cursor:
+        params = request.GET.copy()
+        params['cursor'] = page_obj.next_cursor
+        next_query = params.urlencode()
+    context = {
+        'query': text,
+        'group': group,
+        'author': author,
+        'groups': Group.objects.all(),
+        'page_obj': page_obj,
+        'next_query': next_query,
     }
     return render(request, template, context=context)
 
@@ -66,7 +222,11 @@ def profile_edit(request, username):
     )
     if user_form.is_valid() and profile_form.is_valid():
         user_form.save()
-        profile_form.save()
+        profile = profile_form.save()
+        if 'avatar' in profile_form.changed_data:
+            thumbnails.schedule(
+                profile.avatar, 'avatar', [('author', user.pk)]
+            )
         return redirect('posts:profile', username)
     context = {
         'user_form': user_form,
@@ -75,36 +235,69 @@ def profile_edit(request, username):
     return render(request, template, context=context)
 
 
-def post_detail(request, post_id):
-    template = 'posts/post_detail.html'
-    post = get_object_or_404(Post, pk=post_id)
-    posts_count = Post.objects.filter(author=post.author).count()
-    form = CommentForm(request.POST or None)
-    comments = post.comments.all()
-    context = {
-        'owner': request.user == post.author,
+def _comments_context(request, post):
+    order = comments.get_order(request)
+    cursor = request.GET.get('cursor', '')
+    return {
         'post': post,
-        'posts_count': posts_count,
-        'form': form,
-        'comments': comments,
+        # Страница комментариев читается, только если её фрагмента нет
+        # в кэше шаблонов.
+        'comments': SimpleLazyObject(
+            lambda: comments.threads(post, order, cursor)
+        ),
+        'order': order,
+        'cursor': cursor,
+        'post_version': caching.get_token(*caching.card_scopes(post)),
     }
+
+
+def _detail_context(request, post, form):
+    context = _comments_context(request, post)
+    context.update({
+        'owner': request.user == post.author,
+        'posts_count': post.author.profile.posts_count,
+        'form': form,
+    })
+    return context
+
+
+@caching.conditional_page(_post_scopes)
+def post_detail(request, post_id):
+    template = 'posts/post_detail.html'
+    post = get_object_or_404(
+        Post.objects.select_related('author__profile', 'group'), pk=post_id
+    )
+    reply = request.GET.get('reply', '')
+    form = CommentForm(
+        post=post, initial={'parent': reply} if reply.isdigit() else None
+    )
+    context = _detail_context(request, post, form)
     return render(request, template, context=context)
 
 
+@caching.conditional_page(_post_scopes)
+def post_comments(request, post_id):
+    """Фрагмент со следующей страницей комментариев для подгрузки."""
+    post = get_object_or_404(
+        Post.objects.only('author_id', 'group_id'), pk=post_id
+    )
+    context = _comments_context(request, post)
+    return render(request, 'includes/comments.html', context=context)
+
+
 @login_required
 def add_comment(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
-    form = CommentForm(request.POST or None)
-    context = {
-        'form': form,
-        'post': post,
-    }
+    post = get_object_or_404(
+        Post.objects.select_related('author__profile', 'group'), id=post_id
+    )
+    form = CommentForm(request.POST or None, post=post)
     if form.is_valid():
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
         comment.save()
         return redirect('posts:post_detail', post_id)
+    context = _detail_context(request, post, form)
     return render(request, 'posts/post_detail.html', context=context)
 
 
@@ -115,6 +308,7 @@ def post_create(request):
         new_post = form.save(commit=False)
         new_post.author = request.user
         new_post.save()
+        thumbnails.schedule(new_post.image, 'post', [('post', new_post.pk)])
         return redirect('posts:profile', request.user.username)
     return render(
         request, 'posts/create_post.html', {'form': form})
@@ -125,9 +319,13 @@ def post_edit(request, post_id):
     post = get_object_or_404(Post, id=post_id)
     if request.user != post.author:
         return redirect('posts:post_detail', post_id)
-    form = PostForm(request.POST or None, instance=post)
+    form = PostForm(
+        request.POST or None, files=request.FILES or None, instance=post
+    )
     if form.is_valid():
-        form.save()
+        post = form.save()
+        if 'image' in form.changed_data:
+            thumbnails.schedule(post.image, 'post', [('post', post.pk)])
         return redirect('posts:post_detail', post_id)
     context = {
         'form': form,
@@ -138,12 +336,37 @@ def post_edit(request, post_id):
 
 @login_required
 def follow_index(request):
-    post_list = Post.objects.filter(author__following__user=request.user)
-    page_obj = paginator(request, post_list)
-    context = {'page_obj': page_obj}
+    page_obj = caching.attach_card_tokens(
+        get_feed(request.user, request.GET.get('cursor'))
+    )
+    graph.annotate_authors(request, page_obj)
+    context = {
+        'page_obj': page_obj,
+        'suggestions': graph.suggestions(request.user.pk),
+    }
     return render(request, 'posts/index.html', context)
 
 
+def _follow_list(request, username, kind):
+    author = get_object_or_404(User, username=username)
+    page_obj = graph.page(kind, author.pk, request.GET.get('cursor'))
+    graph.follow_states(request).annotate(page_obj)
+    context = {
+        'author': author,
+        'kind': kind,
+        'page_obj': page_obj,
+    }
+    return render(request, 'posts/follow_list.html', context)
+
+
+def follower_list(request, username):
+    return _follow_list(request, username, graph.FOLLOWERS)
+
+
+def following_list(request, username):
+    return _follow_list(request, username, graph.FOLLOWING)
+
+
 @login_required
 def profile_follow(request, username):
     user = request.user
@@ -1,16 +1,22 @@
 from django.contrib.auth.models import User
-from django.db import models
+from django.db import models, transaction
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 
+from .tasks import delete_file
+
 
 class ImageField(models.ImageField):
 
     def save_form_data(self, instance, data):
         if data is not None:
             file = getattr(instance, self.attname)
-            if file != data:
-                file.delete(save=False)
+            if file and file != data:
+                # Старый файл удалит воркер очереди задач, но только после
+                # того как сохранение строки с новым файлом закоммичено.
+                instance.__dict__.setdefault(
+                    '_replaced_files', []
+                ).append(file.name)
         super(ImageField, self).save_form_data(instance, data)
 
 
@@ -21,10 +27,17 @@ class Profile(models.Model):
         related_name='profile',
     )
     avatar = ImageField(upload_to="photos/%Y/%m/%d/", blank=True, null=True)
+    posts_count = models.PositiveIntegerField(default=0)
+    followers_count = models.PositiveIntegerField(default=0)
+    following_count = models.PositiveIntegerField(default=0)
 
     @receiver(post_save, sender=User)
     def create_user_profile(sender, instance, created, **kwargs):
         if created:
             Profile.objects.create(user=instance)
-        else:
-            instance.profile.save()
+
+
+@receiver(post_save, sender=Profile)
+def delete_replaced_files(sender, instance, **kwargs):
+    for name in instance.__dict__.pop('_replaced_files', ()):
+        transaction.on_commit(lambda name=name: delete_file.delay(name))
@@ -0,0 +1,8 @@
+from django.core.files.storage import default_storage
+
+from core.tasks import task
+
+
+@task
+def delete_file(name):
+    default_storage.delete(name)
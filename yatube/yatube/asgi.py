@@ -0,0 +1,16 @@
+"""
+ASGI config for yatube project.
+
+It exposes the ASGI callable as a module-level variable named ``application``,
+e.g. ``uvicorn yatube.asgi:application``. Django 2.2 has no ASGI handler,
+so core.asgi serves the WSGI application from a thread pool until the
+upgrade to Django 3.0+, after which Django's own handler is used.
+"""
+
+import os
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+
+from core.asgi import get_asgi_application  # noqa: E402
+
+application = get_asgi_application()
@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/2.2/ref/settings/
 """
 
 import os
+from importlib import import_module
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -23,7 +24,7 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 SECRET_KEY = 'hmqo(_51ikkd-+2ea$iv$po#a*1nlu1a@(j(sv*9mtyxl_=7u!'
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = os.getenv('YATUBE_DEBUG', '1') == '1'
 
 ALLOWED_HOSTS = [
     'localhost',
@@ -44,12 +45,15 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'posts.apps.PostsConfig',
     'users',
-    'core',
+    'core.apps.CoreConfig',
     'about',
+    'api',
     'sorl.thumbnail',
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
+    'core.db.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -62,12 +66,24 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'yatube.urls'
 
+template_loaders = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+# Вне DEBUG шаблоны разбираются один раз на процесс, а карточки постов
+# собирает скомпилированная функция тега post_card.
+if not DEBUG:
+    template_loaders = [
+        ('django.template.loaders.cached.Loader', template_loaders),
+    ]
+COMPILED_POST_CARDS = not DEBUG
+
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.template_backends.DjangoTemplates',
         'DIRS': [os.path.join(BASE_DIR, 'templates')],
-        'APP_DIRS': True,
         'OPTIONS': {
+            'loaders': template_loaders,
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -89,9 +105,27 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'CONN_MAX_AGE': 60,
     }
 }
 
+# Реплики для чтения: пути к копиям базы через запятую, например
+# YATUBE_REPLICAS=/srv/replica1.sqlite3,/srv/replica2.sqlite3
+DATABASE_REPLICAS = []
+for number, path in enumerate(
+    filter(None, os.getenv('YATUBE_REPLICAS', '').split(',')), start=1
+):
+    alias = f'replica{number}'
+    DATABASES[alias] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': path,
+        'CONN_MAX_AGE': 60,
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['core.db.ReplicaRouter']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -133,13 +167,26 @@ STATIC_URL = '/static/'
 STATICFILES_DIRS = (os.path.join(BASE_DIR, 'static'),)
 
 POSTS_FOR_ONE_PAGE = 10
+# Корневых комментариев на странице поста (с ответами на них) и предел
+# вложенности ответов.
+COMMENTS_PER_PAGE = 20
+COMMENTS_MAX_DEPTH = 5
 
 TEXT_MAX_LENGTH = 15
 
+
+# Настройки читаются до загрузки приложений: posts.links импортируется
+# при первом вызове.
+ABSOLUTE_URL_OVERRIDES = {
+    'auth.user': lambda user: import_module('posts.links').user_url(user),
+}
+
 LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
 
-EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+# Письма отправляет воркер run_tasks через TASK_EMAIL_BACKEND.
+EMAIL_BACKEND = 'core.mail.QueuedEmailBackend'
+TASK_EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
@@ -151,7 +198,84 @@ INTERNAL_IPS = [
 
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
-        'LOCATION': os.path.join(BASE_DIR, 'yatube_cache')
+        'BACKEND': 'core.cache_backends.sqlite.SQLiteCache',
+        'LOCATION': os.path.join(BASE_DIR, 'yatube_cache', 'cache.sqlite3'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
     }
 }
+
+FEED_FANOUT_LIMIT = 10000
+FEED_BACKFILL_SIZE = 100
+FEED_MAX_LENGTH = 1000
+FEED_BATCH_SIZE = 500
+
+PAGINATOR_COUNT_LIMIT = 10000
+
+# Граф подписок: срок жизни и размер кэшированной головы списков
+# смежности, пользователей на странице списков подписок, хранимых
+# и показываемых подсказок.
+GRAPH_CACHE_TIMEOUT = 60 * 60 * 24
+GRAPH_HEAD_SIZE = 1000
+FOLLOWS_PER_PAGE = 30
+FOLLOW_SUGGESTIONS = 20
+FOLLOW_SUGGESTIONS_SHOWN = 5
+
+PAGE_CACHE_TIMEOUT = 60 * 60
+HTTP_CACHE_TIMEOUT = 60
+
+# Ленты Atom, RSS и JSON Feed: число записей и срок жизни в кэше.
+SYNDICATION_ITEMS = 30
+SYNDICATION_CACHE_TIMEOUT = 60 * 60
+
+THUMBNAIL_WORKERS = 2
+
+# Очередь фоновых задач core.tasks. При TASKS_EAGER задачи выполняются
+# в самом процессе после коммита, без воркера.
+TASKS_EAGER = False
+TASK_MAX_ATTEMPTS = 5
+TASK_RETRY_DELAY = 10
+TASK_RETRY_MAX_DELAY = 60 * 60
+TASK_LOCK_TIMEOUT = 10 * 60
+TASK_POLL_INTERVAL = 1
+
+# Потоки, в которых yatube.asgi выполняет запросы, и потоки для
+# одновременных независимых запросов к базе внутри представления.
+ASGI_THREADS = 8
+CONCURRENT_QUERY_THREADS = 4
+
+IMAGE_VARIANT_QUALITY = 80
+
+# Сколько SQL-запросов допустимо на ответ представления.
+QUERY_BUDGETS = {
+    'posts:index': 10,
+    'posts:group_list': 10,
+    'posts:profile': 12,
+    'posts:post_detail': 12,
+    'posts:follow_index': 12,
+    'posts:search': 10,
+}
+QUERY_BUDGET_STRICT = False
+
+# Представления, которые читают с реплик.
+REPLICA_VIEWS = {
+    'posts:index',
+    'posts:group_list',
+    'posts:profile',
+    'posts:post_detail',
+    'posts:follow_index',
+    'posts:trending',
+    'posts:group_trending',
+}
+REPLICA_STICKY_COOKIE = 'read_primary'
+REPLICA_STICKY_SECONDS = 10
+REPLICA_HEALTH_INTERVAL = 5
+
+# Популярное: вес поста зависит от числа подписчиков автора, каждый
+# комментарий добавляет TRENDING_COMMENT_WEIGHT, всё вместе затухает
+# вдвое за TRENDING_HALF_LIFE часов.
+TRENDING_HALF_LIFE = 24
+TRENDING_COMMENT_WEIGHT = 1.0
+TRENDING_FOLLOWER_WEIGHT = 0.5
+TRENDING_MIN_SCORE = 0.01